@@ -11,19 +11,49 @@ import asyncio
 import csv
 import time
 import json
+import statistics
 from pathlib import Path
 from typing import List, Dict, Optional, Type
 from collections import defaultdict
 from datetime import datetime
 
 # Importaciones del paquete
-from chaos_engine.agents.petstore import PetstoreAgent, ToolExecutor, LLMClientConstructor
+from chaos_engine.agents.petstore import PetstoreAgent, ToolExecutor, LLMClientConstructor, METRIC_FIELDS
 from chaos_engine.chaos.proxy import ChaosProxy
 from chaos_engine.core.logging import setup_logger
 from chaos_engine.core.config import load_config, get_model_name
-from chaos_engine.core.resilience import CircuitBreakerProxy
+from chaos_engine.core.resilience import CircuitBreakerProxy, ResponseCacheProxy, PlaybookStrategyProxy
+from chaos_engine.core.playbook_manager import load_compiled_playbook
+from chaos_engine.core.tracing import TraceRecorder, TracingProxy
+from chaos_engine.core.rate_limiter import RateLimitedScheduler, RateLimitExceeded, is_rate_limit_error, parse_retry_after
+from chaos_engine.agents.scripted_llm import ScriptedPolicyLlm
+from chaos_engine.agents.llm_cache import RecordReplayConstructor
+from chaos_engine.agents.rate_limited_llm import RateLimitedConstructor
+from chaos_engine.agents.pool import AgentPool
 from google.adk.models.google_llm import Gemini
 
+# Modelos disponibles para --llm ("scripted" = política determinista offline)
+LLM_CONSTRUCTORS = {"gemini": Gemini, "scripted": ScriptedPolicyLlm}
+
+# Contadores por experimento de ResponseCacheProxy (--cache-ttl) y PlaybookStrategyProxy (--native-recovery)
+PROXY_STAT_FIELDS = ("cache_hits", "cache_misses", "cache_stale_hits",
+                     "native_recoveries", "native_retries", "native_exhausted", "native_fail_fast",
+                     "native_cache_fallbacks")
+
+
+def proxy_stats(cache_proxy: Optional[ResponseCacheProxy], recovery_proxy: Optional[PlaybookStrategyProxy]) -> Dict[str, int]:
+    """Contadores de los proxies de resiliencia de UN experimento (0 si el proxy no está activo)."""
+    stats = dict.fromkeys(PROXY_STAT_FIELDS, 0)
+    if cache_proxy is not None:
+        cache = cache_proxy.get_stats()
+        stats.update(cache_hits=cache["hits"], cache_misses=cache["misses"], cache_stale_hits=cache["stale_hits"])
+    if recovery_proxy is not None:
+        native = recovery_proxy.get_stats()
+        stats.update(native_recoveries=native["recoveries"], native_retries=native["retries"],
+                     native_exhausted=native["exhausted"], native_fail_fast=native["fail_fast"],
+                     native_cache_fallbacks=native["cache_fallbacks"])
+    return stats
+
 # ================================
 # EXPERIMENT EXECUTION (DI READY)
 # ================================
@@ -35,66 +65,130 @@ async def run_experiment_safe(
     failure_rate: float,
     seed: int,
     verbose: bool,
-    logger
+    logger,
+    cache_ttl: float = 0.0,
+    llm_constructor: Type = Gemini,
+    native_recovery: bool = False,
+    agent_pool: Optional[AgentPool] = None,
+    config: Optional[Dict] = None,
+    trace: bool = False
 ) -> Dict:
-    """Run single LLM experiment with FRESH agent instance via Dependency Injection."""
+    """
+    Run single LLM experiment via Dependency Injection.
+
+    With `agent_pool`, the agent graph is shared and only the executor chain
+    (and the ADK session) are fresh per experiment.
+    """
     import time
     start_time = time.time()
     
-    # 1. CARGAR CONFIGURACIÓN
-    config = load_config()
+    # 1. CARGAR CONFIGURACIÓN (una sola vez por barrido si se pasa `config`)
+    config = config if config is not None else load_config()
     model_name = get_model_name(config)
     
-    # 2. INYECCIÓN CRÍTICA: Crear las dependencias
+    mock_mode = config.get('mock_mode', True)
+    
+    # 2. Agente: compartido (pool) o nuevo; el executor se inyecta por experimento.
+    # Se crea primero porque su reloj (virtual en mock mode) gobierna esperas, CB, caché y trazas.
+    if agent_pool is not None:
+        agent = agent_pool.get(playbook_path, llm_constructor, model_name, native_recovery=native_recovery)
+    else:
+        agent = PetstoreAgent(
+            playbook_path=Path(playbook_path), 
+            tool_executor=None, # <-- Se inyecta en process_order
+            llm_client_constructor=llm_constructor, 
+            model_name=model_name,
+            verbose=verbose,
+            mock_mode=mock_mode,
+            native_recovery=native_recovery
+        )
+    
+    # 3. INYECCIÓN CRÍTICA: Crear las dependencias
     # A. Crear el Proxy BASE (el que realmente simula el caos)
     chaos_proxy_instance = ChaosProxy(
-        failure_rate=failure_rate, seed=seed, mock_mode=config.get('mock_mode', True), verbose=verbose
+        failure_rate=failure_rate, seed=seed, mock_mode=mock_mode, verbose=verbose
     )
 
-    # ✅ B. INYECTAR EL CIRCUIT BREAKER ALREDEDOR DEL PROXY (Pilar IV)
+    # B. (Opcional) Caché de lecturas GET idempotentes sobre el proxy.
+    # Con recuperación nativa, servir la caché ante un error lo decide el playbook
+    # (estrategia serve_cached), no la caché por su cuenta.
+    inner_executor = chaos_proxy_instance
+    cache_proxy = None
+    if cache_ttl > 0:
+        cache_proxy = ResponseCacheProxy(
+            wrapped_executor=chaos_proxy_instance, ttl_seconds=cache_ttl,
+            serve_stale_on_error=not native_recovery, clock=agent.now
+        )
+        inner_executor = cache_proxy
+
+    # ✅ C. INYECTAR EL CIRCUIT BREAKER ALREDEDOR DEL PROXY (Pilar IV)
     tool_executor_instance = CircuitBreakerProxy(
-        wrapped_executor=chaos_proxy_instance,
+        wrapped_executor=inner_executor,
         failure_threshold=3, # Se abre si falla 3 veces
-        cooldown_seconds=30  # Espera 30 segundos
+        cooldown_seconds=30, # Espera 30 segundos
+        clock=agent.now
     )
 
-    # C. Agente: Le pasamos el Circuit Breaker como Executor
-    agent = PetstoreAgent(
-        playbook_path=Path(playbook_path), 
-        tool_executor=tool_executor_instance, # <-- ¡Inyección del CB!
-        llm_client_constructor=Gemini, 
-        model_name=model_name,
-        verbose=verbose
-    )
+    # C2. (Opcional) Traza de cada llamada a tool (incluye reintentos nativos y bloqueos del CB)
+    recorder = None
+    if trace:
+        recorder = TraceRecorder(clock=agent.now)
+        tool_executor_instance = TracingProxy(wrapped_executor=tool_executor_instance, recorder=recorder)
+
+    # D. (Opcional) Recuperación nativa: el playbook se aplica bajo la tool, sin turnos del LLM
+    recovery_proxy = None
+    if native_recovery:
+        recovery_proxy = PlaybookStrategyProxy(
+            wrapped_executor=tool_executor_instance, playbook=load_compiled_playbook(playbook_path),
+            sleep=agent.sleep, on_retry=agent.record_tool_retry, response_cache=cache_proxy
+        )
+        tool_executor_instance = recovery_proxy
     
     try:
         # 3. Ejecución
         result = await agent.process_order(
             order_id=f"exp_{experiment_id}",
             failure_rate=failure_rate,
-            seed=seed
+            seed=seed,
+            executor=tool_executor_instance
         )
         
+        # process_order captura las excepciones del runner: un 429 llega como error del resultado
+        if result.get("failed_at") == "exception" and is_rate_limit_error(result.get("error")):
+            raise RateLimitExceeded(result["error"], retry_after=parse_retry_after(result["error"]))
+        
         outcome = result["status"]
         steps = len(result.get("steps_completed", []))
         failed_at = result.get("failed_at", "N/A")
+        usage = {name: result.get(name, 0) for name in METRIC_FIELDS}
+        virtual_ms = result.get("virtual_ms", 0.0)
         
         logger.debug(f"  Exp {experiment_id}: Outcome={outcome}, Steps={steps}, Time={result['duration_ms']:.0f}ms")
         
+    except RateLimitExceeded:
+        # El scheduler decide cuándo repetir el experimento (nada de esperas fijas aquí)
+        logger.warning(f"  ⏳ Rate limited {experiment_id}: handing back to scheduler")
+        raise
     except Exception as e:
         # ✅ FIX RESTAURADO: Inicializar 'steps' para evitar NameError
         logger.error(f"  🔥 CRASH {experiment_id}: {str(e)[:100]}...")
+        if is_rate_limit_error(e):
+            raise RateLimitExceeded(str(e), retry_after=parse_retry_after(e)) from e
         outcome = "failure"
         steps = 0 # ⬅️ RESTAURADO: Cláusula de guardia para el retorno.
         failed_at = "runner_crash"
-        
-        if "429" in str(e) or "quota" in str(e).lower():
-            logger.warning("  ⏳ Quota exceeded. Cooling down for 60s...")
-            await asyncio.sleep(60)
+        usage = dict.fromkeys(METRIC_FIELDS, 0)
+        virtual_ms = 0.0
 
-    duration_ms = (time.time() - start_time) * 1000
+    # Las esperas virtuales (mock mode) cuentan como latencia aunque no bloqueen;
+    # la espera de cuota (RPM/TPM) se reporta aparte en quota_wait_ms
+    duration_ms = (time.time() - start_time) * 1000 + virtual_ms - usage["quota_wait_ms"]
     
-    return {
+    resilience = proxy_stats(cache_proxy, recovery_proxy)
+    if cache_proxy is not None or recovery_proxy is not None:
+        logger.debug(f"  Resilience {experiment_id}: {resilience}")
+    
+    record = {
         "experiment_id": experiment_id,
         "agent": agent_label,
         "failure_rate": failure_rate,
@@ -102,8 +196,13 @@ async def run_experiment_safe(
         "outcome": outcome,
         "steps_completed": steps, 
         "failed_at": failed_at,
-        "duration_ms": round(duration_ms, 2)
+        "duration_ms": round(duration_ms, 2),
+        **usage,
+        **resilience
     }
+    if recorder is not None:
+        record["trace"] = recorder.export(outcome, experiment_id=experiment_id, failure_rate=failure_rate, seed=seed)
+    return record
 
 # ================================
 # DATA SAVING (No hay cambios en la lógica de guardado)
@@ -117,13 +216,53 @@ def calculate_inconsistency(exp: Dict) -> int:
     if steps == 3: return 1
     return 0
 
-def save_phase5_format(experiments: List[Dict], output_dir: Path, agent_labels: Dict[str, str], logger) -> None:
-    """Generates CSV and JSON compatible with Phase 5 Dashboard."""
+def usage_summary(exps: List[Dict]) -> Dict:
+    """Coste y reparto de latencia de un grupo: media/desviación por run y coste por éxito."""
+    def stats(field: str, scale: float = 1.0) -> Dict[str, float]:
+        # ✅ FIX: std muestral real de los valores por run (0.0 con menos de 2 runs)
+        values = [e.get(field, 0) / scale for e in exps]
+        return {
+            "mean": statistics.fmean(values) if values else 0.0,
+            "std": statistics.stdev(values) if len(values) > 1 else 0.0,
+        }
+
+    successes = sum(1 for e in exps if e["outcome"] == "success")
+    total_tokens = sum(e.get("prompt_tokens", 0) + e.get("completion_tokens", 0) for e in exps)
+    total_calls = sum(e.get("model_calls", 0) for e in exps)
+    return {
+        "model_calls": stats("model_calls"),
+        "model_cache_hits": stats("model_cache_hits"),
+        "prompt_tokens": stats("prompt_tokens"),
+        "completion_tokens": stats("completion_tokens"),
+        "model_s": stats("model_ms", 1000),
+        "tool_s": stats("tool_ms", 1000),
+        "wait_s": stats("wait_ms", 1000),
+        "quota_wait_s": stats("quota_wait_ms", 1000),
+        "per_success": {
+            "model_calls": total_calls / successes if successes else None,
+            "tokens": total_tokens / successes if successes else None,
+            "duration_s": sum(e["duration_ms"] for e in exps) / 1000 / successes if successes else None,
+        },
+        # Totales del grupo: aciertos de caché y trabajo de la recuperación nativa
+        "resilience": {field: sum(e.get(field, 0) for e in exps) for field in PROXY_STAT_FIELDS},
+    }
+
+def save_phase5_format(experiments: List[Dict], output_dir: Path, agent_labels: Dict[str, str], logger, concurrency: int = 1) -> None:
+    """
+    Generates CSV and JSON compatible with Phase 5 Dashboard.
+
+    `concurrency` se guarda junto a cada duración: con más de un experimento
+    a la vez, duration_s incluye la contención entre ellos (event loop,
+    CPU, red) y no es comparable con un barrido secuencial.
+    """
     csv_path = output_dir / "raw_results.csv"
+    timing = {"concurrency": concurrency, "duration_includes_contention": concurrency > 1}
     
     # 1. CSV Export
     with open(csv_path, "w", newline="") as f:
-        fieldnames = ["experiment_id", "agent_type", "outcome", "duration_s", "inconsistencies_count", "strategies_used", "seed", "failure_rate"]
+        fieldnames = ["experiment_id", "agent_type", "outcome", "duration_s", "inconsistencies_count", "strategies_used", "seed", "failure_rate",
+                      "model_calls", "model_cache_hits", "prompt_tokens", "completion_tokens", "model_s", "tool_s", "wait_s", "quota_wait_s",
+                      *PROXY_STAT_FIELDS, "concurrency"]
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         
@@ -140,7 +279,17 @@ def save_phase5_format(experiments: List[Dict], output_dir: Path, agent_labels:
                 "inconsistencies_count": calculate_inconsistency(exp),
                 "strategies_used": "",
                 "seed": exp["seed"],
-                "failure_rate": exp["failure_rate"]
+                "failure_rate": exp["failure_rate"],
+                "model_calls": exp.get("model_calls", 0),
+                "model_cache_hits": exp.get("model_cache_hits", 0),
+                "prompt_tokens": exp.get("prompt_tokens", 0),
+                "completion_tokens": exp.get("completion_tokens", 0),
+                "model_s": round(exp.get("model_ms", 0) / 1000, 3),
+                "tool_s": round(exp.get("tool_ms", 0) / 1000, 3),
+                "wait_s": round(exp.get("wait_ms", 0) / 1000, 3),
+                "quota_wait_s": round(exp.get("quota_wait_ms", 0) / 1000, 3),
+                **{field: exp.get(field, 0) for field in PROXY_STAT_FIELDS},
+                "concurrency": concurrency
             })
             
     # 2. JSON Aggregation
@@ -160,7 +309,7 @@ def save_phase5_format(experiments: List[Dict], output_dir: Path, agent_labels:
             
         for key, exps in groups.items():
             if not exps:
-                by_rate[rate_str][key] = {"n_runs": 0, "success_rate": {"mean": 0.0, "std": 0.0}, "duration_s": {"mean": 0.0, "std": 0.0}, "inconsistencies": {"mean": 0.0, "std": 0.0}}
+                by_rate[rate_str][key] = {"n_runs": 0, "success_rate": {"mean": 0.0, "std": 0.0}, "duration_s": {"mean": 0.0, "std": 0.0}, "inconsistencies": {"mean": 0.0, "std": 0.0}, **usage_summary([]), "timing": timing}
                 continue
                 
             successes = sum(1 for e in exps if e["outcome"] == "success")
@@ -174,7 +323,9 @@ def save_phase5_format(experiments: List[Dict], output_dir: Path, agent_labels:
                 "n_runs": len(exps),
                 "success_rate": {"mean": successes/len(exps), "std": 0.0},
                 "duration_s": {"mean": avg_dur, "std": 0.0},
-                "inconsistencies": {"mean": avg_inc, "std": 0.0}
+                "inconsistencies": {"mean": avg_inc, "std": 0.0},
+                **usage_summary(exps),
+                "timing": timing
             }
             
     json_path = output_dir / "aggregated_metrics.json"
@@ -202,58 +353,74 @@ async def run_comparison(args) -> bool:
     model_name = get_model_name(config)
     base_seed = args.seed if args.seed is not None else config.get('experiment', {}).get('default_seed', 42)
     
-    all_results = []
-    SAFE_DELAY_SECONDS = 10
+    llm_constructor = LLM_CONSTRUCTORS[args.llm]
     
-    for rate in args.failure_rates:
-        logger.info(f"\n📊 Chaos Level: {rate:.0%}")
-        
-        # Agent A (Baseline)
-        logger.info(f"  👉 Agent A ({args.agent_a_label})...")
-        for i in range(args.experiments_per_rate):
-            seed = base_seed + i
-            
-            # DI: Create Executor and Agent
-            executor_instance = ChaosProxy(failure_rate=rate, seed=seed, mock_mode=config.get('mock_mode', False), verbose=args.verbose)
-            agent_a_instance = PetstoreAgent(
-                playbook_path=Path(args.playbook_a), tool_executor=executor_instance,
-                llm_client_constructor=Gemini, model_name=model_name, verbose=args.verbose
-            )
-            
-            res = await run_experiment_safe(f"A-{rate:.2f}-{i+1:03d}", args.playbook_a, args.agent_a_label, rate, seed, args.verbose, logger)
-            all_results.append(res)
-            
-            if args.verbose: print(f"    Run {i+1}: {'✅' if res['outcome']=='success' else '❌'}")
-            if i < args.experiments_per_rate - 1: await asyncio.sleep(SAFE_DELAY_SECONDS)
-            
-        await asyncio.sleep(SAFE_DELAY_SECONDS)
-
-        # Agent B (Playbook)
-        logger.info(f"  👉 Agent B ({args.agent_b_label})...")
-        for i in range(args.experiments_per_rate):
-            seed = base_seed + i
-            
-            # DI: Create Executor and Agent
-            executor_instance = ChaosProxy(failure_rate=rate, seed=seed, mock_mode=config.get('mock_mode', False), verbose=args.verbose)
-            agent_b_instance = PetstoreAgent(
-                playbook_path=Path(args.playbook_b), tool_executor=executor_instance,
-                llm_client_constructor=Gemini, model_name=model_name, verbose=args.verbose
+    # Presupuesto de cuota compartido por todos los experimentos (sustituye a SAFE_DELAY_SECONDS)
+    scheduler = RateLimitedScheduler(
+        requests_per_minute=args.rpm, tokens_per_minute=args.tpm, max_concurrency=args.concurrency
+    )
+    # Sin llamadas reales al modelo (scripted / replay) no hay cuota que proteger
+    if getattr(llm_constructor, "requires_api_key", True) is not False and not (args.llm_cache and args.llm_cache_mode == "replay"):
+        llm_constructor = RateLimitedConstructor(llm_constructor, scheduler)
+    # ✅ FIX: La caché va POR FUERA del limitador: un hit no consume RPM/TPM
+    if args.llm_cache:
+        llm_constructor = RecordReplayConstructor(llm_constructor, args.llm_cache, mode=args.llm_cache_mode)
+        logger.info(f"💾 LLM record/replay cache: {args.llm_cache} (mode={args.llm_cache_mode})")
+    logger.info(f"🚦 Scheduler: {args.rpm:g} RPM, {args.tpm or '∞'} TPM, concurrency={args.concurrency}")
+    if args.concurrency > 1:
+        logger.warning("⚠️ concurrency > 1: duration_s includes contention between experiments")
+    
+    agent_pool = AgentPool(verbose=args.verbose, mock_mode=config.get('mock_mode', True))
+    
+    def make_job(experiment_id: str, playbook_path: str, label: str, rate: float, seed: int):
+        async def job() -> Dict:
+            return await run_experiment_safe(
+                experiment_id, playbook_path, label, rate, seed, args.verbose, logger,
+                cache_ttl=args.cache_ttl, llm_constructor=llm_constructor, native_recovery=args.native_recovery,
+                agent_pool=agent_pool, config=config, trace=args.trace
             )
-            
-            res = await run_experiment_safe(f"B-{rate:.2f}-{i+1:03d}", args.playbook_b, args.agent_b_label, rate, seed, args.verbose, logger)
-            all_results.append(res)
-            
-            if args.verbose: print(f"    Run {i+1}: {'✅' if res['outcome']=='success' else '❌'}")
-            if i < args.experiments_per_rate - 1: await asyncio.sleep(SAFE_DELAY_SECONDS)
-            
+        return job
+    
+    async def run_scheduled(job, experiment_id: str, label: str, rate: float, seed: int) -> Dict:
+        try:
+            return await scheduler.run(job)
+        except RateLimitExceeded:
+            logger.error(f"  🔥 {experiment_id}: rate limit retries exhausted")
+            return {"experiment_id": experiment_id, "agent": label, "failure_rate": rate, "seed": seed,
+                    "outcome": "failure", "steps_completed": 0, "failed_at": "rate_limited", "duration_ms": 0.0,
+                    **dict.fromkeys(METRIC_FIELDS, 0), **dict.fromkeys(PROXY_STAT_FIELDS, 0)}
+    
+    # Orden idéntico al barrido secuencial original: por rate, A y después B
+    planned = []
+    for rate in args.failure_rates:
+        for prefix, playbook_path, label in (("A", args.playbook_a, args.agent_a_label), ("B", args.playbook_b, args.agent_b_label)):
+            for i in range(args.experiments_per_rate):
+                planned.append((f"{prefix}-{rate:.2f}-{i+1:03d}", playbook_path, label, rate, base_seed + i))
         base_seed += args.experiments_per_rate
-        await asyncio.sleep(SAFE_DELAY_SECONDS)
+    
+    logger.info(f"\n📊 Running {len(planned)} experiments across {len(args.failure_rates)} chaos levels...")
+    all_results = await asyncio.gather(*(
+        run_scheduled(make_job(*spec), spec[0], spec[2], spec[3], spec[4]) for spec in planned
+    ))
+    
+    if args.verbose:
+        for res in all_results:
+            print(f"    {res['experiment_id']}: {'✅' if res['outcome']=='success' else '❌'}")
+    logger.info(f"🚦 Scheduler stats: {scheduler.get_stats()}")
+    logger.info(f"🧩 Agent pool: {agent_pool.get_stats()}")
     
     # Save
     logger.info("\n[4/4] Saving results...")
     output_dir.mkdir(parents=True, exist_ok=True)
     labels_map = {"A": "baseline", "B": "playbook"}
-    save_phase5_format(all_results, output_dir, labels_map, logger)
+    save_phase5_format(all_results, output_dir, labels_map, logger, concurrency=args.concurrency)
+    if args.trace:
+        traces_path = output_dir / "traces.jsonl"
+        with open(traces_path, "w", encoding="utf-8") as f:
+            for res in all_results:
+                if "trace" in res:
+                    f.write(json.dumps(res["trace"], separators=(",", ":")) + "\n")
+        logger.info(f"🧵 Tool-call traces saved to {traces_path}")
     
     return True
 
@@ -267,6 +434,16 @@ def parse_args():
     parser.add_argument("--failure-rates", type=float, nargs="+", required=True)
     parser.add_argument("--experiments-per-rate", type=int, default=5)
     parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--llm", choices=sorted(LLM_CONSTRUCTORS), default="gemini", help="'scripted' runs a deterministic offline policy (no model calls)")
+    parser.add_argument("--cache-ttl", type=float, default=0.0, help="TTL (s) for cached GET responses. 0 disables the cache")
+    parser.add_argument("--rpm", type=float, default=15.0, help="Model requests per minute budget")
+    parser.add_argument("--tpm", type=float, default=None, help="Model tokens per minute budget (default: unlimited)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Experiments running at the same time (default: 1). >1 is faster but duration_s then includes contention")
+    parser.add_argument("--native-recovery", action="store_true", help="Apply playbook strategies in the executor instead of via LLM turns")
+    parser.add_argument("--trace", action="store_true", help="Record tool-call traces (traces.jsonl, ExperimentEvaluator format)")
+    parser.add_argument("--llm-cache", type=str, default=None, help="Directory of the LLM record/replay cache (temperature 0 requests only)")
+    parser.add_argument("--llm-cache-mode", choices=["auto", "record", "replay"], default="auto")
     parser.add_argument("--verbose", action="store_true")
     return parser.parse_args()
 
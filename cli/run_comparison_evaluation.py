@@ -4,8 +4,9 @@ run_agent_comparison_NEW.py
 Phase 6: A/B Testing powered by Google ADK Agent Evaluator.
 
 Combines parametric chaos testing with ADK's formal evaluation metrics.
-- Replaces manual execution with AgentEvaluator.evaluate().
-- Uses dynamic patching to inject Chaos/Playbook configurations per run.
+- Evaluates in memory (build_eval_set + evaluate_agent): no temp files.
+- Each run builds its own OrderAgent with injected Chaos/Playbook
+  dependencies, so runs can execute concurrently (--concurrency).
 - Generates standard CSV/JSON for the existing Dashboard.
 
 Usage:
@@ -16,7 +17,8 @@ Usage:
       --playbook-b assets/playbooks/training.json \
       --failure-rates 0.0 0.2 \
       --experiments-per-rate 1 \
-      --seed 42
+      --seed 42 \
+      --concurrency 4
 """
 
 import sys
@@ -26,12 +28,9 @@ import csv
 import json
 import logging
 import time
-import tempfile
-import os
 from pathlib import Path
 from collections import defaultdict
 from datetime import datetime
-from unittest.mock import patch
 
 # 1. Setup Environment
 project_root = Path(__file__).resolve().parent.parent
@@ -40,11 +39,9 @@ sys.path.insert(0, str(project_root / "src"))
 from chaos_engine.core.logging import setup_logger
 from chaos_engine.core.config import load_config
 
-# ADK Imports
-from google.adk.evaluation.agent_evaluator import AgentEvaluator
-
-# Module to test
-import chaos_engine.agents.order_agent as order_agent_module
+# Evaluación ADK en memoria + fábrica del agente bajo prueba
+from chaos_engine.evaluation.adk_eval import build_eval_set, classify_score, evaluate_agent
+from chaos_engine.agents.order_agent import create_order_agent
 from chaos_engine.core.playbook_manager import PlaybookManager
 from chaos_engine.chaos.proxy import ChaosProxy
 
@@ -110,10 +107,8 @@ async def run_single_eval_case(
         }
     ]
     
-    # Crear archivo temporal
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8') as tmp:
-        json.dump(case_data, tmp)
-        tmp_path = tmp.name
+    # EvalSet en memoria (antes: NamedTemporaryFile por caso)
+    eval_set = build_eval_set(case_data, name=run_id)
 
     # 2. INYECCIÓN DE DEPENDENCIAS
     scoped_proxy = ChaosProxy(
@@ -129,6 +124,9 @@ async def run_single_eval_case(
         
     scoped_playbook = PlaybookManager(str(pb_path_obj))
 
+    # ✅ Agente propio de esta ejecución (antes: patch.object sobre el módulo global)
+    scoped_agent = create_order_agent(executor=scoped_proxy, playbook_manager=scoped_playbook)
+
     # 3. EJECUCIÓN DEL EVALUADOR
     start_time = time.time()
     outcome = "failure"
@@ -136,39 +134,20 @@ async def run_single_eval_case(
     inconsistency = 0
     
     try:
-        with patch.object(order_agent_module, 'chaos_proxy', scoped_proxy), \
-             patch.object(order_agent_module, 'playbook', scoped_playbook), \
-             patch('google.adk.evaluation.agent_evaluator.NUM_RUNS', 1):
-            
-            if verbose:
-                print(f"   ⚡ ADK Eval: Rate={failure_rate:.2f}, PB={pb_path_obj.name}")
+        if verbose:
+            print(f"   ⚡ ADK Eval: Rate={failure_rate:.2f}, PB={pb_path_obj.name}")
 
-            result = await AgentEvaluator.evaluate(
-                agent_module="chaos_engine.agents.order_agent",
-                eval_dataset_file_path_or_dir=tmp_path
-            )
-            
-            if result:
-                results_list = result.eval_results if hasattr(result, 'eval_results') else result
-                
-                if results_list and len(results_list) > 0:
-                    metrics = results_list[0].metrics if hasattr(results_list[0], 'metrics') else results_list[0]
-                    
-                    # Extraer scores
-                    tool_score = metrics.get('tool_trajectory_avg_score') or metrics.get('tool_use_match', 0)
-                    
-                    # Si tool_score es 1.0, es perfecto. Si es >= 0.4, es aceptable.
-                    outcome = "success" if tool_score >= 0.4 else "failure"
-                    
-                    # Inconsistencia: Pasos parciales correctos pero flujo incompleto
-                    inconsistency = 1 if (0.0 < tool_score < 0.4) else 0
+        scores = await evaluate_agent(scoped_agent, eval_set, num_runs=1)
+
+        # Extraer scores
+        tool_score = scores.get('tool_trajectory_avg_score') or 0.0
+        
+        # Si tool_score es 1.0, es perfecto. Si es >= 0.4, es aceptable.
+        # Inconsistencia: Pasos parciales correctos pero flujo incompleto
+        outcome, inconsistency = classify_score(tool_score)
 
     except Exception as e:
         print(f"   ❌ Error: {e}")
-    finally:
-        if os.path.exists(tmp_path):
-            try: os.remove(tmp_path)
-            except: pass
 
     duration_ms = (time.time() - start_time) * 1000
     
@@ -198,28 +177,28 @@ async def run_comparison(args) -> bool:
     logger.info("🤖 ADK-POWERED AGENT COMPARISON")
     logger.info("="*80)
     
-    all_results = []
-    
+    # Plan completo (orden estable) -> ejecución concurrente acotada
+    planned = []
     for rate in args.failure_rates:
-        logger.info(f"\n📊 Chaos Rate: {rate:.0%}")
-        
-        # Agent A
-        logger.info(f"  👉 Testing Agent A: {args.agent_a_label}")
-        for i in range(args.experiments_per_rate):
-            seed = (args.seed or 42) + i
-            res = await run_single_eval_case(f"A-{rate:.2f}-{i+1:03d}", args.playbook_a, rate, seed, args.verbose)
-            res["agent_type"] = "baseline"
-            all_results.append(res)
-            print(f"     Run {i+1}: {res['outcome'].upper()} (Score: {res['adk_score']:.2f})")
-
-        # Agent B
-        logger.info(f"  👉 Testing Agent B: {args.agent_b_label}")
-        for i in range(args.experiments_per_rate):
-            seed = (args.seed or 42) + i
-            res = await run_single_eval_case(f"B-{rate:.2f}-{i+1:03d}", args.playbook_b, rate, seed, args.verbose)
-            res["agent_type"] = "playbook"
-            all_results.append(res)
-            print(f"     Run {i+1}: {res['outcome'].upper()} (Score: {res['adk_score']:.2f})")
+        for label, playbook_path, agent_type, prefix in (
+            (args.agent_a_label, args.playbook_a, "baseline", "A"),
+            (args.agent_b_label, args.playbook_b, "playbook", "B"),
+        ):
+            for i in range(args.experiments_per_rate):
+                seed = (args.seed or 42) + i
+                planned.append((f"{prefix}-{rate:.2f}-{i+1:03d}", label, playbook_path, agent_type, rate, seed))
+
+    logger.info(f"📊 {len(planned)} evaluations, concurrency={args.concurrency}")
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+
+    async def run_planned(run_id, label, playbook_path, agent_type, rate, seed):
+        async with semaphore:
+            res = await run_single_eval_case(run_id, playbook_path, rate, seed, args.verbose)
+        res["agent_type"] = agent_type
+        print(f"     {run_id} [{label}]: {res['outcome'].upper()} (Score: {res['adk_score']:.2f})")
+        return res
+
+    all_results = list(await asyncio.gather(*(run_planned(*plan) for plan in planned)))
 
     save_results(all_results, output_dir, logger)
     return True
@@ -259,6 +238,7 @@ def parse_args():
     parser.add_argument("--failure-rates", type=float, nargs="+", required=True)
     parser.add_argument("--experiments-per-rate", type=int, default=1)
     parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=1, help="Evaluations run in parallel (default: 1)")
     parser.add_argument("--verbose", action="store_true")
     return parser.parse_args()
 
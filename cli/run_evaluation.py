@@ -1,12 +1,22 @@
 """
 CLI entry point for Agent Evaluation with Observability.
+
+Sharding (CI / varias máquinas):
+    python cli/run_evaluation.py --shard 1/4   # ... hasta --shard 4/4
+    python cli/run_evaluation.py --merge reports/evaluations/eval_*_shard*
+Process pool (una máquina, varios cores):
+    python cli/run_evaluation.py --processes 4
+Incremental (solo re-ejecuta casos cuyas entradas cambiaron):
+    python cli/run_evaluation.py --incremental
 """
 import sys
 import asyncio
 import argparse
 import json
+import time
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 
 # Setup path (si no instalado)
 current_file = Path(__file__).resolve()
@@ -15,27 +25,79 @@ src_path = project_root / "src"
 if str(src_path) not in sys.path:
     sys.path.insert(0, str(src_path))
 
-from chaos_engine.evaluation.runner import EvaluationRunner
+from chaos_engine.evaluation.runner import EvaluationRunner, run_shard_process
+from chaos_engine.evaluation.sharding import REPORT_FILENAME, build_report, load_reports, merge_reports, parse_shard
 from chaos_engine.core.logging import setup_logger
+from chaos_engine.agents.scripted_llm import ScriptedPolicyLlm
+from google.adk.models.google_llm import Gemini
+
+# Modelos disponibles para --llm ("scripted" = política determinista offline)
+LLM_CONSTRUCTORS = {"gemini": Gemini, "scripted": ScriptedPolicyLlm}
+
+def _finish(report: dict, output_dir: Path, logger):
+    json_path = output_dir / REPORT_FILENAME
+    with open(json_path, 'w') as f:
+        json.dump(report, f, indent=2)
+        
+    logger.info(f"\n📊 REPORT SAVED: {json_path}")
+    logger.info(f"✅ PASSED: {report['summary']['passed']}/{report['summary']['total']}")
+    if report['summary']['cached']:
+        logger.info(f"⏭️  CACHED: {report['summary']['cached']} unchanged cases were not re-executed")
+    
+    if report['summary']['failed'] > 0:
+        sys.exit(1)
 
 async def main():
     parser = argparse.ArgumentParser(description="Run Chaos Agent Evaluation Suite")
     parser.add_argument("--suite", type=str, default="assets/evaluations/test_suite.json")
     parser.add_argument("--playbook", type=str, default="assets/playbooks/training.json")
     parser.add_argument("--verbose", action="store_true", help="Show logs in console")
+    parser.add_argument("--concurrency", type=int, default=1, help="Test cases run in parallel (default: 1 = sequential)")
+    parser.add_argument("--llm", choices=sorted(LLM_CONSTRUCTORS), default="gemini", help="'scripted' runs a deterministic offline policy (no model calls)")
+    parser.add_argument("--shard", type=str, default=None, help="Run only shard i of n (e.g. 2/4); merge the reports later with --merge")
+    parser.add_argument("--processes", type=int, default=1, help="Split the suite into N shards run in a process pool and merge them (default: 1)")
+    parser.add_argument("--merge", type=str, nargs="+", default=None, metavar="PATH",
+                        help="Merge shard reports (evaluation_report.json files or directories) into one report")
+    parser.add_argument("--incremental", action="store_true", help="Skip cases that passed before and whose inputs (case, playbook entries used, model, code) did not change")
+    parser.add_argument("--eval-cache", type=str, default=".cache/evaluations", help="Directory of the incremental evaluation cache (default: .cache/evaluations)")
     
     args = parser.parse_args()
+
+    shard = None
+    try:
+        if args.shard:
+            shard = parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
+    if shard and args.processes > 1:
+        parser.error("--shard and --processes are mutually exclusive")
     
 # 1. PREPARAR OBSERVABILIDAD
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
     # ✅ ESTO ES LO CORRECTO: Definir ruta anidada en 'reports'
-    output_dir = project_root / "reports" / "evaluations" / f"eval_{timestamp}"
+    run_name = f"eval_{timestamp}"
+    if shard:
+        run_name += f"_shard{shard[0]}of{shard[1]}"
+    elif args.merge:
+        run_name += "_merged"
+    output_dir = project_root / "reports" / "evaluations" / run_name
     output_dir.mkdir(parents=True, exist_ok=True)
     
     # ✅ FIX: Pasar explícitamente log_dir=str(output_dir)
     # Si falta este argumento, se va a /logs por defecto
     logger = setup_logger("evaluation", verbose=args.verbose, log_dir=str(output_dir))
+
+    # MODO MERGE: no ejecuta nada, solo combina informes de shards
+    if args.merge:
+        logger.info(f"🧩 MERGING SHARD REPORTS: {', '.join(args.merge)}")
+        try:
+            report = merge_reports(load_reports(args.merge), timestamp=timestamp)
+        except ValueError as e:
+            logger.error(f"❌ Cannot merge: {e}")
+            sys.exit(2)
+        _finish(report, output_dir, logger)
+        return
      
     logger.info("="*60)
     logger.info("🕵️‍♂️ AGENT QA EVALUATION STARTED")
@@ -49,32 +111,49 @@ async def main():
     playbook_path = args.playbook
     if not Path(playbook_path).exists(): playbook_path = str(project_root / args.playbook)
 
-    # 2. EJECUTAR
-    runner = EvaluationRunner(agent_playbook=playbook_path)
-    results = await runner.run_suite(str(suite_path))
+    report_meta = {"timestamp": timestamp, "suite": args.suite, "playbook": args.playbook}
+
+    cache_dir = None
+    if args.incremental:
+        cache_dir = args.eval_cache if Path(args.eval_cache).is_absolute() else str(project_root / args.eval_cache)
+        logger.info(f"💾 INCREMENTAL: reusing unchanged passing cases from {cache_dir}")
+
+    # 2a. PROCESS POOL: un shard por proceso (cada uno con su runner y event loop)
+    if args.processes > 1:
+        logger.info(f"🧩 PROCESS POOL: {args.processes} shards")
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            shard_reports = await asyncio.gather(*(
+                loop.run_in_executor(
+                    pool, run_shard_process,
+                    str(suite_path), playbook_path, LLM_CONSTRUCTORS[args.llm],
+                    (index, args.processes), args.concurrency, report_meta, cache_dir
+                )
+                for index in range(1, args.processes + 1)
+            ))
+        _finish(merge_reports(shard_reports, timestamp=timestamp), output_dir, logger)
+        return
+
+    # 2b. EJECUTAR (en este proceso; opcionalmente solo un shard)
+    runner = EvaluationRunner(
+        agent_playbook=playbook_path,
+        llm_client_constructor=LLM_CONSTRUCTORS[args.llm],
+        concurrency=args.concurrency,
+        cache_dir=cache_dir
+    )
+    suite_started = time.perf_counter()
+    results = await runner.run_suite(str(suite_path), shard=shard)
+    wall_time = time.perf_counter() - suite_started
     
     # 3. GENERAR REPORTE JSON (Artefacto de Calidad)
-    report = {
-        "timestamp": timestamp,
-        "suite": args.suite,
-        "playbook": args.playbook,
-        "summary": {
-            "total": len(results),
-            "passed": sum(1 for r in results if r.passed),
-            "failed": sum(1 for r in results if not r.passed)
-        },
-        "results": [r.to_dict() for r in results]
-    }
-    
-    json_path = output_dir / "evaluation_report.json"
-    with open(json_path, 'w') as f:
-        json.dump(report, f, indent=2)
-        
-    logger.info(f"\n📊 REPORT SAVED: {json_path}")
-    logger.info(f"✅ PASSED: {report['summary']['passed']}/{report['summary']['total']}")
-    
-    if report['summary']['failed'] > 0:
-        sys.exit(1)
+    report = build_report(
+        results,
+        concurrency=runner.concurrency,
+        wall_time_s=wall_time,
+        shard=shard,
+        **report_meta
+    )
+    _finish(report, output_dir, logger)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
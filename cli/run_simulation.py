@@ -9,6 +9,7 @@ from pathlib import Path
 from datetime import datetime
 from chaos_engine.core.logging import setup_logger  # ✅ NEW
 from chaos_engine.simulation.parametric import ParametricABTestRunner
+from chaos_engine.simulation.workflow import resolve_workflow
 
 def main():
     parser = argparse.ArgumentParser(description="Run parametric chaos experiments")
@@ -17,8 +18,14 @@ def main():
     parser.add_argument("--experiments-per-rate", type=int, default=5)
     parser.add_argument("--seed", type=int, default=42, help="Base seed for reproducibility (default: 42)")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose logging to console") # ✅ NEW
+    parser.add_argument("--workflow", type=str, default="sequential",
+                        help="Workflow DAG: 'sequential', 'parallel' or path to a workflow JSON (default: sequential)")
+    
+    parser.add_argument("--saga", action="store_true",
+                        help="Add a third arm: no retries + background saga compensations (refund charged payments)")
     
     args = parser.parse_args()
+    workflow = resolve_workflow(args.workflow)
     
 # 1. PREPARAR DIRECTORIO
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -33,7 +40,8 @@ def main():
     logger.info("="*70)
     logger.info(f"Failure Rates: {args.failure_rates}")
     logger.info(f"Experiments per rate: {args.experiments_per_rate}")
-    logger.info(f"Total experiments: {len(args.failure_rates) * args.experiments_per_rate * 2} (Baseline + Playbook)")
+    logger.info(f"Workflow: {workflow.name} {workflow.levels()}")
+    logger.info(f"Total experiments: {len(args.failure_rates) * args.experiments_per_rate * (3 if args.saga else 2)} (Baseline + Playbook{' + Saga' if args.saga else ''})")
     logger.info(f"Output directory: {output_dir}")
     logger.info("="*70 + "\n")
 
@@ -42,7 +50,8 @@ def main():
     print("="*70)
     print(f"Failure Rates: {args.failure_rates}")
     print(f"Experiments per rate: {args.experiments_per_rate}")
-    print(f"Total experiments: {len(args.failure_rates) * args.experiments_per_rate * 2} (Baseline + Playbook)")
+    print(f"Workflow: {workflow.name} {workflow.levels()}")
+    print(f"Total experiments: {len(args.failure_rates) * args.experiments_per_rate * (3 if args.saga else 2)} (Baseline + Playbook{' + Saga' if args.saga else ''})")
     print(f"Output directory: {output_dir}")
     print("="*70 + "\n")
 
@@ -51,7 +60,9 @@ def main():
         experiments_per_rate=args.experiments_per_rate,
         output_dir=output_dir,
         seed=args.seed,
-        logger=logger
+        logger=logger,
+        workflow=workflow,
+        include_saga=args.saga
     )
     
     # Ejecutar
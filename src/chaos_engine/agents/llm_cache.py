@@ -0,0 +1,165 @@
+"""
+RecordReplayLlm - Content-addressed record/replay cache for LLM calls.
+=====================================================================
+Envuelve cualquier BaseLlm de ADK (Gemini, ScriptedPolicyLlm, ...).
+Cada petición se identifica por un fingerprint SHA-256 de la petición
+completa: modelo, system instruction, historial (tool calls + tool
+results), declaraciones de tools y configuración de generación. Los IDs
+aleatorios que ADK asigna a function calls se excluyen.
+
+- Hit  -> se reproducen las respuestas guardadas (0 llamadas al modelo),
+          marcadas con custom_metadata[REPLAY_METADATA_KEY] para que las
+          métricas no las cuenten como llamadas ni tokens reales.
+- Miss -> se llama al modelo interno y se guardan sus respuestas.
+
+Solo se cachean peticiones deterministas: las que fijan temperature == 0
+en su GenerateContentConfig. Una petición sin temperature usa el valor por
+defecto del proveedor (muestreo) y pasa directa al modelo sin cachearse.
+
+Almacén: <cache_dir>/<fp[:2]>/<fp>.json (escritura atómica, seguro entre
+procesos). Re-ejecutar un sweep tras un cambio solo de reporting no
+consume llamadas al modelo.
+
+Modos:
+    "auto"   -> replay si existe, record si no (defecto).
+    "record" -> siempre llama al modelo y sobrescribe.
+    "replay" -> solo replay; un miss lanza CacheMissError.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, AsyncGenerator, Callable, Dict, List, Literal
+
+from pydantic import PrivateAttr
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+CacheMode = Literal["auto", "record", "replay"]
+
+# Marca en LlmResponse.custom_metadata de las respuestas reproducidas
+REPLAY_METADATA_KEY = "llm_cache_replay"
+
+
+def is_replayed(llm_response: LlmResponse) -> bool:
+    """True si la respuesta viene de la caché y no del modelo."""
+    return bool((llm_response.custom_metadata or {}).get(REPLAY_METADATA_KEY))
+
+
+class CacheMissError(RuntimeError):
+    """Petición no encontrada en la caché en modo 'replay'."""
+
+
+def _strip_call_ids(node: Any) -> Any:
+    """Elimina los IDs de function_call/function_response (aleatorios por ejecución)."""
+    if isinstance(node, dict):
+        return {
+            k: _strip_call_ids(v) for k, v in node.items()
+            if not (k == "id" and ("name" in node and ("args" in node or "response" in node)))
+        }
+    if isinstance(node, list):
+        return [_strip_call_ids(v) for v in node]
+    return node
+
+
+def fingerprint_request(llm_request: LlmRequest) -> str:
+    """SHA-256 canónico de una LlmRequest."""
+    config = {}
+    if llm_request.config is not None:
+        config = llm_request.config.model_dump(mode="json", exclude_none=True, exclude={"http_options"})
+    payload = {
+        "model": llm_request.model,
+        "config": config,
+        "contents": [c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents or []],
+    }
+    canonical = json.dumps(_strip_call_ids(payload), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RecordReplayLlm(BaseLlm):
+    """Modelo que graba y reproduce las respuestas de otro modelo."""
+
+    inner: BaseLlm
+    cache_dir: Path
+    mode: CacheMode = "auto"
+
+    _hits: int = PrivateAttr(default=0)
+    _misses: int = PrivateAttr(default=0)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if not self._is_deterministic(llm_request):
+            async for response in self.inner.generate_content_async(llm_request, stream):
+                yield response
+            return
+
+        fingerprint = fingerprint_request(llm_request)
+        entry_path = self.cache_dir / fingerprint[:2] / f"{fingerprint}.json"
+
+        if self.mode != "record" and entry_path.exists():
+            self._hits += 1
+            for data in json.loads(entry_path.read_text(encoding="utf-8")):
+                response = LlmResponse.model_validate(data)
+                response.custom_metadata = {**(response.custom_metadata or {}), REPLAY_METADATA_KEY: True}
+                yield response
+            return
+
+        if self.mode == "replay":
+            raise CacheMissError(f"No recorded response for request {fingerprint[:12]}")
+
+        self._misses += 1
+        recorded: List[Dict[str, Any]] = []
+        async for response in self.inner.generate_content_async(llm_request, stream):
+            if not response.partial:
+                recorded.append(response.model_dump(mode="json", exclude_none=True))
+            yield response
+        self._store(entry_path, recorded)
+
+    @staticmethod
+    def _is_deterministic(llm_request: LlmRequest) -> bool:
+        # ✅ FIX: sin temperature explícita el proveedor muestrea -> no cacheable
+        if llm_request.config is None or llm_request.config.temperature is None:
+            return False
+        return llm_request.config.temperature == 0.0
+
+    @staticmethod
+    def _store(entry_path: Path, recorded: List[Dict[str, Any]]):
+        if not recorded:
+            return
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(recorded, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, entry_path)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Hits/misses de esta instancia."""
+        return {"hits": self._hits, "misses": self._misses}
+
+
+class RecordReplayConstructor:
+    """
+    Adaptador para `PetstoreAgent(llm_client_constructor=...)`.
+
+    Ejemplo:
+        constructor = RecordReplayConstructor(Gemini, "reports/llm_cache")
+        agent = PetstoreAgent(..., llm_client_constructor=constructor, ...)
+    """
+
+    def __init__(self, inner_constructor: Callable[..., BaseLlm], cache_dir: str, mode: CacheMode = "auto"):
+        self.inner_constructor = inner_constructor
+        self.cache_dir = Path(cache_dir)
+        self.mode = mode
+        # En replay puro no se llega a contactar con el modelo real
+        self.requires_api_key = mode != "replay" and getattr(inner_constructor, "requires_api_key", True) is not False
+
+    def __call__(self, model: str, temperature: float = 0.0) -> RecordReplayLlm:
+        return RecordReplayLlm(
+            model=model,
+            inner=self.inner_constructor(model=model, temperature=temperature),
+            cache_dir=self.cache_dir,
+            mode=self.mode,
+        )
@@ -7,8 +7,9 @@ import random
 import json
 from pathlib import Path
 import asyncio
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 from google.adk.models.google_llm import Gemini
+from google.adk.models.base_llm import BaseLlm
 from google.genai import types
 from chaos_engine.chaos.proxy import ChaosProxy 
 from chaos_engine.core.playbook_manager import PlaybookManager
@@ -21,79 +22,7 @@ chaos_proxy = ChaosProxy(failure_rate=0.1, seed=42, mock_mode=False)
 #load previous playbook to resume
 playbook = PlaybookManager("data/playbook_training.json")
  
-#define the opration to get playbooks and addend a new case used during the training.
-def get_playbook():
-    return playbook.get_all()
-
-# Tool 1: GET /store/inventory
-async def get_inventory() -> dict:
-    """Returns a map of status codes to quantities from the store."""
-    return await chaos_proxy.send_request("GET", "/store/inventory")
- 
-# Tool 2: GET /pet/findByStatus
-async def find_pets_by_status(status: str = "available") -> dict:
-    """Finds Pets by status.
-   
-    Args:
-        status: Status values that need to be considered for filter (available, pending, sold).
-    """
-    return await chaos_proxy.send_request("GET", "/pet/findByStatus", params={"status": status})
- 
-# Tool 3: POST /store/order
-async def place_order(pet_id: int, quantity: int) -> dict:
-    """Place an order for a pet.
-   
-    Args:
-        pet_id: ID of the pet that needs to be ordered.
-        quantity: Quantity of the pet to order.
-    """
-    body = {
-        "petId": pet_id,
-        "quantity": quantity,
-        "status": "placed",
-        "complete": False
-    }
-    return await chaos_proxy.send_request("POST", "/store/order", json_body=body)
- 
-# Tool 4: PUT /pet (Update an existing pet)
-async def update_pet_status(pet_id: int, name: str, status: str) -> dict:
-    """Update an existing pet status.
-   
-    Args:
-        pet_id: ID of the pet.
-        name: Name of the pet (required by API).
-        status: New status (available, pending, sold).
-    """
-    body = {
-        "id": pet_id,
-        "name": name,
-        "status": status,
-        "photoUrls": [] # Required by schema
-    }
-    return await chaos_proxy.send_request("PUT", "/pet", json_body=body)
- 
-async def wait_seconds(seconds: float) -> dict:
-    """Pauses execution for a specified number of seconds.
-   
-    Use this when a playbook strategy recommends waiting or backing off
-    before retrying an operation.
-    """
-    print(f"⏳ AGENT WAITING: {seconds}s (Executing Backoff Strategy)...")
-    await asyncio.sleep(seconds)
-    return {"status": "success", "message": f"Waited {seconds} seconds"}
-
-agent=root_agennt= LlmAgent(
-    name="OrderAgent",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=types.HttpRetryOptions(
-            attempts=5,
-            exp_base=7,
-            initial_delay=1,
-            http_status_codes=[429, 500, 503, 504],
-        )
-    ),
-    instruction="""
+ORDER_AGENT_INSTRUCTION = """
 You are the ORDER AGENT.
 
 Your mission is to reliably complete the pet purchase process using the available tools and the recovery playbook.
@@ -147,7 +76,106 @@ At the end, return a simple JSON summary with:
 }
 
 If escalation occurs, set "completed" to false and include a human-readable explanation in "error".
-    """,
-    tools=[get_inventory, find_pets_by_status, place_order, update_pet_status, wait_seconds, get_playbook]
-)
- 
\ No newline at end of file
+    """
+
+
+def default_order_model() -> Gemini:
+    """Gemini con reintentos HTTP para 429/5xx del propio modelo."""
+    return Gemini(
+        model="gemini-2.5-flash-lite",
+        retry_options=types.HttpRetryOptions(
+            attempts=5,
+            exp_base=7,
+            initial_delay=1,
+            http_status_codes=[429, 500, 503, 504],
+        )
+    )
+
+
+def create_order_agent(
+    executor: Any,
+    playbook_manager: PlaybookManager,
+    model: Optional[Union[str, BaseLlm]] = None,
+    name: str = "OrderAgent"
+) -> LlmAgent:
+    """
+    Construye un OrderAgent con sus dependencias inyectadas.
+
+    Las tools son closures sobre `executor` (cualquier objeto con
+    `send_request`, p.ej. ChaosProxy) y `playbook_manager`: varios agentes
+    pueden convivir en el mismo proceso (evaluaciones concurrentes) sin
+    parchear variables globales del módulo.
+    """
+
+    #define the opration to get playbooks and addend a new case used during the training.
+    def get_playbook():
+        return playbook_manager.get_all()
+
+    # Tool 1: GET /store/inventory
+    async def get_inventory() -> dict:
+        """Returns a map of status codes to quantities from the store."""
+        return await executor.send_request("GET", "/store/inventory")
+
+    # Tool 2: GET /pet/findByStatus
+    async def find_pets_by_status(status: str = "available") -> dict:
+        """Finds Pets by status.
+
+        Args:
+            status: Status values that need to be considered for filter (available, pending, sold).
+        """
+        return await executor.send_request("GET", "/pet/findByStatus", params={"status": status})
+
+    # Tool 3: POST /store/order
+    async def place_order(pet_id: int, quantity: int) -> dict:
+        """Place an order for a pet.
+
+        Args:
+            pet_id: ID of the pet that needs to be ordered.
+            quantity: Quantity of the pet to order.
+        """
+        body = {
+            "petId": pet_id,
+            "quantity": quantity,
+            "status": "placed",
+            "complete": False
+        }
+        return await executor.send_request("POST", "/store/order", json_body=body)
+
+    # Tool 4: PUT /pet (Update an existing pet)
+    async def update_pet_status(pet_id: int, name: str, status: str) -> dict:
+        """Update an existing pet status.
+
+        Args:
+            pet_id: ID of the pet.
+            name: Name of the pet (required by API).
+            status: New status (available, pending, sold).
+        """
+        body = {
+            "id": pet_id,
+            "name": name,
+            "status": status,
+            "photoUrls": [] # Required by schema
+        }
+        return await executor.send_request("PUT", "/pet", json_body=body)
+
+    return LlmAgent(
+        name=name,
+        model=model if model is not None else default_order_model(),
+        instruction=ORDER_AGENT_INSTRUCTION,
+        tools=[get_inventory, find_pets_by_status, place_order, update_pet_status, wait_seconds, get_playbook]
+    )
+
+
+async def wait_seconds(seconds: float) -> dict:
+    """Pauses execution for a specified number of seconds.
+   
+    Use this when a playbook strategy recommends waiting or backing off
+    before retrying an operation.
+    """
+    print(f"⏳ AGENT WAITING: {seconds}s (Executing Backoff Strategy)...")
+    await asyncio.sleep(seconds)
+    return {"status": "success", "message": f"Waited {seconds} seconds"}
+
+
+# Agente por defecto del módulo (convención de AgentEvaluator: `agent` / `root_agent`)
+agent = root_agent = create_order_agent(chaos_proxy, playbook)
@@ -10,7 +10,10 @@ import json
 import time
 import os
 import logging
-from typing import Dict, Any, Set, Protocol, runtime_checkable, Optional, List, Type
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Any, Set, Protocol, runtime_checkable, Optional, List, Tuple, Type
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -18,11 +21,15 @@ from dotenv import load_dotenv
 from google.adk.agents import LlmAgent
 from google.adk.models.google_llm import Gemini
 from google.adk.runners import InMemoryRunner
+from google.genai import types
 
 # Core Logic
 # Importamos la implementación para tipado
 from chaos_engine.chaos.proxy import ChaosProxy 
 from chaos_engine.core.config import load_config, get_model_name
+from chaos_engine.core.playbook_manager import CompiledPlaybook, load_compiled_playbook
+from chaos_engine.agents.rate_limited_llm import QUOTA_WAIT_LISTENER
+from chaos_engine.agents.llm_cache import is_replayed
 
 # ====================================================================
 # ✅ PILAR III: PROTOCOLOS DE INTERFAZ (Contratos)
@@ -38,6 +45,113 @@ class LLMClientConstructor(Protocol):
     def __call__(self, model: str, temperature: float) -> Gemini: ...
 
 
+# ====================================================================
+# ✅ INSTRUCCIÓN ESTÁTICA (se renderiza una vez; el Order ID va en el mensaje)
+# ====================================================================
+
+_PETSTORE_INSTRUCTION_TEMPLATE = """
+            SYSTEM ROLE: DETERMINISTIC WORKFLOW ENGINE
+            You are not a chat assistant. You are a robotic process execution engine.
+            The Order ID is provided in the user message.
+
+            ====================
+            EXECUTION PROTOCOL (PRIMARY FLOW)
+            ====================
+            You MUST execute the following 4 tools in STRICT SEQUENCE.
+            You MUST use the EXACT parameters defined below. Do not guess.
+
+            1. CALL `get_inventory()`
+            - Verify stock levels.
+
+            2. CALL `find_pets_by_status(status='available')`
+            - CRITICAL: You MUST explicitly provide `status='available'`.
+            - From the result, EXTRACT the first `id` and `name`.
+
+            3. CALL `place_order(pet_id=..., quantity=1)`
+            - Use the `id` from Step 2.
+            - CRITICAL: You MUST explicitly provide `quantity=1`.
+
+            4. CALL `update_pet_status(pet_id=..., status='sold', name=...)`
+            - Use the `id` and `name` from Step 2.
+            - CRITICAL: You MUST explicitly provide `status='sold'`.
+
+            ==============================================
+             ERROR HANDLING (CONDITIONAL CHAOS RESPONSE)
+            ==============================================
+            If AND ONLY IF the last API tool call (Steps 1-4) returns an error status:
+            1. IMMEDIATELY call `lookup_playbook(tool_name, error_code)`.
+            2. OBEY the playbook strategy strictly:
+            - If "Retry": Call the failed tool again.
+            - If "Wait": Call `wait_seconds(seconds)`.
+            - If "Escalate": Call `report_workflow_failure`.
+{native_recovery_clause}
+            ====================
+            FINAL OUTPUT FORMAT
+            ====================
+            Upon successful completion of Step 4, you MUST output a Single Raw JSON Object.
+            DO NOT use Markdown code blocks (no ```json).
+            DO NOT add conversational text.
+            Output EXACTLY this structure:
+
+            
+            "selected_pet_id": <integer_id>,
+            "completed": true,
+            "error": null
+            
+            """
+
+# ✅ FIX: Solo la variante con recuperación nativa (PlaybookStrategyProxy) recibe esta
+# cláusula: el prompt base (y las huellas del record/replay) no cambian.
+NATIVE_RECOVERY_CLAUSE = """            If the error response contains `"playbook_applied": true`, the playbook
+            strategy was ALREADY executed: call `report_workflow_failure` directly.
+"""
+
+PETSTORE_INSTRUCTION = _PETSTORE_INSTRUCTION_TEMPLATE.replace("{native_recovery_clause}", "")
+PETSTORE_NATIVE_RECOVERY_INSTRUCTION = _PETSTORE_INSTRUCTION_TEMPLATE.replace(
+    "{native_recovery_clause}", NATIVE_RECOVERY_CLAUSE
+)
+
+_SESSION_USER_ID = "chaos_lab"
+
+
+# Contabilidad por experimento: coste (llamadas/tokens) y reparto de la latencia.
+# quota_wait_ms = bloqueado en el RateLimitedScheduler (fuera de model_ms y duration_ms)
+# model_calls/tokens: solo llamadas reales; las respuestas reproducidas por
+# RecordReplayLlm se cuentan aparte en model_cache_hits
+METRIC_FIELDS = ("model_calls", "prompt_tokens", "completion_tokens", "model_ms", "tool_ms", "wait_ms",
+                 "quota_wait_ms", "tool_retries", "model_cache_hits")
+
+
+@dataclass
+class _ExperimentBinding:
+    """Estado de UN experimento sobre un PetstoreAgent (posiblemente compartido)."""
+    agent: "PetstoreAgent"
+    executor: ToolExecutor
+    successful_steps: Set[str] = field(default_factory=set)
+    failed_requests: Set[Any] = field(default_factory=set)  # (método, endpoint) que ya fallaron
+    playbook_lookups: Set[Tuple[str, str]] = field(default_factory=set)  # Entradas del playbook consultadas
+    metrics: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(METRIC_FIELDS, 0))
+    model_started: Optional[float] = None
+    model_quota_mark: float = 0.0  # quota_wait_ms al empezar la llamada al modelo en curso
+    virtual_seconds: float = 0.0  # Esperas simuladas (mock mode): avanzan el reloj sin bloquear
+
+    def add_quota_wait(self, ms: float):
+        """Listener de RateLimitedLlm (QUOTA_WAIT_LISTENER)."""
+        self.metrics["quota_wait_ms"] += ms
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            **{
+                name: round(value, 2) if name.endswith("_ms") else int(value)
+                for name, value in self.metrics.items()
+            },
+            "playbook_lookups": sorted([tool, code] for tool, code in self.playbook_lookups)
+        }
+
+
+_CURRENT_EXPERIMENT: ContextVar[Optional[_ExperimentBinding]] = ContextVar("petstore_experiment", default=None)
+
+
 class PetstoreAgent:
     """
     Agente que opera sobre la API real de Petstore v3 a través de un ChaosProxy.
@@ -50,60 +164,181 @@ class PetstoreAgent:
         llm_client_constructor: Type[Gemini],    
         model_name: str,
         verbose: bool = False,
-        mock_mode: bool = None 
+        mock_mode: bool = None,
+        native_recovery: bool = False
     ):
         # 1. CARGA EXPLÍCITA DE CREDENCIALES Y CONFIG
         load_dotenv() 
-        if not os.getenv("GOOGLE_API_KEY"):
+        # Modelos offline (p.ej. ScriptedPolicyLlm) declaran requires_api_key = False
+        if getattr(llm_client_constructor, "requires_api_key", True) is not False and not os.getenv("GOOGLE_API_KEY"):
              raise ValueError("❌ CRITICAL: GOOGLE_API_KEY not found.")
 
         # 2. ASIGNACIÓN DE DEPENDENCIAS
-        self.executor = tool_executor
+        self._executor = tool_executor
         self.llm_client_constructor = llm_client_constructor
         self.model_name = model_name
         self.verbose = verbose
         self.logger = logging.getLogger("PetstoreAgent")
         self.mock_mode = mock_mode 
+        # El executor aplica el playbook (PlaybookStrategyProxy): instrucción propia
+        self.native_recovery = native_recovery
 
         # 3. CARGA DE DATOS Y ESTADO
         self.playbook_path = playbook_path
-        self.playbook_data = self._load_playbook()
-        self.successful_steps: Set[str] = set()
+        self.playbook = self._load_playbook()
+        self.playbook_data = self.playbook.raw
+        self._successful_steps: Set[str] = set()
+        self._runner: Optional[InMemoryRunner] = None
+
+    # ====================================================================
+    # ✅ ESTADO POR EXPERIMENTO (ContextVar si hay process_order en curso)
+    # ====================================================================
+
+    def _binding(self) -> Optional[_ExperimentBinding]:
+        binding = _CURRENT_EXPERIMENT.get()
+        return binding if binding is not None and binding.agent is self else None
+
+    @property
+    def executor(self) -> ToolExecutor:
+        binding = self._binding()
+        return binding.executor if binding else self._executor
+
+    @executor.setter
+    def executor(self, value: ToolExecutor):
+        self._executor = value
+
+    @property
+    def successful_steps(self) -> Set[str]:
+        binding = self._binding()
+        return binding.successful_steps if binding else self._successful_steps
 
-    def _load_playbook(self) -> Dict:
+    @successful_steps.setter
+    def successful_steps(self, value: Set[str]):
+        self._successful_steps = value
+
+    def _load_playbook(self) -> CompiledPlaybook:
+        # ✅ Playbook compilado y compartido (cacheado por ruta + mtime)
         try:
-            return json.load(open(self.playbook_path, 'r', encoding='utf-8'))
+            return load_compiled_playbook(self.playbook_path)
         except Exception as e:
             self.logger.error(f"⚠️ Error loading playbook {self.playbook_path}: {e}")
-            return {}
+            return CompiledPlaybook({})
 
     # ====================================================================
     # ✅ FIX: HERRAMIENTAS COMO MÉTODOS (Pilar I: Mantenibilidad Cognitiva)
     # ====================================================================
 
+    # ====================================================================
+    # ✅ RELOJ DEL EXPERIMENTO (virtual en mock mode)
+    # ====================================================================
+
+    def now(self) -> float:
+        """Reloj monotónico del experimento en curso, incluidas las esperas virtuales."""
+        binding = self._binding()
+        return time.perf_counter() + (binding.virtual_seconds if binding else 0.0)
+
+    async def sleep(self, seconds: float):
+        """
+        Espera de backoff. En mock mode no bloquea: avanza el reloj virtual del
+        experimento (que se suma a duration_ms). También la usa el intérprete
+        nativo del playbook (PlaybookStrategyProxy(sleep=agent.sleep)).
+
+        Todo lo dormido cuenta como wait_ms; si ocurre dentro de una llamada a
+        tool (backoff nativo), `_send` lo descuenta de tool_ms.
+        """
+        binding = self._binding()
+        started = self.now()
+        try:
+            if self.mock_mode and binding is not None:
+                binding.virtual_seconds += max(0.0, seconds)
+                await asyncio.sleep(0)  # Cede el control igualmente
+                return
+            await asyncio.sleep(seconds)
+        finally:
+            self._add_metric("wait_ms", (self.now() - started) * 1000)
+
+    def record_tool_retry(self):
+        """Reintento hecho bajo la tool (PlaybookStrategyProxy(on_retry=agent.record_tool_retry))."""
+        self._add_metric("tool_retries", 1)
+
+    def _add_metric(self, name: str, value: float):
+        binding = self._binding()
+        if binding is not None:
+            binding.metrics[name] += value
+
+    async def _send(self, *args, **kwargs) -> Dict[str, Any]:
+        """Llamada al executor cronometrada como tiempo en tools (y reintentos tras un fallo)."""
+        binding = self._binding()
+        request_key = args[:2]
+        if binding is not None and request_key in binding.failed_requests:
+            binding.metrics["tool_retries"] += 1
+        started = self.now()
+        wait_mark = binding.metrics["wait_ms"] if binding is not None else 0.0
+        result = None
+        try:
+            result = await self.executor.send_request(*args, **kwargs)
+            return result
+        finally:
+            # ✅ FIX: El backoff nativo dentro del executor es espera, no tiempo en tools
+            waited_ms = binding.metrics["wait_ms"] - wait_mark if binding is not None else 0.0
+            self._add_metric("tool_ms", (self.now() - started) * 1000 - waited_ms)
+            if binding is not None and (result is None or result.get("status") != "success"):
+                binding.failed_requests.add(request_key)
+
+    # ====================================================================
+    # ✅ CALLBACKS ADK: llamadas al modelo, tokens y tiempo en el modelo
+    # ====================================================================
+
+    def _before_model(self, callback_context, llm_request):
+        binding = self._binding()
+        if binding is not None:
+            binding.model_started = self.now()
+            binding.model_quota_mark = binding.metrics["quota_wait_ms"]
+        return None
+
+    def _after_model(self, callback_context, llm_response):
+        binding = self._binding()
+        if binding is None:
+            return None
+        if binding.model_started is not None:
+            # ✅ FIX: La espera de cuota dentro de la llamada no es tiempo del modelo
+            quota_ms = binding.metrics["quota_wait_ms"] - binding.model_quota_mark
+            binding.metrics["model_ms"] += (self.now() - binding.model_started) * 1000 - quota_ms
+            binding.model_started = None
+        # ✅ FIX: Un replay de la caché no es una llamada al modelo ni consume tokens
+        if is_replayed(llm_response):
+            binding.metrics["model_cache_hits"] += 1
+            return None
+        binding.metrics["model_calls"] += 1
+        usage = getattr(llm_response, "usage_metadata", None)
+        if usage is not None:
+            binding.metrics["prompt_tokens"] += usage.prompt_token_count or 0
+            binding.metrics["completion_tokens"] += usage.candidates_token_count or 0
+        return None
+
     async def get_inventory(self) -> dict:
         """Returns a map of status codes to quantities."""
-        res = await self.executor.send_request("GET", "/store/inventory")
+        res = await self._send("GET", "/store/inventory")
         if res.get("status") == "success": self.successful_steps.add("get_inventory")
         return res
 
     async def find_pets_by_status(self, status: str = "available") -> dict:
         """Finds Pets by status."""
-        res = await self.executor.send_request("GET", "/pet/findByStatus", params={"status": status})
+        res = await self._send("GET", "/pet/findByStatus", params={"status": status})
         if res.get("status") == "success": self.successful_steps.add("find_pets_by_status")
         return res
 
     async def place_order(self, pet_id: int, quantity: int) -> dict:
         """Place an order for a pet. REQUIRES valid pet_id from find_pets."""
         body = {"petId": pet_id, "quantity": quantity, "status": "placed", "complete": False}
-        res = await self.executor.send_request("POST", "/store/order", json_body=body)
+        res = await self._send("POST", "/store/order", json_body=body)
         if res.get("status") == "success": self.successful_steps.add("place_order")
         return res
 
     async def update_pet_status(self, pet_id: int, name: str, status: str) -> dict:
         """Update pet status. REQUIRES valid pet_id."""
         body = {"id": pet_id, "name": name, "status": status, "photoUrls": []}
-        res = await self.executor.send_request("PUT", "/pet", json_body=body)
+        res = await self._send("PUT", "/pet", json_body=body)
         if res.get("status") == "success": self.successful_steps.add("update_pet_status")
         return res
 
@@ -120,8 +355,8 @@ class PetstoreAgent:
         if self.verbose: 
             self.logger.info(f"⏳ WAIT STRATEGY: Base {seconds:.2f}s -> Jittered {jittered_seconds:.2f}s")
         
-        # Usar el tiempo aleatorio
-        await asyncio.sleep(jittered_seconds) 
+        # Usar el tiempo aleatorio (virtual en mock mode; sleep() lo suma a wait_ms)
+        await self.sleep(jittered_seconds) 
         
         # Reportar el tiempo real usado
         return {"status": "success", "message": f"Waited {jittered_seconds:.2f} seconds"}
@@ -129,12 +364,13 @@ class PetstoreAgent:
     async def lookup_playbook(self, tool_name: str, error_code: str) -> Dict[str, Any]:
         """Consults the Chaos Playbook."""
         if self.verbose: self.logger.info(f"📖 PLAYBOOK LOOKUP: {tool_name} -> {error_code}")
-        tool_config = self.playbook_data.get(tool_name, {})
-        strategy = tool_config.get(str(error_code))
+        binding = self._binding()
+        if binding is not None:
+            binding.playbook_lookups.add((str(tool_name), str(error_code)))
+        strategy = self.playbook.lookup(tool_name, error_code)
         if strategy:
             return {"status": "success", "found": True, "recommendation": strategy}
-        default = self.playbook_data.get("default")
-        return {"status": "success", "found": False, "recommendation": default}
+        return {"status": "success", "found": False, "recommendation": self.playbook.default}
 
     async def report_workflow_failure(self, reason: str = "Unknown failure") -> dict:
         """Call if you cannot proceed."""
@@ -152,90 +388,81 @@ class PetstoreAgent:
     # ✅ FIX: process_order (Lógica de Éxito Determinista)
     # ====================================================================
 
-    async def process_order(self, order_id: str, failure_rate: float, seed: int) -> Dict[str, Any]:
-        
-        self.successful_steps = set() # Reinicio de estado
-        
-        adk_agent = LlmAgent(
-            name="PetstoreChaosAgent",
-            model=self.llm_client_constructor(model=self.model_name, temperature=0.0), 
-            instruction=f"""
-            SYSTEM ROLE: DETERMINISTIC WORKFLOW ENGINE
-            You are not a chat assistant. You are a robotic process execution engine.
-            Order ID: {order_id}
-
-            ====================
-            EXECUTION PROTOCOL (PRIMARY FLOW)
-            ====================
-            You MUST execute the following 4 tools in STRICT SEQUENCE.
-            You MUST use the EXACT parameters defined below. Do not guess.
-
-            1. CALL `get_inventory()`
-            - Verify stock levels.
-
-            2. CALL `find_pets_by_status(status='available')`
-            - CRITICAL: You MUST explicitly provide `status='available'`.
-            - From the result, EXTRACT the first `id` and `name`.
-
-            3. CALL `place_order(pet_id=..., quantity=1)`
-            - Use the `id` from Step 2.
-            - CRITICAL: You MUST explicitly provide `quantity=1`.
-
-            4. CALL `update_pet_status(pet_id=..., status='sold', name=...)`
-            - Use the `id` and `name` from Step 2.
-            - CRITICAL: You MUST explicitly provide `status='sold'`.
-
-            ==============================================
-             ERROR HANDLING (CONDITIONAL CHAOS RESPONSE)
-            ==============================================
-            If AND ONLY IF the last API tool call (Steps 1-4) returns an error status:
-            1. IMMEDIATELY call `lookup_playbook(tool_name, error_code)`.
-            2. OBEY the playbook strategy strictly:
-            - If "Retry": Call the failed tool again.
-            - If "Wait": Call `wait_seconds(seconds)`.
-            - If "Escalate": Call `report_workflow_failure`.
-
-            ====================
-            FINAL OUTPUT FORMAT
-            ====================
-            Upon successful completion of Step 4, you MUST output a Single Raw JSON Object.
-            DO NOT use Markdown code blocks (no ```json).
-            DO NOT add conversational text.
-            Output EXACTLY this structure:
-
-            
-            "selected_pet_id": <integer_id>,
-            "completed": true,
-            "error": null
-            
-            """,
-            tools=self.get_tool_list()
-        )
+    def _get_runner(self) -> InMemoryRunner:
+        """Construye el LlmAgent + runner una sola vez por instancia (instrucción estática)."""
+        if self._runner is None:
+            adk_agent = LlmAgent(
+                name="PetstoreChaosAgent",
+                model=self.llm_client_constructor(model=self.model_name, temperature=0.0),
+                instruction=PETSTORE_NATIVE_RECOVERY_INSTRUCTION if self.native_recovery else PETSTORE_INSTRUCTION,
+                tools=self.get_tool_list(),
+                # temperature=0 explícita: decisiones reproducibles y cacheables por RecordReplayLlm
+                generate_content_config=types.GenerateContentConfig(temperature=0.0),
+                before_model_callback=self._before_model,
+                after_model_callback=self._after_model
+            )
+            self._runner = InMemoryRunner(agent=adk_agent, app_name="chaos_playbook")
+        return self._runner
+
+    async def _release_session(self, runner: InMemoryRunner, session_id: str):
+        """Elimina la sesión terminada para que el runner compartido no acumule historiales."""
+        try:
+            await runner.session_service.delete_session(
+                app_name=runner.app_name, user_id=_SESSION_USER_ID, session_id=session_id
+            )
+        except Exception as e:
+            self.logger.debug(f"Session cleanup skipped for {session_id}: {e}")
+
+    async def process_order(
+        self,
+        order_id: str,
+        failure_rate: float,
+        seed: int,
+        executor: Optional[ToolExecutor] = None
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta el workflow completo para un pedido.
 
-        runner = InMemoryRunner(agent=adk_agent, app_name="chaos_playbook")
+        `executor` permite que varios experimentos compartan este agente
+        (ver AgentPool): cada llamada usa su propio executor y su propio
+        registro de pasos, aislados mediante un ContextVar.
+        """
+        
+        # ✅ Binding por experimento: executor + pasos propios, el grafo ADK se reutiliza
+        runner = self._get_runner()
+        binding = _ExperimentBinding(self, executor if executor is not None else self._executor)
+        token = _CURRENT_EXPERIMENT.set(binding)
+        quota_token = QUOTA_WAIT_LISTENER.set(binding.add_quota_wait)
+        session_id = f"{order_id}-{uuid.uuid4().hex[:8]}"
         start_time = time.time()
         
         # 🚨 FIX ESTRUCTURAL: El try-except debe envolver el bloque de ejecución, no la definición.
         try:
             # Le damos un empujón inicial claro
-            await runner.run_debug(f"Inicia la secuencia obligatoria para {order_id}. Llama a la herramienta 1 (get_inventory).")
+            await runner.run_debug(
+                f"Order ID: {order_id}. Inicia la secuencia obligatoria para {order_id}. Llama a la herramienta 1 (get_inventory).",
+                user_id=_SESSION_USER_ID,
+                session_id=session_id
+            )
             
-            duration_ms = (time.time() - start_time) * 1000
+            duration_ms = (time.time() - start_time + binding.virtual_seconds) * 1000 - binding.metrics["quota_wait_ms"]
             
             # ✅ VALIDACIÓN DE ÉXITO FINAL (Código Python, no LLM)
             REQUIRED_STEPS = {"get_inventory", "find_pets_by_status", "place_order", "update_pet_status"}
-            is_complete = REQUIRED_STEPS.issubset(self.successful_steps)
+            is_complete = REQUIRED_STEPS.issubset(binding.successful_steps)
             
             status = "success" if is_complete else "failure"
             
             if self.verbose:
-                print(f"🔍 DEBUG: Pasos completados: {len(self.successful_steps)}/4 -> {status}")
+                print(f"🔍 DEBUG: Pasos completados: {len(binding.successful_steps)}/4 -> {status}")
             
             return {
                 "status": status,
-                "steps_completed": list(self.successful_steps), 
+                "steps_completed": list(binding.successful_steps), 
                 "failed_at": "unknown" if status == "success" else "incomplete_workflow",
-                "duration_ms": duration_ms
+                "duration_ms": duration_ms,
+                "virtual_ms": round(binding.virtual_seconds * 1000, 2),
+                **binding.report()
             }
 
         except Exception as e:
@@ -243,8 +470,15 @@ class PetstoreAgent:
             if self.verbose: self.logger.error(f"❌ Excepción en runner: {e}")
             return {
                 "status": "failure",
-                "steps_completed": list(self.successful_steps), 
+                "steps_completed": list(binding.successful_steps), 
                 "failed_at": "exception",
                 "error": str(e),
-                "duration_ms": 0.0
-            }
\ No newline at end of file
+                "duration_ms": 0.0,
+                "virtual_ms": round(binding.virtual_seconds * 1000, 2),
+                **binding.report()
+            }
+        finally:
+            QUOTA_WAIT_LISTENER.reset(quota_token)
+            _CURRENT_EXPERIMENT.reset(token)
+            self._successful_steps = binding.successful_steps
+            await self._release_session(runner, session_id)
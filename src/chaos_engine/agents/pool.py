@@ -0,0 +1,72 @@
+"""
+AgentPool - Shared PetstoreAgent graphs for experiment sweeps.
+==============================================================
+Construir un PetstoreAgent implica cargar el playbook, instanciar el
+cliente del modelo, el LlmAgent (declaraciones de tools) y el runner.
+El pool lo hace UNA vez por (playbook, modelo, constructor LLM, variante de
+instrucción); cada
+experimento solo aporta su executor y obtiene una sesión nueva:
+
+    pool = AgentPool()
+    agent = pool.get("assets/playbooks/training.json", Gemini, "gemini-2.5-flash-lite")
+    result = await agent.process_order(order_id, rate, seed, executor=chaos_chain)
+
+Los experimentos concurrentes sobre el mismo agente están aislados
+(executor y pasos completados viven en un ContextVar por process_order).
+"""
+
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from chaos_engine.agents.petstore import PetstoreAgent, LLMClientConstructor
+
+
+class AgentPool:
+    """Cache de PetstoreAgent por (playbook, modelo, constructor LLM, recuperación nativa)."""
+
+    def __init__(self, verbose: bool = False, mock_mode: Optional[bool] = None):
+        self.verbose = verbose
+        self.mock_mode = mock_mode
+        self._agents: Dict[Tuple[str, str, Any, bool], PetstoreAgent] = {}
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger("AgentPool")
+
+    def get(
+        self,
+        playbook_path: str,
+        llm_client_constructor: LLMClientConstructor,
+        model_name: str,
+        native_recovery: bool = False
+    ) -> PetstoreAgent:
+        """
+        Devuelve el agente compartido para esta configuración (lo crea si no existe).
+
+        El agente se crea sin executor: pásalo en cada `process_order(..., executor=...)`.
+        """
+        key = (str(Path(playbook_path).resolve()), model_name, llm_client_constructor, native_recovery)
+        agent = self._agents.get(key)
+        if agent is not None:
+            self.hits += 1
+            return agent
+
+        self.misses += 1
+        agent = PetstoreAgent(
+            playbook_path=playbook_path,
+            tool_executor=None,
+            llm_client_constructor=llm_client_constructor,
+            model_name=model_name,
+            verbose=self.verbose,
+            mock_mode=self.mock_mode,
+            native_recovery=native_recovery
+        )
+        self._agents[key] = agent
+        self.logger.debug(f"🧩 AgentPool: built agent for {Path(playbook_path).name} / {model_name}")
+        return agent
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"agents": len(self._agents), "hits": self.hits, "misses": self.misses}
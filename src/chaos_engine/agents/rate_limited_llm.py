@@ -0,0 +1,97 @@
+"""
+RateLimitedLlm - Quota-aware wrapper for any ADK BaseLlm.
+=========================================================
+Cada llamada al modelo pasa por un `RateLimitedScheduler` compartido:
+espera exactamente la cuota RPM/TPM disponible, registra los tokens reales
+(usage_metadata) y, ante un 429, pausa a todos los experimentos y repite
+la llamada en el sitio (sin perder el progreso del agente).
+
+Uso:
+    scheduler = RateLimitedScheduler(requests_per_minute=15, max_concurrency=4)
+    constructor = RateLimitedConstructor(Gemini, scheduler)
+    agent = PetstoreAgent(..., llm_client_constructor=constructor, ...)
+
+El tiempo bloqueado esperando cuota NO es tiempo del modelo: se notifica al
+listener del experimento en curso (`QUOTA_WAIT_LISTENER`, ms) para que lo
+contabilice aparte (quota_wait_ms) y lo descuente de model_ms/duration_ms.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import AsyncGenerator, Callable, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from chaos_engine.core.rate_limiter import (
+    RateLimitExceeded,
+    RateLimitedScheduler,
+    is_rate_limit_error,
+    parse_retry_after,
+)
+
+# Listener del experimento en curso: recibe los ms bloqueados en scheduler.acquire()
+QUOTA_WAIT_LISTENER: ContextVar[Optional[Callable[[float], None]]] = ContextVar(
+    "quota_wait_listener", default=None
+)
+
+
+class RateLimitedLlm(BaseLlm):
+    """Modelo que regula las llamadas de otro modelo con un RateLimitedScheduler."""
+
+    inner: BaseLlm
+    scheduler: RateLimitedScheduler
+    temperature: float = 0.0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        attempt = 0
+        while True:
+            wait_started = time.perf_counter()
+            reserved = await self.scheduler.acquire()
+            listener = QUOTA_WAIT_LISTENER.get()
+            if listener is not None:
+                listener((time.perf_counter() - wait_started) * 1000)
+            tokens = 0
+            yielded = False
+            try:
+                async for response in self.inner.generate_content_async(llm_request, stream):
+                    usage = response.usage_metadata
+                    if usage is not None and usage.total_token_count:
+                        tokens = usage.total_token_count
+                    yielded = True
+                    yield response
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                retry_after = parse_retry_after(e)
+                self.scheduler.report_rate_limit(retry_after)
+                # Solo repetimos si el agente aún no ha visto ninguna respuesta parcial
+                if yielded or attempt >= self.scheduler.max_retries:
+                    raise RateLimitExceeded(str(e), retry_after=retry_after) from e
+                attempt += 1
+                continue
+            finally:
+                self.scheduler.record_usage(tokens, reserved)
+
+            self.scheduler.report_success()
+            return
+
+
+class RateLimitedConstructor:
+    """Adaptador para `PetstoreAgent(llm_client_constructor=...)`."""
+
+    def __init__(self, inner_constructor: Callable[..., BaseLlm], scheduler: RateLimitedScheduler):
+        self.inner_constructor = inner_constructor
+        self.scheduler = scheduler
+        self.requires_api_key = getattr(inner_constructor, "requires_api_key", True)
+
+    def __call__(self, model: str, temperature: float = 0.0) -> RateLimitedLlm:
+        return RateLimitedLlm(
+            model=model,
+            inner=self.inner_constructor(model=model, temperature=temperature),
+            scheduler=self.scheduler,
+            temperature=temperature,
+        )
@@ -0,0 +1,171 @@
+"""
+ScriptedPolicyLlm - Deterministic, offline drop-in model for PetstoreAgent.
+===========================================================================
+Implementa el contrato BaseLlm de ADK, así que ocupa el mismo hueco que
+Gemini en `LlmAgent(model=...)` y recorre el camino completo de ADK
+(tool calling, sesiones, eventos) sin red ni GOOGLE_API_KEY.
+
+La política sigue literalmente el prompt de `PetstoreAgent.process_order`:
+1. Protocolo de 4 pasos: get_inventory -> find_pets_by_status('available')
+   -> place_order(pet_id, quantity=1) -> update_pet_status(pet_id, 'sold', name).
+2. Si una tool de API devuelve error -> lookup_playbook(tool_name, error_code).
+   Si el error trae `playbook_applied` (recuperación nativa en el executor)
+   -> report_workflow_failure directamente.
+3. Obedece la recomendación:
+   - retry*           -> repetir la tool fallida.
+   - wait*/*backoff   -> wait_seconds(delay) y después repetir.
+   - fail*/escalate*  -> report_workflow_failure(reason).
+   - serve_cached     -> report_workflow_failure (solo la aplica el executor
+                         nativo con caché; ver PlaybookStrategyProxy).
+   Respeta `config.max_retries` (por defecto 3).
+4. Tras el paso 4, emite el JSON final.
+
+Uso:
+    agent = PetstoreAgent(..., llm_client_constructor=ScriptedPolicyLlm, ...)
+"""
+
+import json
+from typing import Any, AsyncGenerator, ClassVar, Dict, List, Optional, Tuple
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from chaos_engine.core.playbook_manager import DEFAULT_MAX_RETRIES, strategy_delay
+
+API_STEPS: Tuple[str, ...] = ("get_inventory", "find_pets_by_status", "place_order", "update_pet_status")
+
+
+class ScriptedPolicyLlm(BaseLlm):
+    """Modelo determinista basado en reglas (sin red) para runs masivos del agente."""
+
+    model: str = "scripted-policy"
+    temperature: float = 0.0
+
+    # PetstoreAgent no exige GOOGLE_API_KEY para este constructor
+    requires_api_key: ClassVar[bool] = False
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r"scripted-.*"]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        yield self._decide(llm_request.contents or [])
+
+    # ====================================================================
+    # POLÍTICA
+    # ====================================================================
+
+    def _decide(self, contents: List[types.Content]) -> LlmResponse:
+        calls, responses = self._read_history(contents)
+
+        if not responses:
+            return self._call("get_inventory", {})
+
+        last_name, last_response = responses[-1]
+
+        if last_name in API_STEPS:
+            if last_response.get("status") == "error" and last_response.get("playbook_applied"):
+                # El executor ya aplicó la estrategia del playbook (PlaybookStrategyProxy)
+                return self._call("report_workflow_failure", {"reason": f"{last_name}: {last_response.get('message', 'recovery exhausted')}"})
+            if last_response.get("status") == "error":
+                return self._call("lookup_playbook", {
+                    "tool_name": last_name,
+                    "error_code": str(last_response.get("code", "unknown")),
+                })
+            return self._next_step(last_name, responses)
+
+        if last_name == "lookup_playbook":
+            failed_tool = self._last_args(calls, "lookup_playbook").get("tool_name", "")
+            return self._apply_strategy(failed_tool, last_response.get("recommendation"), calls)
+
+        if last_name == "wait_seconds":
+            failed_tool = self._last_args(calls, "lookup_playbook").get("tool_name", "")
+            return self._call(failed_tool, self._last_args(calls, failed_tool))
+
+        if last_name == "report_workflow_failure":
+            reason = self._last_args(calls, "report_workflow_failure").get("reason")
+            return self._final(None, completed=False, error=reason)
+
+        return self._final(None, completed=False, error=f"Unexpected tool: {last_name}")
+
+    def _next_step(self, completed_tool: str, responses: List[Tuple[str, Dict]]) -> LlmResponse:
+        pet_id, pet_name = self._selected_pet(responses)
+
+        if completed_tool == "get_inventory":
+            return self._call("find_pets_by_status", {"status": "available"})
+        if completed_tool == "find_pets_by_status":
+            if pet_id is None:
+                return self._call("report_workflow_failure", {"reason": "No available pets returned"})
+            return self._call("place_order", {"pet_id": pet_id, "quantity": 1})
+        if completed_tool == "place_order":
+            return self._call("update_pet_status", {"pet_id": pet_id, "status": "sold", "name": pet_name})
+        return self._final(pet_id, completed=True, error=None)
+
+    def _apply_strategy(self, failed_tool: str, recommendation: Optional[Dict], calls: List[Tuple[str, Dict]]) -> LlmResponse:
+        recommendation = recommendation or {}
+        strategy = str(recommendation.get("strategy", "fail")).lower()
+        config = recommendation.get("config") or {}
+        retries_done = sum(1 for name, _ in calls if name == failed_tool) - 1
+        max_retries = config.get("max_retries", DEFAULT_MAX_RETRIES)
+
+        if strategy.startswith(("fail", "escalate", "serve_cached")) or failed_tool not in API_STEPS:
+            return self._call("report_workflow_failure", {"reason": f"{failed_tool}: playbook strategy '{strategy}'"})
+        if retries_done >= max_retries:
+            return self._call("report_workflow_failure", {"reason": f"{failed_tool}: max_retries ({max_retries}) exhausted"})
+
+        delay = strategy_delay(strategy, config, retries_done)
+        if delay > 0:
+            return self._call("wait_seconds", {"seconds": delay})
+        return self._call(failed_tool, self._last_args(calls, failed_tool))
+
+    # ====================================================================
+    # LECTURA DEL HISTORIAL
+    # ====================================================================
+
+    @staticmethod
+    def _read_history(contents: List[types.Content]) -> Tuple[List[Tuple[str, Dict]], List[Tuple[str, Dict]]]:
+        calls, responses = [], []
+        for content in contents:
+            for part in content.parts or []:
+                if part.function_call:
+                    calls.append((part.function_call.name, dict(part.function_call.args or {})))
+                elif part.function_response:
+                    responses.append((part.function_response.name, dict(part.function_response.response or {})))
+        return calls, responses
+
+    @staticmethod
+    def _last_args(calls: List[Tuple[str, Dict]], tool_name: str) -> Dict[str, Any]:
+        for name, args in reversed(calls):
+            if name == tool_name:
+                return args
+        return {}
+
+    @staticmethod
+    def _selected_pet(responses: List[Tuple[str, Dict]]) -> Tuple[Optional[int], Optional[str]]:
+        for name, response in reversed(responses):
+            if name == "find_pets_by_status" and response.get("status") == "success":
+                data = response.get("data")
+                pet = data[0] if isinstance(data, list) and data else data
+                if isinstance(pet, dict) and "id" in pet:
+                    return pet["id"], pet.get("name", "")
+        return None, None
+
+    # ====================================================================
+    # CONSTRUCCIÓN DE RESPUESTAS
+    # ====================================================================
+
+    @staticmethod
+    def _call(name: str, args: Dict[str, Any]) -> LlmResponse:
+        return LlmResponse(content=types.Content(
+            role="model",
+            parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))],
+        ))
+
+    @staticmethod
+    def _final(pet_id: Optional[int], completed: bool, error: Optional[str]) -> LlmResponse:
+        text = json.dumps({"selected_pet_id": pet_id, "completed": completed, "error": error})
+        return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
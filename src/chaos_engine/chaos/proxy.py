@@ -81,7 +81,7 @@ class ChaosProxy:
             error_msg = self.error_codes.get(error_code, "Unknown Error")
             
             self.logger.info(f"🔥 CHAOS INJECTED: Simulating {error_code} on {endpoint}")
-            return {"status": "error", "code": int(error_code), "message": f"Simulated Chaos: {error_msg}"}
+            return {"status": "error", "code": int(error_code), "message": f"Simulated Chaos: {error_msg}", "chaos_injected": True}
 
         # 2. Mock Mode
         if self.mock_mode:
@@ -0,0 +1,141 @@
+"""
+Journaled Chaos Playbook Storage.
+
+Append-only persistence for chaos recovery procedures:
+
+- Every save appends ONE JSON line to `<playbook>.journal.jsonl`
+  (O(1) per write, independent of playbook size) and fsyncs it in a
+  worker thread, so the event loop never blocks on the disk.
+- Every `compact_every` appends, the in-memory state is written as a
+  snapshot (same schema as PlaybookStorage: {"procedures": [...]}) with
+  an atomic rename, and the journal is truncated.
+- Startup = load snapshot + replay journal tail. A torn last line (crash
+  mid-write: unparseable OR missing its trailing newline) is discarded, and procedures already present in the snapshot
+  are skipped (crash between snapshot rename and journal truncation).
+
+Queries are served by the in-memory indexes of IndexedPlaybookStorage.
+Intended for long-running training loops that add many procedures.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+from chaos_engine.core.playbook_storage import IndexedPlaybookStorage
+
+
+class JournaledPlaybookStorage(IndexedPlaybookStorage):
+    """
+    IndexedPlaybookStorage persisted as snapshot + append-only JSONL journal.
+
+    Example:
+        >>> storage = JournaledPlaybookStorage("data/chaos_playbook.json")
+        >>> await storage.save_procedure("timeout", "inventory", "Retry 3x")
+        >>> await storage.close()  # Compacts the journal into the snapshot
+    """
+
+    def __init__(
+        self,
+        file_path: str = "data/chaos_playbook.json",
+        compact_every: int = 1000,
+        fsync: bool = True
+    ):
+        """
+        Initialize storage, replaying snapshot + journal.
+
+        Args:
+            file_path: Path to JSON snapshot file
+            compact_every: Journal entries that trigger a compaction
+            fsync: fsync the journal after every append (crash safety)
+        """
+        self.journal_path = Path(str(file_path) + ".journal.jsonl")
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.logger = logging.getLogger("PlaybookJournal")
+        self._journal_entries = 0
+
+        super().__init__(file_path)
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    # -----------------------------
+    # Startup: snapshot + replay
+    # -----------------------------
+    def _load_from_disk(self) -> List[Dict[str, Any]]:
+        procedures = super()._load_from_disk()
+        seen_ids = {p.get("id") for p in procedures}
+
+        if not self.journal_path.exists():
+            return procedures
+
+        good_offset = 0
+        with open(self.journal_path, 'rb') as f:
+            for raw_line in f:
+                # ✅ FIX: Sin '\n' final la línea no terminó de escribirse, aunque parsee
+                if not raw_line.endswith(b"\n"):
+                    self.logger.warning(f"⚠️ Discarding unterminated journal entry at byte {good_offset}")
+                    break
+                try:
+                    procedure = json.loads(raw_line)
+                except json.JSONDecodeError:
+                    self.logger.warning(f"⚠️ Discarding torn journal entry at byte {good_offset}")
+                    break
+                good_offset += len(raw_line)
+                self._journal_entries += 1
+                if procedure.get("id") not in seen_ids:
+                    seen_ids.add(procedure.get("id"))
+                    procedures.append(procedure)
+
+        # Eliminar la cola corrupta para que los siguientes appends no se mezclen con ella
+        if good_offset < self.journal_path.stat().st_size:
+            os.truncate(self.journal_path, good_offset)
+
+        return procedures
+
+    # -----------------------------
+    # Append-only persistence
+    # -----------------------------
+    async def _append(self, lines: str, count: int):
+        # El lock evita que compact() cierre el fichero durante el fsync
+        async with self._lock:
+            self._journal.write(lines)
+            self._journal.flush()
+            if self.fsync:
+                # ✅ FIX: fsync fuera del event loop
+                await asyncio.to_thread(os.fsync, self._journal.fileno())
+            self._journal_entries += count
+
+        if self._journal_entries >= self.compact_every:
+            await self.compact()
+
+    async def _persist(self, procedure: Dict[str, Any]):
+        """Append a single journal line instead of rewriting the playbook."""
+        await self._append(json.dumps(procedure, separators=(",", ":")) + "\n", 1)
+
+    async def _persist_batch(self, procedures: List[Dict[str, Any]]):
+        """Append the whole batch and fsync once."""
+        await self._append("".join(json.dumps(p, separators=(",", ":")) + "\n" for p in procedures), len(procedures))
+
+    async def flush(self):
+        """Journal appends are already durable; just make sure they reached disk."""
+        async with self._lock:
+            if not self._journal.closed:
+                self._journal.flush()
+                await asyncio.to_thread(os.fsync, self._journal.fileno())
+
+    async def compact(self):
+        """Fold the journal into a new snapshot and truncate the journal."""
+        async with self._lock:
+            self._write_snapshot({"procedures": list(self._procedures)})
+            self._journal.close()
+            self._journal = open(self.journal_path, 'w', encoding='utf-8')
+            self._journal_entries = 0
+        self.logger.debug(f"🗜️ Journal compacted into {self.file_path}")
+
+    async def close(self):
+        """Compact pending journal entries and release the file handle."""
+        if self._journal_entries > 0:
+            await self.compact()
+        self._journal.close()
@@ -1,6 +1,8 @@
 import json
 import os
-from typing import Dict, Any, Optional
+import threading
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Tuple, Union, Mapping
 from pathlib import Path
 
 class PlaybookManager:
@@ -81,4 +83,120 @@ class PlaybookManager:
         Return the entire playbook structure as a dictionary.
         """
         return self.data
- 
\ No newline at end of file
+
+
+# -----------------------------
+# Compiled (read-only) playbooks
+# -----------------------------
+class CompiledPlaybook:
+    """
+    Immutable, precompiled view of a playbook for hot-path lookups.
+
+    The nested {"tool": {"status_code": strategy}} structure is flattened
+    into a single table keyed by (tool, int_status_code), so lookups are a
+    single dict access with no str() conversions. Non-numeric status keys
+    (e.g. "timeout") are kept as strings. Keys starting with "_" (metadata)
+    are ignored.
+
+    Instances are shared between agents: treat the returned strategies as
+    read-only.
+    """
+
+    __slots__ = ("path", "_table", "_default", "_raw")
+
+    def __init__(self, data: Dict[str, Any], path: Optional[str] = None):
+        table: Dict[Tuple[str, Union[int, str]], Dict[str, Any]] = {}
+        for tool, responses in data.items():
+            if tool == "default" or tool.startswith("_") or not isinstance(responses, dict):
+                continue
+            for status_code, strategy in responses.items():
+                table[(tool, self._normalize_code(status_code))] = strategy
+
+        self.path = path
+        self._table = MappingProxyType(table)
+        self._default = data.get("default")
+        self._raw = MappingProxyType(data)
+
+    @staticmethod
+    def _normalize_code(status_code: Union[int, str]) -> Union[int, str]:
+        if isinstance(status_code, int):
+            return status_code
+        try:
+            return int(status_code)
+        except (TypeError, ValueError):
+            return str(status_code)
+
+    def lookup(self, tool: str, status_code: Union[int, str]) -> Optional[Dict[str, Any]]:
+        """Return the strategy for (tool, status_code) or None."""
+        return self._table.get((tool, self._normalize_code(status_code)))
+
+    @property
+    def default(self) -> Optional[Dict[str, Any]]:
+        """Fallback strategy ("default" entry) or None."""
+        return self._default
+
+    @property
+    def raw(self) -> Mapping[str, Any]:
+        """Read-only view of the original playbook structure."""
+        return self._raw
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+
+# -----------------------------
+# Strategy semantics
+# -----------------------------
+DEFAULT_MAX_RETRIES = 3
+
+
+def strategy_delay(strategy: str, config: Mapping[str, Any], retries_done: int) -> float:
+    """
+    Base delay (seconds, before jitter) prescribed by a playbook strategy.
+
+    - *exponential*: base_delay * 2**retries_done
+    - *linear*:      delay * (retries_done + 1)
+    - wait*:         wait_seconds
+    - anything else: 0.0 (immediate retry / no retry)
+    """
+    strategy = strategy.lower()
+    if "exponential" in strategy:
+        return float(config.get("base_delay", 1.0)) * (2 ** retries_done)
+    if "linear" in strategy:
+        return float(config.get("delay", 1.0)) * (retries_done + 1)
+    if "wait" in strategy:
+        return float(config.get("wait_seconds", 1.0))
+    return 0.0
+
+
+_COMPILED_CACHE: Dict[str, Tuple[int, int, CompiledPlaybook]] = {}
+_COMPILED_CACHE_LOCK = threading.Lock()
+
+
+def load_compiled_playbook(filepath: Union[str, Path]) -> CompiledPlaybook:
+    """
+    Load a playbook once per path and share it across callers.
+
+    The compiled playbook is cached by resolved path and invalidated when
+    the file's mtime or size changes, so editing a playbook between runs
+    is picked up without restarting the process.
+
+    Raises:
+        OSError / json.JSONDecodeError: If the file cannot be read or parsed
+    """
+    path = Path(filepath).resolve()
+    stat = path.stat()
+    cache_key = str(path)
+
+    with _COMPILED_CACHE_LOCK:
+        cached = _COMPILED_CACHE.get(cache_key)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+    with path.open("r", encoding="utf-8") as f:
+        compiled = CompiledPlaybook(json.load(f), path=cache_key)
+
+    with _COMPILED_CACHE_LOCK:
+        _COMPILED_CACHE[cache_key] = (stat.st_mtime_ns, stat.st_size, compiled)
+    return compiled
+
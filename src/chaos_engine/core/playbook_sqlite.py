@@ -0,0 +1,329 @@
+"""
+SQLite-backed Chaos Playbook Storage.
+
+Alternative backend for PlaybookStorage built on stdlib `sqlite3`.
+Unlike the JSON backend (whose asyncio.Lock only protects one event loop
+in one process), SQLite in WAL mode lets several processes of an
+experiment farm record and query procedures concurrently:
+
+- WAL journal: readers never block the (single) writer.
+- Composite index on (failure_type, api, success_rate) for best-procedure
+  lookups.
+- Atomic ID allocation: the AUTOINCREMENT row id is taken inside a
+  BEGIN IMMEDIATE transaction, so no process ever scans existing IDs.
+
+Same async API as PlaybookStorage (save_procedure, load_procedures,
+get_best_procedure). Blocking sqlite3 calls run in worker threads.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from chaos_engine.core.playbook_storage import PlaybookStorage
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS procedures (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT UNIQUE,
+    failure_type TEXT NOT NULL,
+    api TEXT NOT NULL,
+    recovery_strategy TEXT NOT NULL,
+    success_rate REAL NOT NULL,
+    created_at TEXT NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_procedures_lookup
+    ON procedures (failure_type, api, success_rate DESC);
+"""
+
+_COLUMNS = "id, failure_type, api, recovery_strategy, success_rate, created_at, metadata"
+
+
+class SQLitePlaybookStorage(PlaybookStorage):
+    """
+    SQLite (WAL) storage for chaos recovery procedures.
+
+    Safe for concurrent writers across threads and processes sharing the
+    same database file.
+
+    Example:
+        >>> storage = SQLitePlaybookStorage("data/chaos_playbook.db")
+        >>> proc_id = await storage.save_procedure("timeout", "inventory", "Retry 3x")
+        >>> best = await storage.get_best_procedure("timeout", "inventory")
+    """
+
+    def __init__(self, file_path: str = "data/chaos_playbook.db", busy_timeout: float = 30.0):
+        """
+        Initialize storage and create the schema if missing.
+
+        Args:
+            file_path: Path to the SQLite database file
+            busy_timeout: Seconds a writer waits for the database lock
+        """
+        self.busy_timeout = busy_timeout
+        self.logger = logging.getLogger("SQLitePlaybookStorage")
+        self._local = threading.local()
+        # ✅ FIX: Todas las conexiones abiertas (una por hilo, incluidos los workers
+        # de asyncio.to_thread) para que close() las cierre todas
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        # ✅ FIX: La base fija file_path/_lock y llama a nuestro _ensure_storage_exists
+        super().__init__(file_path)
+
+    # -----------------------------
+    # Connection management
+    # -----------------------------
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are per-thread)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.file_path,
+                timeout=self.busy_timeout,
+                isolation_level=None,  # Explicit transactions only
+                check_same_thread=False  # Solo su hilo la usa; close() puede cerrarla desde otro
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _ensure_storage_exists(self):
+        """Ensure data directory, database file and schema exist."""
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    def _close_connections(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            # Los hilos que aún apuntan a una conexión cerrada abrirán otra
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
+
+    async def close(self):
+        """
+        Close every connection opened by this storage, in any thread.
+
+        The storage stays usable: the next call opens a fresh connection.
+        """
+        # El último close() hace checkpoint del WAL (I/O bloqueante)
+        await asyncio.to_thread(self._close_connections)
+
+    @staticmethod
+    def _row_to_procedure(row: sqlite3.Row) -> Dict[str, Any]:
+        procedure = dict(row)
+        procedure["metadata"] = json.loads(procedure["metadata"] or "{}")
+        return procedure
+
+    # -----------------------------
+    # Blocking implementations
+    # -----------------------------
+    def _insert(self, failure_type: str, api: str, recovery_strategy: str,
+                success_rate: float, metadata: Optional[Dict]) -> str:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(
+                "INSERT INTO procedures (failure_type, api, recovery_strategy, success_rate, created_at, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (failure_type, api, recovery_strategy, success_rate,
+                 datetime.utcnow().isoformat() + "Z", json.dumps(metadata or {}))
+            )
+            procedure_id = f"PROC-{cursor.lastrowid:03d}"
+            conn.execute("UPDATE procedures SET id = ? WHERE seq = ?", (procedure_id, cursor.lastrowid))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return procedure_id
+
+    def _insert_many(self, entries: List[Dict[str, Any]]) -> List[str]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            procedure_ids = []
+            for entry in entries:
+                cursor = conn.execute(
+                    "INSERT INTO procedures (failure_type, api, recovery_strategy, success_rate, created_at, metadata) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (entry["failure_type"], entry["api"], entry["recovery_strategy"], entry.get("success_rate", 1.0),
+                     datetime.utcnow().isoformat() + "Z", json.dumps(entry.get("metadata") or {}))
+                )
+                procedure_id = f"PROC-{cursor.lastrowid:03d}"
+                conn.execute("UPDATE procedures SET id = ? WHERE seq = ?", (procedure_id, cursor.lastrowid))
+                procedure_ids.append(procedure_id)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return procedure_ids
+
+    def _select(self, failure_type: Optional[str], api: Optional[str]) -> List[Dict[str, Any]]:
+        clauses, args = [], []
+        if failure_type:
+            clauses.append("failure_type = ?")
+            args.append(failure_type)
+        if api:
+            clauses.append("api = ?")
+            args.append(api)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"SELECT {_COLUMNS} FROM procedures {where} ORDER BY seq", args
+        ).fetchall()
+        return [self._row_to_procedure(r) for r in rows]
+
+    def _select_best(self, failure_type: str, api: str) -> Optional[Dict[str, Any]]:
+        # Empates -> el más antiguo, igual que max() en el backend JSON
+        row = self._connect().execute(
+            f"SELECT {_COLUMNS} FROM procedures WHERE failure_type = ? AND api = ? "
+            "ORDER BY success_rate DESC, seq ASC LIMIT 1",
+            (failure_type, api)
+        ).fetchone()
+        return self._row_to_procedure(row) if row else None
+
+    @staticmethod
+    def _same_procedure(row: sqlite3.Row, proc: Dict[str, Any]) -> bool:
+        """True si la fila ya contiene este procedimiento (re-importación)."""
+        if "created_at" in proc and row["created_at"] != proc["created_at"]:
+            return False
+        return (
+            row["failure_type"] == proc["failure_type"]
+            and row["api"] == proc["api"]
+            and row["recovery_strategy"] == proc["recovery_strategy"]
+            and row["success_rate"] == proc.get("success_rate", 0.0)
+            and json.loads(row["metadata"] or "{}") == (proc.get("metadata") or {})
+        )
+
+    def _import_rows(self, conn: sqlite3.Connection, procedures: List[Dict[str, Any]]) -> int:
+        """Inserta procedimientos en la transacción abierta; devuelve cuántos se insertaron."""
+        imported = 0
+        for proc in procedures:
+            proc_id = proc.get("id")
+            try:
+                seq = int(proc_id.split("-")[1])
+            except (AttributeError, IndexError, ValueError):
+                seq = None
+
+            row = conn.execute(
+                f"SELECT {_COLUMNS} FROM procedures WHERE seq = ? OR id = ?", (seq, proc_id)
+            ).fetchone() if proc_id else None
+            if row is not None:
+                if self._same_procedure(row, proc):
+                    continue  # Ya importado
+                # ✅ FIX: Mismo ID con contenido distinto -> ID nuevo en vez de descartarlo
+                seq, proc_id = None, None
+
+            cursor = conn.execute(
+                "INSERT INTO procedures (seq, id, failure_type, api, recovery_strategy, success_rate, created_at, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (seq, proc_id, proc["failure_type"], proc["api"], proc["recovery_strategy"],
+                 proc.get("success_rate", 0.0), proc.get("created_at", datetime.utcnow().isoformat() + "Z"),
+                 json.dumps(proc.get("metadata") or {}))
+            )
+            if proc_id is None:
+                new_id = f"PROC-{cursor.lastrowid:03d}"
+                conn.execute("UPDATE procedures SET id = ? WHERE seq = ?", (new_id, cursor.lastrowid))
+                if proc.get("id"):
+                    self.logger.warning(f"⚠️ {proc['id']} conflicts with an existing procedure; imported as {new_id}")
+            imported += 1
+        return imported
+
+    def _import(self, procedures: List[Dict[str, Any]]) -> int:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            imported = self._import_rows(conn, procedures)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return imported
+
+    def _replace(self, procedures: List[Dict[str, Any]]):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM procedures")
+            self._import_rows(conn, procedures)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def _read_playbook(self) -> Dict[str, Any]:
+        """Whole playbook in the JSON backend schema."""
+        return {"procedures": await self.load_procedures()}
+
+    async def _write_playbook(self, data: Dict[str, Any]):
+        """Replace every procedure with `data["procedures"]` (one transaction)."""
+        await asyncio.to_thread(self._replace, data.get("procedures", []))
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    async def save_procedure(
+        self,
+        failure_type: str,
+        api: str,
+        recovery_strategy: str,
+        success_rate: float = 1.0,
+        metadata: Optional[Dict] = None
+    ) -> str:
+        """
+        Save recovery procedure (atomic ID allocation).
+
+        Same arguments, return value and validation as PlaybookStorage.
+        """
+        self._validate_inputs(failure_type, api, success_rate)
+        return await asyncio.to_thread(
+            self._insert, failure_type, api, recovery_strategy, success_rate, metadata
+        )
+
+    async def save_procedures(self, entries: List[Dict[str, Any]]) -> List[str]:
+        """Save several procedures in a single transaction (all-or-nothing)."""
+        if not entries:
+            return []
+        self._validate_entries(entries)
+        return await asyncio.to_thread(self._insert_many, entries)
+
+    async def load_procedures(
+        self,
+        failure_type: Optional[str] = None,
+        api: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Load procedures with optional filtering (served by the index)."""
+        return await asyncio.to_thread(self._select, failure_type, api)
+
+    async def get_best_procedure(
+        self,
+        failure_type: str,
+        api: str
+    ) -> Optional[Dict[str, Any]]:
+        """Get highest success_rate procedure via the composite index."""
+        return await asyncio.to_thread(self._select_best, failure_type, api)
+
+    async def import_json(self, json_path: str) -> int:
+        """
+        Import procedures from a JSON playbook (PlaybookStorage schema).
+
+        Existing IDs are preserved and procedures already present are
+        skipped. A procedure whose ID is taken by a DIFFERENT procedure is
+        imported under a new ID (logged as a warning), never dropped.
+
+        Returns:
+            Number of imported procedures
+        """
+        with open(json_path, 'r') as f:
+            procedures = json.load(f).get("procedures", [])
+        return await asyncio.to_thread(self._import, procedures)
@@ -1,13 +1,15 @@
 """
 Chaos Playbook Storage Module.
 
-Provides JSON-based storage for chaos recovery procedures.
+Provides JSON-based storage for chaos recovery procedures, plus an indexed
+in-memory variant (IndexedPlaybookStorage) with write-behind persistence.
 Thread-safe operations with asyncio.Lock.
 
 Location: src/chaos_playbook_engine/data/playbook_storage.py
 """
 
 import asyncio
+import copy
 import json
 import os
 from datetime import datetime
@@ -195,6 +197,67 @@ class PlaybookStorage:
         await self._write_playbook(playbook)
         
         return procedure_id
+
+    def _build_procedure(self, procedure_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Procedure record from a `save_procedures` entry (same fields as save_procedure)."""
+        return {
+            "id": procedure_id,
+            "failure_type": entry["failure_type"],
+            "api": entry["api"],
+            "recovery_strategy": entry["recovery_strategy"],
+            "success_rate": entry.get("success_rate", 1.0),
+            "created_at": datetime.utcnow().isoformat() + "Z",
+            "metadata": entry.get("metadata") or {}
+        }
+
+    def validate_entry(self, entry: Dict[str, Any]):
+        """
+        Validate one `save_procedures` entry without writing it.
+
+        Lets callers drop invalid entries before a batch (which is
+        all-or-nothing) instead of failing the whole write.
+
+        Raises:
+            ValueError: If the entry is invalid
+        """
+        self._validate_inputs(entry["failure_type"], entry["api"], entry.get("success_rate", 1.0))
+
+    def _validate_entries(self, entries: List[Dict[str, Any]]):
+        """Validate every entry before writing anything (all-or-nothing batch)."""
+        for entry in entries:
+            self.validate_entry(entry)
+
+    async def save_procedures(self, entries: List[Dict[str, Any]]) -> List[str]:
+        """
+        Save several procedures with a single read + write of the playbook.
+
+        Args:
+            entries: Dicts with the save_procedure arguments
+                (failure_type, api, recovery_strategy, success_rate, metadata)
+
+        Returns:
+            procedure_ids in the same order as `entries`
+
+        Raises:
+            ValueError: If any entry is invalid (nothing is written)
+        """
+        if not entries:
+            return []
+        self._validate_entries(entries)
+
+        playbook = await self._read_playbook()
+        procedures = playbook.get("procedures", [])
+
+        procedure_ids = []
+        for entry in entries:
+            procedure = self._build_procedure(self._generate_procedure_id(procedures), entry)
+            procedures.append(procedure)
+            procedure_ids.append(procedure["id"])
+        playbook["procedures"] = procedures
+
+        await self._write_playbook(playbook)
+
+        return procedure_ids
     
     async def load_procedures(
         self,
@@ -259,3 +322,215 @@ class PlaybookStorage:
         # Sort by success_rate descending, return best
         best = max(procedures, key=lambda p: p.get("success_rate", 0.0))
         return best
+
+
+class IndexedPlaybookStorage(PlaybookStorage):
+    """
+    In-memory, indexed variant of PlaybookStorage with write-behind persistence.
+
+    The JSON file is read once at construction. Queries are served from
+    in-memory indexes and never touch disk:
+        - (failure_type, api) -> procedures, with the best-by-success_rate
+          entry precomputed on insert
+        - failure_type -> procedures and api -> procedures for partial filters
+
+    Writes update the indexes immediately and mark the playbook dirty. A
+    background task persists the full snapshot after `flush_interval`
+    seconds (or as soon as `max_batch` procedures are pending), so many
+    saves share a single write. Call `flush()` / `close()` to force it.
+    """
+
+    def __init__(
+        self,
+        file_path: str = "data/chaos_playbook.json",
+        flush_interval: float = 1.0,
+        max_batch: int = 50
+    ):
+        """
+        Initialize storage and load the playbook into memory.
+
+        Args:
+            file_path: Path to JSON storage file
+            flush_interval: Seconds to wait before persisting pending saves
+            max_batch: Pending saves that trigger an immediate flush
+        """
+        super().__init__(file_path)
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        self._procedures: List[Dict[str, Any]] = []
+        self._by_key: Dict[tuple, List[Dict[str, Any]]] = {}
+        self._best_by_key: Dict[tuple, Dict[str, Any]] = {}
+        self._by_failure_type: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_api: Dict[str, List[Dict[str, Any]]] = {}
+        self._next_id_num = 1
+
+        self._pending = 0
+        self._flush_task: Optional[asyncio.Task] = None
+
+        for procedure in self._load_from_disk():
+            self._index(procedure)
+
+    # -----------------------------
+    # Loading & indexing
+    # -----------------------------
+    def _load_from_disk(self) -> List[Dict[str, Any]]:
+        """Read all procedures from the JSON snapshot (called once)."""
+        with open(self.file_path, 'r') as f:
+            return json.load(f).get("procedures", [])
+
+    def _index(self, procedure: Dict[str, Any]):
+        """Add a procedure to every in-memory index."""
+        failure_type = procedure.get("failure_type")
+        api = procedure.get("api")
+        key = (failure_type, api)
+
+        self._procedures.append(procedure)
+        self._by_key.setdefault(key, []).append(procedure)
+        self._by_failure_type.setdefault(failure_type, []).append(procedure)
+        self._by_api.setdefault(api, []).append(procedure)
+
+        # Strict '>' keeps the first best entry, like max() in the base class
+        best = self._best_by_key.get(key)
+        if best is None or procedure.get("success_rate", 0.0) > best.get("success_rate", 0.0):
+            self._best_by_key[key] = procedure
+
+        try:
+            num = int(procedure.get("id", "PROC-000").split("-")[1])
+            self._next_id_num = max(self._next_id_num, num + 1)
+        except (IndexError, ValueError):
+            pass
+
+    def _allocate_procedure_id(self) -> str:
+        """O(1) replacement for _generate_procedure_id."""
+        procedure_id = f"PROC-{self._next_id_num:03d}"
+        self._next_id_num += 1
+        return procedure_id
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    async def save_procedure(
+        self,
+        failure_type: str,
+        api: str,
+        recovery_strategy: str,
+        success_rate: float = 1.0,
+        metadata: Optional[Dict] = None
+    ) -> str:
+        """
+        Save recovery procedure (indexed immediately, persisted write-behind).
+
+        Same arguments, return value and validation as PlaybookStorage.
+        """
+        self._validate_inputs(failure_type, api, success_rate)
+
+        procedure = {
+            "id": self._allocate_procedure_id(),
+            "failure_type": failure_type,
+            "api": api,
+            "recovery_strategy": recovery_strategy,
+            "success_rate": success_rate,
+            "created_at": datetime.utcnow().isoformat() + "Z",
+            "metadata": metadata or {}
+        }
+        self._index(procedure)
+        await self._persist(procedure)
+
+        return procedure["id"]
+
+    async def save_procedures(self, entries: List[Dict[str, Any]]) -> List[str]:
+        """
+        Save several procedures: indexed immediately, persisted in ONE write.
+
+        Same semantics as PlaybookStorage.save_procedures.
+        """
+        if not entries:
+            return []
+        self._validate_entries(entries)
+
+        procedures = [self._build_procedure(self._allocate_procedure_id(), entry) for entry in entries]
+        for procedure in procedures:
+            self._index(procedure)
+        await self._persist_batch(procedures)
+
+        return [p["id"] for p in procedures]
+
+    async def load_procedures(
+        self,
+        failure_type: Optional[str] = None,
+        api: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Load procedures from the in-memory indexes (no disk access; returns copies)."""
+        if failure_type and api:
+            procedures = self._by_key.get((failure_type, api), [])
+        elif failure_type:
+            procedures = self._by_failure_type.get(failure_type, [])
+        elif api:
+            procedures = self._by_api.get(api, [])
+        else:
+            procedures = self._procedures
+        # Copias: mutar el resultado no debe alterar los índices ni el próximo snapshot
+        return copy.deepcopy(procedures)
+
+    async def get_best_procedure(
+        self,
+        failure_type: str,
+        api: str
+    ) -> Optional[Dict[str, Any]]:
+        """O(1) lookup of the precomputed best procedure (returns a copy)."""
+        best = self._best_by_key.get((failure_type, api))
+        return copy.deepcopy(best) if best is not None else None
+
+    # -----------------------------
+    # Write-behind persistence
+    # -----------------------------
+    async def _persist(self, procedure: Dict[str, Any]):
+        """Schedule a batched snapshot write for a newly indexed procedure."""
+        self._pending += 1
+        if self._pending >= self.max_batch:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _persist_batch(self, procedures: List[Dict[str, Any]]):
+        """Persist a batch of newly indexed procedures with a single snapshot write."""
+        self._pending += len(procedures)
+        await self.flush()
+
+    async def _flush_later(self):
+        # Keep flushing while saves keep arriving during the write itself
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if self._pending == 0:
+                return
+
+    async def flush(self):
+        """Persist all pending procedures to disk in a single write."""
+        if self._pending == 0:
+            return
+        async with self._lock:
+            flushed = self._pending
+            snapshot = {"procedures": list(self._procedures)}
+            await asyncio.to_thread(self._write_snapshot, snapshot)
+            # ✅ FIX: Solo tras escribir con éxito; si falla, siguen pendientes.
+            # Lo guardado durante la escritura queda para el siguiente flush.
+            self._pending -= flushed
+
+    def _write_snapshot(self, data: Dict[str, Any]):
+        """Atomic snapshot write (temp file + rename)."""
+        tmp_path = self.file_path.with_suffix(self.file_path.suffix + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.file_path)
+
+    async def close(self):
+        """Flush pending writes and stop the background flusher."""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
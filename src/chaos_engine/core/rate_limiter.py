@@ -0,0 +1,251 @@
+"""
+Rate Limiter - Token buckets + scheduler for quota-bound LLM experiments.
+
+Sustituye las esperas fijas (SAFE_DELAY / cooldown de 60s) por:
+
+- TokenBucket: presupuesto de requests/min y tokens/min. Las reservas son
+  FIFO (el nivel puede quedar en negativo = deuda), así que cada llamada
+  espera exactamente lo que exige la cuota y ni un segundo más.
+- RateLimitedScheduler: ejecuta experimentos concurrentes (max_concurrency)
+  y regula cada llamada al modelo con los buckets. Los 429 observados
+  pausan todas las llamadas (Retry-After o backoff exponencial) y reducen
+  el ritmo multiplicativamente; cada llamada correcta lo recupera poco a
+  poco (AIMD).
+"""
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar, Union
+
+T = TypeVar("T")
+
+_RETRY_AFTER_PATTERN = re.compile(r"retry[\s_-]?(?:after|delay|in)['\"]?\s*[:=]?\s*['\"]?(\d+(?:\.\d+)?)\s*s", re.IGNORECASE)
+
+
+class RateLimitExceeded(Exception):
+    """El proveedor del modelo ha rechazado la petición por cuota (HTTP 429)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_rate_limit_error(error: Union[BaseException, str, None]) -> bool:
+    """Detecta errores de cuota (429 / RESOURCE_EXHAUSTED) en excepciones o mensajes."""
+    if error is None:
+        return False
+    if isinstance(error, RateLimitExceeded):
+        return True
+    text = str(error).lower()
+    return "429" in text or "resource_exhausted" in text or "quota" in text
+
+
+def parse_retry_after(error: Union[BaseException, str, None]) -> Optional[float]:
+    """Extrae el Retry-After / retryDelay (segundos) de un mensaje de error, si existe."""
+    if isinstance(error, RateLimitExceeded) and error.retry_after is not None:
+        return error.retry_after
+    match = _RETRY_AFTER_PATTERN.search(str(error or ""))
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """
+    Token bucket con reservas.
+
+    `reserve(n)` consume n unidades inmediatamente y devuelve los segundos
+    que el llamador debe esperar hasta que la reserva esté cubierta.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be > 0")
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_minute / 60.0)
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Consume `amount` y devuelve la espera necesaria (0.0 si hay saldo)."""
+        self._refill()
+        self._tokens -= amount
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens * 60.0 / self.rate_per_minute
+
+    def adjust(self, delta: float):
+        """Corrige una reserva a posteriori (p.ej. tokens reales vs estimados)."""
+        self._refill()
+        self._tokens -= delta
+
+    def drain(self):
+        """Vacía el bucket (tras un 429 no queremos ráfagas al reanudar)."""
+        self._refill()
+        self._tokens = min(self._tokens, 0.0)
+
+    def set_rate(self, rate_per_minute: float):
+        self._refill()
+        self.rate_per_minute = rate_per_minute
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+class RateLimitedScheduler:
+    """
+    Planificador de experimentos con presupuesto RPM/TPM compartido.
+
+    Example:
+        >>> scheduler = RateLimitedScheduler(requests_per_minute=15, max_concurrency=4)
+        >>> results = await scheduler.map([lambda: run_one(1), lambda: run_one(2)])
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 15.0,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        base_backoff: float = 2.0,
+        max_backoff: float = 60.0,
+        min_rate_factor: float = 0.25,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.min_rate_factor = min_rate_factor
+        self._clock = clock
+        self._sleep = sleep
+
+        self._request_bucket = TokenBucket(requests_per_minute, clock=clock)
+        self._token_bucket = TokenBucket(tokens_per_minute, clock=clock) if tokens_per_minute else None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # Estado adaptativo (AIMD)
+        self._rate_factor = 1.0
+        self._blocked_until = 0.0
+        self._consecutive_limits = 0
+        self._avg_tokens = 0.0
+
+        self.stats = {"model_calls": 0, "tokens": 0, "rate_limited": 0, "retried_runs": 0, "waited_s": 0.0}
+        self.logger = logging.getLogger("RateLimiter")
+
+    # -----------------------------
+    # Per model call
+    # -----------------------------
+    async def acquire(self, estimated_tokens: Optional[float] = None) -> float:
+        """
+        Espera hasta que haya cuota para UNA llamada al modelo.
+
+        Returns:
+            Tokens reservados en el bucket TPM (para `record_usage`).
+        """
+        waited = 0.0
+        pause = self._blocked_until - self._clock()
+        if pause > 0:
+            await self._sleep(pause)
+            waited += pause
+
+        wait = self._request_bucket.reserve(1.0)
+        reserved = 0.0
+        if self._token_bucket is not None:
+            reserved = estimated_tokens if estimated_tokens is not None else self._avg_tokens
+            wait = max(wait, self._token_bucket.reserve(reserved))
+        if wait > 0:
+            await self._sleep(wait)
+            waited += wait
+
+        self.stats["model_calls"] += 1
+        self.stats["waited_s"] += waited
+        return reserved
+
+    def record_usage(self, tokens: int, reserved: float = 0.0):
+        """Ajusta el bucket TPM con los tokens reales de la respuesta."""
+        self.stats["tokens"] += tokens
+        self._avg_tokens = tokens if self._avg_tokens == 0 else 0.8 * self._avg_tokens + 0.2 * tokens
+        if self._token_bucket is not None:
+            self._token_bucket.adjust(tokens - reserved)
+
+    def report_success(self):
+        """Recuperación aditiva del ritmo tras llamadas correctas."""
+        self._consecutive_limits = 0
+        if self._rate_factor < 1.0:
+            self._set_rate_factor(min(1.0, self._rate_factor + 0.1))
+
+    def report_rate_limit(self, retry_after: Optional[float] = None) -> float:
+        """
+        Registra un 429: pausa global + reducción multiplicativa del ritmo.
+
+        Los 429 de llamadas que ya estaban en vuelo durante la pausa actual
+        cuentan como el mismo episodio.
+
+        Returns:
+            Segundos restantes de pausa.
+        """
+        now = self._clock()
+        self.stats["rate_limited"] += 1
+        if now < self._blocked_until:
+            return self._blocked_until - now
+
+        self._consecutive_limits += 1
+        backoff = retry_after if retry_after is not None else min(
+            self.max_backoff, self.base_backoff * (2 ** (self._consecutive_limits - 1))
+        )
+        self._blocked_until = now + backoff
+        self._set_rate_factor(max(self.min_rate_factor, self._rate_factor * 0.5))
+        self._request_bucket.drain()
+        if self._token_bucket is not None:
+            self._token_bucket.drain()
+        self.logger.warning(f"⏳ Rate limited (429). Pausing {backoff:.1f}s, rate factor {self._rate_factor:.2f}")
+        return backoff
+
+    def _set_rate_factor(self, factor: float):
+        self._rate_factor = factor
+        self._request_bucket.set_rate(self.requests_per_minute * factor)
+        if self._token_bucket is not None:
+            self._token_bucket.set_rate(self.tokens_per_minute * factor)
+
+    # -----------------------------
+    # Per experiment
+    # -----------------------------
+    async def run(self, job: Callable[[], Awaitable[T]]) -> T:
+        """
+        Ejecuta un experimento respetando max_concurrency.
+
+        Si el experimento lanza RateLimitExceeded se repite (tras la pausa
+        global) hasta `max_retries` veces.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            attempt = 0
+            while True:
+                try:
+                    return await job()
+                except RateLimitExceeded as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    attempt += 1
+                    self.stats["retried_runs"] += 1
+                    self.report_rate_limit(e.retry_after)
+
+    async def map(self, jobs: Iterable[Callable[[], Awaitable[T]]]) -> List[T]:
+        """Ejecuta todos los jobs concurrentemente; preserva el orden de entrada."""
+        return list(await asyncio.gather(*(self.run(job) for job in jobs)))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "rate_factor": round(self._rate_factor, 3)}
@@ -1,9 +1,14 @@
 """
-Resilience Utilities - Circuit Breaker Implementation (Pilar IV).
+Resilience Utilities - Circuit Breaker, Response Cache & Native Playbook Recovery (Pilar IV).
 """
+import asyncio
+import copy
 import time
 import logging
-from typing import Dict, Any, Optional, Protocol, runtime_checkable
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Protocol, Tuple, runtime_checkable
+
+from chaos_engine.core.playbook_manager import CompiledPlaybook, DEFAULT_MAX_RETRIES, strategy_delay
 
 # Reutilizar el protocolo de ejecución de herramientas
 @runtime_checkable
@@ -18,10 +23,11 @@ class CircuitBreakerProxy:
     Si el número de fallos consecutivos supera el umbral, el circuito se abre.
     """
     
-    def __init__(self, wrapped_executor: Executor, failure_threshold: int = 5, cooldown_seconds: int = 60):
+    def __init__(self, wrapped_executor: Executor, failure_threshold: int = 5, cooldown_seconds: int = 60, clock: Callable[[], float] = time.time):
         self._executor = wrapped_executor
         self._failure_threshold = failure_threshold
         self._cooldown_seconds = cooldown_seconds
+        self._clock = clock  # Inyectable: reloj virtual del agente en mock mode
         
         # Estado del circuito
         self._failures = 0
@@ -41,7 +47,7 @@ class CircuitBreakerProxy:
         
         # 1. ESTADO ABIERTO (Protección)
         if self._is_open:
-            if time.time() < self._opened_timestamp + self._cooldown_seconds:
+            if self._clock() < self._opened_timestamp + self._cooldown_seconds:
                 self.logger.warning(f"🚨 CIRCUIT OPEN: Request to {endpoint} blocked (Cooldown active).")
                 # Devolver un error de servicio inalcanzable inmediatamente (Pilar IV: MTTR bajo)
                 return {"status": "error", "code": 503, "message": "Circuit Breaker Open: Service is down."}
@@ -66,11 +72,292 @@ class CircuitBreakerProxy:
         self.logger.debug(f"Failure count: {self._failures}/{self._failure_threshold}")
         if self._failures >= self._failure_threshold:
             self._is_open = True
-            self._opened_timestamp = time.time()
+            self._opened_timestamp = self._clock()
             self.logger.critical(f"🛑 CIRCUIT OPENED: {self._failure_threshold} consecutive failures. Cooldown for {self._cooldown_seconds}s.")
 
     def _handle_success(self):
         if self._failures > 0:
             self.logger.info("✅ CIRCUIT RESET: Successful request.")
             self._failures = 0
-            self._is_open = False
\ No newline at end of file
+            self._is_open = False
+
+class ResponseCacheProxy:
+    """
+    Caché de respuestas para lecturas idempotentes (GET) con TTL y evicción LRU.
+
+    Se inserta en la cadena de executors como cualquier otro proxy:
+        CircuitBreakerProxy -> ResponseCacheProxy -> ChaosProxy
+
+    - Clave: (method, endpoint, params ordenados).
+    - Solo se cachean respuestas con status "success".
+    - serve_stale_on_error: si la API falla y existe una entrada caducada,
+      se devuelve esa entrada (estrategia de resiliencia "fallback to cache").
+    - Las escrituras (POST/PUT/...) invalidan la caché por defecto, ya que
+      pueden cambiar el resultado de las lecturas (p.ej. /pet/findByStatus).
+    - get_cached(): fallback explícito que decide el playbook (estrategia
+      `serve_cached` de PlaybookStrategyProxy) en lugar de serve_stale_on_error.
+    """
+
+    CACHEABLE_METHODS = frozenset({"GET"})
+
+    def __init__(
+        self,
+        wrapped_executor: Executor,
+        ttl_seconds: float = 30.0,
+        max_entries: int = 128,
+        serve_stale_on_error: bool = True,
+        invalidate_on_write: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if ttl_seconds < 0:
+            raise ValueError(f"ttl_seconds must be >= 0, got {ttl_seconds}")
+        if max_entries <= 0:
+            raise ValueError(f"max_entries must be > 0, got {max_entries}")
+
+        self._executor = wrapped_executor
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._serve_stale_on_error = serve_stale_on_error
+        self._invalidate_on_write = invalidate_on_write
+        self._clock = clock
+
+        # key -> (stored_at_monotonic, response)
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.fallback_hits = 0
+        self.evictions = 0
+        self.logger = logging.getLogger("ResponseCache")
+
+    def calculate_jittered_backoff(self, seconds: float) -> float:
+        """Delega el cálculo de jitter al executor interno."""
+        if hasattr(self._executor, "calculate_jittered_backoff"):
+            return self._executor.calculate_jittered_backoff(seconds)
+        return seconds
+
+    @staticmethod
+    def _make_key(method: str, endpoint: str, params: Optional[Dict]) -> Tuple:
+        frozen_params = tuple(sorted((str(k), str(v)) for k, v in params.items())) if params else ()
+        return (method.upper(), endpoint, frozen_params)
+
+    async def send_request(self, method: str, endpoint: str, params: Optional[Dict] = None, json_body: Optional[Dict] = None) -> Dict[str, Any]:
+        if method.upper() not in self.CACHEABLE_METHODS:
+            if self._invalidate_on_write and self._entries:
+                self.logger.debug(f"🧹 CACHE INVALIDATED by {method} {endpoint}")
+                self._entries.clear()
+            return await self._executor.send_request(method, endpoint, params, json_body)
+
+        key = self._make_key(method, endpoint, params)
+        entry = self._entries.get(key)
+        now = self._clock()
+
+        # 1. HIT (entrada fresca)
+        if entry is not None and now - entry[0] < self._ttl_seconds:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.logger.debug(f"⚡ CACHE HIT: {method} {endpoint}")
+            return copy.deepcopy(entry[1])
+
+        # 2. MISS -> executor real
+        self.misses += 1
+        response = await self._executor.send_request(method, endpoint, params, json_body)
+
+        if response.get("status") == "success":
+            self._store(key, now, response)
+            return response
+
+        # 3. ERROR -> Servir entrada caducada si está permitido
+        if entry is not None and self._serve_stale_on_error:
+            self.stale_hits += 1
+            self._entries.move_to_end(key)
+            self.logger.warning(f"🧊 STALE CACHE SERVED: {method} {endpoint} (upstream error {response.get('code')})")
+            stale = copy.deepcopy(entry[1])
+            stale["stale"] = True
+            return stale
+
+        return response
+
+    def get_cached(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        max_age_seconds: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Última respuesta guardada para la petición, aunque haya caducado.
+
+        Returns:
+            Copia marcada con `served_from_cache` (y `stale` si superó el TTL),
+            o None si no hay entrada o es más antigua que max_age_seconds.
+        """
+        if method.upper() not in self.CACHEABLE_METHODS:
+            return None
+        key = self._make_key(method, endpoint, params)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        age = self._clock() - entry[0]
+        if max_age_seconds is not None and age > max_age_seconds:
+            return None
+
+        self._entries.move_to_end(key)
+        self.fallback_hits += 1
+        self.logger.warning(f"🧊 CACHE FALLBACK: {method} {endpoint} (age {age:.1f}s)")
+        cached = copy.deepcopy(entry[1])
+        cached["served_from_cache"] = True
+        if age >= self._ttl_seconds:
+            cached["stale"] = True
+        return cached
+
+    def _store(self, key: Tuple, now: float, response: Dict[str, Any]):
+        self._entries[key] = (now, copy.deepcopy(response))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Vacía la caché (los contadores se conservan)."""
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de la caché para reporting."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "fallback_hits": self.fallback_hits,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class PlaybookStrategyProxy:
+    """
+    Intérprete nativo de las estrategias del playbook, debajo de la tool.
+
+    En lugar de devolver el error al LLM (que gasta un turno en
+    `lookup_playbook` y otro en obedecer "retry"/"wait"), el proxy aplica
+    la estrategia estructurada directamente:
+
+    - retry_exponential_backoff -> base_delay * 2**n (+ jitter) y reintento.
+    - retry_linear_backoff      -> delay * (n+1) (+ jitter) y reintento.
+    - wait_and_retry            -> wait_seconds (+ jitter) y reintento.
+    - serve_cached              -> última respuesta de `response_cache` (solo
+      GET; config.max_age_seconds opcional). Sin entrada -> como fail_fast.
+    - fail_fast / desconocida   -> se devuelve el error inmediatamente.
+
+    Respeta config.max_retries. Si la recuperación no tiene éxito, el error
+    se devuelve marcado con `playbook_applied=True` para que el agente no
+    repita la estrategia. Se coloca en el exterior de la cadena:
+        PlaybookStrategyProxy -> CircuitBreakerProxy -> ... -> ChaosProxy
+    """
+
+    # (method, endpoint) -> nombre de la tool en el playbook
+    ENDPOINT_TOOLS: Dict[Tuple[str, str], str] = {
+        ("GET", "/store/inventory"): "get_inventory",
+        ("GET", "/pet/findByStatus"): "find_pets_by_status",
+        ("POST", "/store/order"): "place_order",
+        ("PUT", "/pet"): "update_pet_status",
+    }
+
+    def __init__(
+        self,
+        wrapped_executor: Executor,
+        playbook: CompiledPlaybook,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+        on_retry: Optional[Callable[[], Any]] = None,
+        response_cache: Optional[ResponseCacheProxy] = None,
+    ):
+        self._executor = wrapped_executor
+        self._playbook = playbook
+        self._sleep = sleep
+        self._on_retry = on_retry  # p.ej. agent.record_tool_retry (métrica tool_retries)
+        self._response_cache = response_cache  # Fuente de la estrategia serve_cached
+
+        self.recoveries = 0   # Errores que acabaron en éxito tras reintentar
+        self.retries = 0
+        self.exhausted = 0
+        self.fail_fast = 0
+        self.cache_fallbacks = 0
+        self.waited_seconds = 0.0
+        self.logger = logging.getLogger("PlaybookStrategy")
+
+    def calculate_jittered_backoff(self, seconds: float) -> float:
+        """Delega el cálculo de jitter al executor interno."""
+        if hasattr(self._executor, "calculate_jittered_backoff"):
+            return self._executor.calculate_jittered_backoff(seconds)
+        return seconds
+
+    async def send_request(self, method: str, endpoint: str, params: Optional[Dict] = None, json_body: Optional[Dict] = None) -> Dict[str, Any]:
+        response = await self._executor.send_request(method, endpoint, params, json_body)
+        tool = self.ENDPOINT_TOOLS.get((method.upper(), endpoint))
+        if tool is None or response.get("status") != "error":
+            return response
+
+        retries_done = 0
+        while response.get("status") == "error":
+            recommendation = self._playbook.lookup(tool, response.get("code", "unknown")) or self._playbook.default or {}
+            strategy = str(recommendation.get("strategy", "fail_fast")).lower()
+            config = recommendation.get("config") or {}
+            max_retries = config.get("max_retries", DEFAULT_MAX_RETRIES)
+
+            if strategy.startswith("serve_cached"):
+                cached = self._serve_cached(method, endpoint, params, config)
+                if cached is not None:
+                    cached["recovery"] = {"strategy": strategy, "retries": retries_done}
+                    return cached
+                self.fail_fast += 1
+                return self._annotate(response, strategy, retries_done)
+            if not strategy.startswith(("retry", "wait")):
+                self.fail_fast += 1
+                return self._annotate(response, strategy, retries_done)
+            if retries_done >= max_retries:
+                self.exhausted += 1
+                return self._annotate(response, strategy, retries_done)
+
+            delay = strategy_delay(strategy, config, retries_done)
+            if delay > 0:
+                delay = self.calculate_jittered_backoff(delay)
+                self.waited_seconds += delay
+                await self._sleep(delay)
+
+            retries_done += 1
+            self.retries += 1
+            if self._on_retry is not None:
+                self._on_retry()
+            self.logger.debug(f"🔁 NATIVE RECOVERY: {tool} {response.get('code')} -> {strategy} (retry {retries_done}/{max_retries})")
+            response = await self._executor.send_request(method, endpoint, params, json_body)
+
+        self.recoveries += 1
+        return response
+
+    def _serve_cached(self, method: str, endpoint: str, params: Optional[Dict], config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self._response_cache is None:
+            return None
+        cached = self._response_cache.get_cached(method, endpoint, params, config.get("max_age_seconds"))
+        if cached is not None:
+            self.cache_fallbacks += 1
+        return cached
+
+    @staticmethod
+    def _annotate(response: Dict[str, Any], strategy: str, retries_done: int) -> Dict[str, Any]:
+        annotated = dict(response)
+        annotated["playbook_applied"] = True
+        annotated["recovery"] = {"strategy": strategy, "retries": retries_done}
+        return annotated
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de la recuperación nativa para reporting."""
+        return {
+            "recoveries": self.recoveries,
+            "retries": self.retries,
+            "exhausted": self.exhausted,
+            "fail_fast": self.fail_fast,
+            "cache_fallbacks": self.cache_fallbacks,
+            "waited_s": round(self.waited_seconds, 3),
+        }
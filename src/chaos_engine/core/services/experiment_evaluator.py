@@ -1,7 +1,7 @@
 """
 ExperimentEvaluator Service - Orchestrates experiment evaluation (FIXED)
 
-Location: src/chaos_playbook_engine/services/experiment_evaluator.py
+Location: src/chaos_engine/core/services/experiment_evaluator.py
 
 Purpose: Provides high-level interface for evaluating experiments using
          ExperimentJudgeAgent. Formats traces, runs evaluation, parses results.
@@ -13,12 +13,24 @@ FIX: _parse_judge_response() now handles BOTH response formats:
      This preserves original intent: "Parse judge output for outcome/confidence/promoted" ✅
 """
 
-from typing import Any, Dict, Optional
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
 from datetime import datetime
+from uuid import uuid4
 
-#from agents.experiment_judge import create_experiment_judge_agent
-from storage.playbook_storage import PlaybookStorage
-from services.runner_factory import InMemoryRunner
+from google.adk.runners import InMemoryRunner
+
+# ✅ FIX: Imports con rutas del paquete (antes: storage.* / services.*, inexistentes)
+from chaos_engine.core.playbook_storage import PlaybookStorage
+from chaos_engine.core.services.prejudge import RuleBasedPrejudge
+from chaos_engine.core.services.verdict_cache import VerdictCache, trace_signature
+from chaos_engine.core.rate_limiter import (
+    RateLimitExceeded,
+    RateLimitedScheduler,
+    is_rate_limit_error,
+    parse_retry_after,
+)
 
 
 class ExperimentEvaluator:
@@ -33,19 +45,60 @@ class ExperimentEvaluator:
         5. If promoted: call saveprocedure automatically
         6. Return evaluation result
 
+    Dependencies are injected: pass the judge agent (an InMemoryRunner is
+    built for it) or a ready `runner`, plus any PlaybookStorage backend.
+
     Example:
-        >>> evaluator = ExperimentEvaluator()
+        >>> evaluator = ExperimentEvaluator(judge=judge_agent, concurrency=8)
         >>> trace = {...experiment events...}
         >>> result = await evaluator.evaluate_experiment(trace, "EXP-001")
         >>> print(result["promoted"])  # True/False
         >>> print(result["procedure_id"])  # If promoted
     """
 
-    def __init__(self):
-        """Initialize evaluator with judge agent and storage."""
-        self.judge = create_experiment_judge_agent()
-        self.runner = InMemoryRunner(agent=self.judge)
-        self.storage = PlaybookStorage()
+    USER_ID = "experiment_judge"
+
+    def __init__(
+        self,
+        judge: Optional[Any] = None,
+        runner: Optional[Any] = None,
+        storage: Optional[PlaybookStorage] = None,
+        concurrency: int = 4,
+        rate_limiter: Optional[RateLimitedScheduler] = None,
+        prejudge: Optional[RuleBasedPrejudge] = None,
+        use_prejudge: bool = True,
+        verdict_cache: Optional[VerdictCache] = None,
+        use_verdict_cache: bool = True
+    ):
+        """
+        Initialize evaluator with judge runner and storage.
+
+        Args:
+            judge: ADK agent acting as ExperimentJudgeAgent (ignored if `runner` given)
+            runner: Object exposing `run_debug(prompt, user_id=, session_id=)`
+            storage: Playbook backend for promoted procedures
+            concurrency: Max judge calls in flight in batch mode
+            rate_limiter: Optional shared RPM/TPM scheduler for judge calls
+            prejudge: Deterministic classifier for unambiguous traces
+            use_prejudge: False sends every trace to the judge
+            verdict_cache: Cache of judge verdicts by trace signature
+            use_verdict_cache: False judges every escalated trace individually
+        """
+        if runner is None:
+            if judge is None:
+                raise ValueError("ExperimentEvaluator needs a judge agent or a runner")
+            runner = InMemoryRunner(agent=judge)
+        self.judge = judge
+        self.runner = runner
+        self.storage = storage if storage is not None else PlaybookStorage()
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = rate_limiter
+        # Fast path: solo las trazas ambiguas llegan al juez LLM
+        self.prejudge = (prejudge or RuleBasedPrejudge()) if use_prejudge else None
+        # Trazas con la misma firma reutilizan el veredicto del juez
+        self.verdict_cache = (verdict_cache or VerdictCache()) if use_verdict_cache else None
+        self.judge_calls = 0
+        self.logger = logging.getLogger("ExperimentEvaluator")
 
     async def evaluate_experiment(
         self,
@@ -78,18 +131,66 @@ class ExperimentEvaluator:
         Raises:
             ValueError: If trace format invalid
         """
+        evaluation = await self._judge_experiment(trace, experiment_id)
+
+        # If promoted, save procedure automatically
+        if evaluation.get("promoted") and "recovery_strategy" in evaluation:
+            try:
+                procedure_id = await self.storage.save_procedure(
+                    **self._procedure_entry(trace, evaluation, experiment_id)
+                )
+                evaluation["procedure_id"] = procedure_id
+            except Exception as e:
+                # Evaluation succeeded but couldn't save procedure
+                evaluation["save_error"] = str(e)
+
+        return evaluation
+
+    async def _judge_experiment(
+        self,
+        trace: Dict[str, Any],
+        experiment_id: str
+    ) -> Dict[str, Any]:
+        """Validate, prompt the judge and parse its verdict (no storage writes)."""
         # Validate trace
         self._validate_trace(trace)
 
+        # Casos inequívocos: veredicto local, sin llamada al juez
+        if self.prejudge is not None:
+            verdict = self.prejudge.classify(trace, experiment_id)
+            if verdict is not None:
+                return verdict
+
+        if self.verdict_cache is None:
+            decision = await self._judge_decision(trace, experiment_id)
+            return self._verdict_for_trace(decision, trace, experiment_id)
+
+        # ✅ FIX: La caché guarda SOLO la decisión del juez; los campos que salen
+        # de la traza (recovery_strategy, success_rate) se reconstruyen siempre
+        decision, source = await self.verdict_cache.get_or_compute(
+            trace_signature(trace),
+            lambda: self._judge_decision(trace, experiment_id),
+            cacheable=lambda d: d.get("outcome") != "error"
+        )
+        verdict = self._verdict_for_trace(decision, trace, experiment_id)
+        if source != "miss":
+            verdict["verdict_cache"] = source
+        return verdict
+
+    async def _judge_decision(
+        self,
+        trace: Dict[str, Any],
+        experiment_id: str
+    ) -> Dict[str, Any]:
+        """One LLM judge round-trip for a (validated) trace -> judge decision only."""
         # Format trace as natural language for judge
         prompt = self._format_trace_prompt(trace, experiment_id)
 
         # Run judge to evaluate
         try:
-            response = await self.runner.run_debug(prompt)
+            response = await self._call_judge(prompt, experiment_id)
         except Exception as e:
             return {
-                "experiment_id": experiment_id,
                 "outcome": "error",
                 "confidence": 0.0,
                 "reasoning": f"Judge evaluation failed: {str(e)}",
@@ -97,28 +198,76 @@ class ExperimentEvaluator:
             }
 
         # Parse judge response
-        evaluation = self._parse_judge_response(response, experiment_id, trace)
+        return self._decision_from_response(response)
 
-        # If promoted, save procedure automatically
-        if evaluation.get("promoted") and "recovery_strategy" in evaluation:
+    async def _call_judge(self, prompt: str, experiment_id: str):
+        """
+        One judge round-trip in its OWN session.
+
+        run_debug reutiliza la sesión si el id ya existe: con el id por
+        defecto, evaluaciones concurrentes compartirían historial.
+        """
+        session_id = f"judge-{experiment_id}-{uuid4().hex[:8]}"
+        self.judge_calls += 1
+
+        async def call():
+            reserved = await self.rate_limiter.acquire() if self.rate_limiter else 0.0
+            tokens = 0
             try:
-                procedure_id = await self.storage.save_procedure(
-                    failure_type=trace.get("chaos_scenario", "unknown"),
-                    api=trace.get("failed_api", "unknown"),
-                    recovery_strategy=evaluation["recovery_strategy"],
-                    success_rate=evaluation.get("success_rate", 0.9),
-                    metadata={
-                        "experiment_id": experiment_id,
-                        "judge_confidence": evaluation.get("confidence", 0.0),
-                        "evaluated_at": datetime.utcnow().isoformat() + "Z"
-                    }
+                response = await self.runner.run_debug(
+                    prompt, user_id=self.USER_ID, session_id=session_id, quiet=True
+                )
+                tokens = sum(
+                    getattr(getattr(event, "usage_metadata", None), "total_token_count", None) or 0
+                    for event in (response if isinstance(response, list) else [])
                 )
-                evaluation["procedure_id"] = procedure_id
             except Exception as e:
-                # Evaluation succeeded but couldn't save procedure
-                evaluation["save_error"] = str(e)
+                if self.rate_limiter is not None and is_rate_limit_error(e):
+                    raise RateLimitExceeded(str(e), retry_after=parse_retry_after(e)) from e
+                raise
+            finally:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.record_usage(tokens, reserved)
+            if self.rate_limiter is not None:
+                self.rate_limiter.report_success()
+            return response
 
-        return evaluation
+        try:
+            if self.rate_limiter is not None:
+                return await self.rate_limiter.run(call)
+            return await call()
+        finally:
+            await self._release_session(session_id)
+
+    async def _release_session(self, session_id: str):
+        session_service = getattr(self.runner, "session_service", None)
+        if session_service is None:
+            return
+        try:
+            await session_service.delete_session(
+                app_name=self.runner.app_name, user_id=self.USER_ID, session_id=session_id
+            )
+        except Exception as e:
+            self.logger.debug(f"Could not delete judge session {session_id}: {e}")
+
+    def _procedure_entry(
+        self,
+        trace: Dict[str, Any],
+        evaluation: Dict[str, Any],
+        experiment_id: str
+    ) -> Dict[str, Any]:
+        """save_procedure arguments for a promoted evaluation."""
+        return {
+            "failure_type": trace.get("chaos_scenario", "unknown"),
+            "api": trace.get("failed_api", "unknown"),
+            "recovery_strategy": evaluation["recovery_strategy"],
+            "success_rate": evaluation.get("success_rate", 0.9),
+            "metadata": {
+                "experiment_id": experiment_id,
+                "judge_confidence": evaluation.get("confidence", 0.0),
+                "evaluated_at": datetime.utcnow().isoformat() + "Z"
+            }
+        }
 
     def _validate_trace(self, trace: Dict[str, Any]):
         """
@@ -214,6 +363,38 @@ Be conservative - only promote if outcome is clearly successful and recovery was
 
         Returns:
             Structured evaluation result
+        """
+        return self._verdict_for_trace(self._decision_from_response(response), trace, experiment_id)
+
+    def _verdict_for_trace(
+        self,
+        decision: Dict[str, Any],
+        trace: Dict[str, Any],
+        experiment_id: str
+    ) -> Dict[str, Any]:
+        """Fresh evaluation result: judge decision + fields derived from THIS trace."""
+        result = {
+            "experiment_id": experiment_id,
+            "outcome": decision["outcome"],
+            "confidence": decision["confidence"],
+            "reasoning": decision["reasoning"],
+            "promoted": decision["promoted"],
+        }
+
+        # If promoted, extract strategy info from trace
+        if result["promoted"]:
+            result["recovery_strategy"] = trace.get("recovery_strategy",
+                                                   "Retry strategy (details from trace)")
+            result["success_rate"] = trace.get("success_rate", 0.85)
+
+        return result
+
+    def _decision_from_response(self, response) -> Dict[str, Any]:
+        """
+        Judge's own decision (outcome, confidence, reasoning, promoted).
+
+        Nothing here depends on the trace, so it is safe to reuse across
+        traces with the same signature (VerdictCache).
 
         FIX: Now handles BOTH formats:
              - List of Events (ADK InMemoryRunner) ✅
@@ -264,43 +445,92 @@ Be conservative - only promote if outcome is clearly successful and recovery was
         elif "partial" in judge_output.lower():
             outcome = "partial"
 
-        result = {
-            "experiment_id": experiment_id,
+        return {
             "outcome": outcome,
             "confidence": confidence,
             "reasoning": judge_output[:200] + "..." if len(judge_output) > 200 else judge_output,
             "promoted": promoted,
         }
 
-        # If promoted, extract strategy info from trace
-        if promoted:
-            result["recovery_strategy"] = trace.get("recovery_strategy",
-                                                   "Retry strategy (details from trace)")
-            result["success_rate"] = trace.get("success_rate", 0.85)
-
-        return result
-
     async def evaluate_experiments_batch(
         self,
         traces: list[Dict[str, Any]],
-        experiment_ids: Optional[list[str]] = None
+        experiment_ids: Optional[list[str]] = None,
+        concurrency: Optional[int] = None
     ) -> list[Dict[str, Any]]:
         """
-        Evaluate multiple experiments.
+        Evaluate multiple experiments concurrently.
+
+        Judge calls run with at most `concurrency` in flight (and through the
+        rate limiter, if any). Promoted procedures are collected and saved
+        with ONE `storage.save_procedures` call at the end.
 
         Args:
             traces: List of experiment traces
             experiment_ids: Optional list of IDs (auto-generated if not provided)
+            concurrency: Override of the evaluator's concurrency cap
 
         Returns:
-            List of evaluation results
+            List of evaluation results (same order as `traces`)
         """
         if experiment_ids is None:
             experiment_ids = [f"EXP-{i:03d}" for i in range(1, len(traces) + 1)]
 
-        results = []
-        for trace, exp_id in zip(traces, experiment_ids):
-            result = await self.evaluate_experiment(trace, exp_id)
-            results.append(result)
+        semaphore = asyncio.Semaphore(max(1, concurrency or self.concurrency))
 
+        async def judge_bounded(trace, exp_id):
+            async with semaphore:
+                try:
+                    return await self._judge_experiment(trace, exp_id)
+                except ValueError as e:
+                    # Traza inválida: no abortar el lote entero
+                    return {
+                        "experiment_id": exp_id,
+                        "outcome": "error",
+                        "confidence": 0.0,
+                        "reasoning": f"Invalid trace: {e}",
+                        "promoted": False
+                    }
+
+        results = list(await asyncio.gather(
+            *(judge_bounded(trace, exp_id) for trace, exp_id in zip(traces, experiment_ids))
+        ))
+
+        await self._save_promoted(traces, results)
         return results
+
+    async def _save_promoted(self, traces: List[Dict[str, Any]], results: List[Dict[str, Any]]):
+        """Commit every promoted procedure in a single storage write."""
+        pending, entries = [], []
+        for trace, evaluation in zip(traces, results):
+            if not (evaluation.get("promoted") and "recovery_strategy" in evaluation):
+                continue
+            entry = self._procedure_entry(trace, evaluation, evaluation["experiment_id"])
+            try:
+                # Las entradas inválidas se marcan aquí para que no tumben el lote
+                self.storage.validate_entry(entry)
+            except ValueError as e:
+                evaluation["save_error"] = str(e)
+                continue
+            pending.append(evaluation)
+            entries.append(entry)
+
+        if not entries:
+            return
+        try:
+            procedure_ids = await self.storage.save_procedures(entries)
+        except Exception as e:
+            for evaluation in pending:
+                evaluation["save_error"] = str(e)
+            return
+        for evaluation, procedure_id in zip(pending, procedure_ids):
+            evaluation["procedure_id"] = procedure_id
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Judge calls made, prejudge escalation rate and verdict cache reuse."""
+        stats: Dict[str, Any] = {"judge_calls": self.judge_calls}
+        if self.prejudge is not None:
+            stats["prejudge"] = self.prejudge.get_stats()
+        if self.verdict_cache is not None:
+            stats["verdict_cache"] = self.verdict_cache.get_stats()
+        return stats
@@ -0,0 +1,79 @@
+"""
+RuleBasedPrejudge - Deterministic fast path before the LLM judge.
+
+La mayoría de trazas son triviales y no necesitan un juez LLM:
+
+- clean_success: todos los eventos OK y outcome de éxito -> success, sin
+  promoción (no hubo recuperación que aprender).
+- unrecovered_failure: hubo errores, ninguna tool fallida se reintentó y el
+  outcome es de fallo -> failure, sin promoción.
+
+Todo lo demás (errores con reintentos, outcomes que contradicen los
+eventos, outcomes desconocidos) es ambiguo y se escala al juez.
+"""
+
+from typing import Any, Dict, List, Optional
+
+SUCCESS_OUTCOMES = {"success", "order_completed", "completed"}
+FAILURE_OUTCOMES = {"failure", "order_incomplete", "failed"}
+
+
+def _was_retried(events: List[Dict[str, Any]]) -> bool:
+    """¿Alguna tool que falló se volvió a llamar? (o el evento ya trae attempt > 1)."""
+    failed_tools = set()
+    for event in events:
+        tool = event.get("tool")
+        if event.get("attempt", 1) > 1 or tool in failed_tools:
+            return True
+        if event.get("status") == "error":
+            failed_tools.add(tool)
+    return False
+
+
+class RuleBasedPrejudge:
+    """Clasifica localmente las trazas inequívocas y cuenta cuántas se escalan."""
+
+    def __init__(self):
+        self.stats = {"total": 0, "escalated": 0, "clean_success": 0, "unrecovered_failure": 0}
+
+    def classify(self, trace: Dict[str, Any], experiment_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Veredicto local (mismo formato que ExperimentEvaluator) o None si hay que escalar.
+        """
+        self.stats["total"] += 1
+        events = trace.get("events", [])
+        outcome = str(trace.get("outcome", "")).lower()
+        errors = [e for e in events if e.get("status") == "error"]
+
+        rule = None
+        if not errors and events and outcome in SUCCESS_OUTCOMES:
+            rule, verdict, reasoning = "clean_success", "success", "All steps succeeded without errors."
+        elif errors and outcome in FAILURE_OUTCOMES and not _was_retried(events):
+            first = errors[0]
+            rule, verdict = "unrecovered_failure", "failure"
+            reasoning = (
+                f"{first.get('tool', 'unknown')} failed ({first.get('error_code', 'unknown')}) "
+                "and no recovery was attempted."
+            )
+
+        if rule is None:
+            self.stats["escalated"] += 1
+            return None
+
+        self.stats[rule] += 1
+        return {
+            "experiment_id": experiment_id,
+            "outcome": verdict,
+            "confidence": 1.0,
+            "reasoning": reasoning,
+            "promoted": False,
+            "decided_by": f"rules:{rule}",
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.stats["total"]
+        return {
+            **self.stats,
+            "decided": total - self.stats["escalated"],
+            "escalation_rate": self.stats["escalated"] / total if total else 0.0,
+        }
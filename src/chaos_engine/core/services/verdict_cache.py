@@ -0,0 +1,143 @@
+"""
+VerdictCache - Reuse judge decisions for structurally identical traces.
+
+Muchas trazas son el mismo patrón ("inventory 503, reintento, éxito") y solo
+difieren en el ID y en los milisegundos. `trace_signature` las canoniza:
+
+    (outcome, chaos_scenario, failed_api, recovery_strategy,
+     bucket(total_duration), ((tool, status, error_code, bucket(duration)), ...))
+
+con las duraciones agrupadas en buckets logarítmicos, y `VerdictCache`
+guarda el veredicto del juez por firma (LRU). Las evaluaciones concurrentes
+de la misma firma comparten UNA llamada al juez (dedup en vuelo).
+"""
+
+import asyncio
+import bisect
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+# Límites superiores (segundos) de cada bucket de duración
+DURATION_BUCKETS: Tuple[float, ...] = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+
+def duration_bucket(seconds: Any, buckets: Sequence[float] = DURATION_BUCKETS) -> int:
+    """Índice del bucket (len(buckets) = más largo que el último límite)."""
+    try:
+        return bisect.bisect_left(buckets, float(seconds))
+    except (TypeError, ValueError):
+        return -1
+
+
+def trace_signature(trace: Dict[str, Any], buckets: Sequence[float] = DURATION_BUCKETS) -> Tuple:
+    """Firma canónica e inmutable de una traza (independiente del experiment_id)."""
+    events = tuple(
+        (
+            event.get("tool"),
+            event.get("status"),
+            str(event.get("error_code")) if event.get("status") == "error" else None,
+            duration_bucket(event.get("duration", 0), buckets),
+        )
+        for event in trace.get("events", [])
+    )
+    return (
+        trace.get("outcome"),
+        trace.get("chaos_scenario"),
+        trace.get("failed_api"),
+        trace.get("recovery_strategy"),
+        duration_bucket(trace.get("total_duration", 0), buckets),
+        events,
+    )
+
+
+class VerdictCache:
+    """LRU firma -> veredicto, con deduplicación de cálculos en vuelo."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, signature: Hashable) -> Optional[Dict[str, Any]]:
+        """Copia del veredicto guardado (los llamadores pueden modificarla)."""
+        verdict = self._entries.get(signature)
+        if verdict is None:
+            return None
+        self._entries.move_to_end(signature)
+        return dict(verdict)
+
+    def put(self, signature: Hashable, verdict: Dict[str, Any]):
+        # Copia propia: mutar el dict devuelto no altera la caché
+        self._entries[signature] = dict(verdict)
+        self._entries.move_to_end(signature)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get_or_compute(
+        self,
+        signature: Hashable,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        cacheable: Callable[[Dict[str, Any]], bool] = lambda verdict: True
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Veredicto para la firma y cómo se obtuvo: 'hit', 'coalesced' o 'miss'.
+
+        Solo se guardan los veredictos para los que `cacheable` es True (p.ej.
+        no los errores del juez), pero los que esperaban en vuelo los reciben igual.
+        Si el llamador que calcula se cancela, los que esperaban no heredan la
+        cancelación: uno de ellos repite el cálculo.
+        """
+        while True:
+            verdict = self.get(signature)
+            if verdict is not None:
+                self.stats["hits"] += 1
+                return verdict, "hit"
+
+            inflight = self._inflight.get(signature)
+            if inflight is None:
+                break
+            try:
+                verdict = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # ✅ FIX: Si se canceló el líder (y no este waiter), reintentar:
+                # el primer waiter que vuelva pasa a calcular el veredicto
+                if not inflight.cancelled():
+                    raise
+                continue
+            self.stats["coalesced"] += 1
+            return dict(verdict), "coalesced"
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[signature] = future
+        try:
+            verdict = await compute()
+        except asyncio.CancelledError:
+            # La cancelación es del llamador, no del veredicto: no se propaga a los waiters
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Evita "exception was never retrieved" si nadie esperaba
+            raise
+        else:
+            if cacheable(verdict):
+                self.put(signature, verdict)
+            future.set_result(verdict)
+            return verdict, "miss"
+        finally:
+            self._inflight.pop(signature, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+        reused = self.stats["hits"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": reused / lookups if lookups else 0.0,
+        }
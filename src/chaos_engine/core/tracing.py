@@ -0,0 +1,209 @@
+"""
+Tracing - Low-overhead tool-call trace capture (Pilar IV: Observabilidad).
+
+- TraceRecorder: ring buffer PREASIGNADO de tuplas (sin dicts ni strings
+  formateados en el hot path) con timestamps monotónicos, nº de intento
+  por tool y decisión de caos. Si se llena, sobrescribe lo más antiguo y
+  cuenta los eventos descartados.
+- TracingProxy: decorador de executor (misma interfaz que ChaosProxy /
+  CircuitBreakerProxy) que registra cada llamada.
+
+`export()` produce el formato de traza que espera
+ExperimentEvaluator.evaluate_experiment:
+
+    {"events": [{"tool", "status", "duration", "error_code", ...}],
+     "outcome", "total_duration", "chaos_scenario", "failed_api"}
+
+`chaos_scenario` / `failed_api` usan el vocabulario de PlaybookStorage
+(VALID_FAILURE_TYPES / VALID_APIS) para que un veredicto promovido se
+pueda guardar tal cual con save_procedures. Los eventos conservan el
+código HTTP y el nombre de tool originales.
+"""
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from chaos_engine.core.resilience import PlaybookStrategyProxy
+
+# Posiciones dentro de cada evento (tupla)
+_TOOL, _STATUS, _START, _END, _ATTEMPT, _CODE, _CHAOS = range(7)
+
+# Código HTTP -> failure_type de PlaybookStorage
+FAILURE_TYPES_BY_CODE: Dict[int, str] = {
+    400: "invalid_request",
+    404: "invalid_request",
+    408: "timeout",
+    422: "invalid_request",
+    429: "rate_limit_exceeded",
+    500: "service_unavailable",
+    502: "network_error",
+    503: "service_unavailable",
+    504: "timeout",
+}
+
+# Tool del agente / paso del workflow -> api de PlaybookStorage
+TOOL_APIS: Dict[str, str] = {
+    "get_inventory": "inventory",
+    "find_pets_by_status": "inventory",
+    "place_order": "payments",
+    "update_pet_status": "erp",
+    "inventory": "inventory",
+    "payment": "payments",
+    "erp": "erp",
+    "shipping": "shipping",
+}
+
+
+def failure_type_for(error_code: Any) -> str:
+    """failure_type de PlaybookStorage para un código de error ('unknown' si no se reconoce)."""
+    try:
+        return FAILURE_TYPES_BY_CODE.get(int(error_code), "unknown")
+    except (TypeError, ValueError):
+        return "unknown"
+
+
+def api_for(tool: str) -> str:
+    """api de PlaybookStorage para una tool / paso ('unknown' si no se reconoce)."""
+    return TOOL_APIS.get(tool, "unknown")
+
+
+class TraceRecorder:
+    """Ring buffer de eventos de tool-call para UN experimento."""
+
+    __slots__ = ("capacity", "_clock", "_buffer", "_count", "_attempts", "_origin")
+
+    def __init__(self, capacity: int = 256, clock: Callable[[], float] = time.perf_counter):
+        if capacity <= 0:
+            raise ValueError(f"capacity must be > 0, got {capacity}")
+        self.capacity = capacity
+        self._clock = clock
+        self._buffer: List[Optional[tuple]] = [None] * capacity
+        self._count = 0
+        self._attempts: Dict[str, int] = {}
+        self._origin = clock()
+
+    def now(self) -> float:
+        return self._clock()
+
+    def record(
+        self,
+        tool: str,
+        status: str,
+        started: float,
+        ended: float,
+        error_code: Optional[Any] = None,
+        chaos_injected: bool = False
+    ) -> int:
+        """Registra una llamada; devuelve su nº de intento (1 = primera llamada a esa tool)."""
+        attempt = self._attempts.get(tool, 0) + 1
+        self._attempts[tool] = attempt
+        self._buffer[self._count % self.capacity] = (tool, status, started, ended, attempt, error_code, chaos_injected)
+        self._count += 1
+        return attempt
+
+    def reset(self):
+        """Reutiliza el buffer para otro experimento (sin reasignar)."""
+        self._count = 0
+        self._attempts.clear()
+        self._origin = self._clock()
+
+    @property
+    def dropped(self) -> int:
+        """Eventos sobrescritos por desbordamiento del ring buffer."""
+        return max(0, self._count - self.capacity)
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    def _ordered(self) -> List[tuple]:
+        if self._count <= self.capacity:
+            return self._buffer[:self._count]
+        head = self._count % self.capacity
+        return self._buffer[head:] + self._buffer[:head]
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Eventos (más antiguo primero) en formato de evaluación, con tiempos relativos al inicio."""
+        events = []
+        for event in self._ordered():
+            item = {
+                "tool": event[_TOOL],
+                "status": event[_STATUS],
+                "t": round(event[_START] - self._origin, 4),
+                "duration": round(event[_END] - event[_START], 4),
+                "attempt": event[_ATTEMPT],
+            }
+            if event[_CODE] is not None:
+                item["error_code"] = event[_CODE]
+            if event[_CHAOS]:
+                item["chaos_injected"] = True
+            events.append(item)
+        return events
+
+    def export(self, outcome: str, **extra: Any) -> Dict[str, Any]:
+        """
+        Traza compacta del experimento (formato ExperimentEvaluator).
+
+        `chaos_scenario` y `failed_api` se derivan del primer / último error
+        (mapeados a failure_type / api de PlaybookStorage) si no se pasan
+        explícitamente en `extra`.
+        """
+        events = self.events()
+        errors = [e for e in events if e["status"] == "error"]
+        trace = {
+            "events": events,
+            "outcome": outcome,
+            "total_duration": round(self._clock() - self._origin, 4),
+            "chaos_scenario": failure_type_for(errors[0].get("error_code")) if errors else "none",
+            "failed_api": api_for(errors[-1]["tool"]) if errors else None,
+            "dropped_events": self.dropped,
+        }
+        trace.update(extra)
+        return trace
+
+    def to_json(self, outcome: str, **extra: Any) -> str:
+        """Export en una línea (JSONL)."""
+        return json.dumps(self.export(outcome, **extra), separators=(",", ":"), default=str)
+
+
+def is_chaos_injected(response: Dict[str, Any]) -> bool:
+    """Errores generados por ChaosProxy (directos o enriquecidos por las APIs simuladas)."""
+    if response.get("chaos_injected"):
+        return True
+    metadata = response.get("metadata")
+    return isinstance(metadata, dict) and bool(metadata.get("chaos_injected"))
+
+
+class TracingProxy:
+    """
+    Decorador de executor que registra cada llamada en un TraceRecorder.
+
+    Cadena recomendada (ve cada intento, incluidos los reintentos nativos
+    y las peticiones bloqueadas por el circuit breaker):
+        PlaybookStrategyProxy -> TracingProxy -> CircuitBreakerProxy -> ... -> ChaosProxy
+    """
+
+    def __init__(self, wrapped_executor, recorder: TraceRecorder, endpoint_tools: Optional[Dict] = None):
+        self._executor = wrapped_executor
+        self.recorder = recorder
+        self._endpoint_tools = endpoint_tools if endpoint_tools is not None else PlaybookStrategyProxy.ENDPOINT_TOOLS
+
+    def calculate_jittered_backoff(self, seconds: float) -> float:
+        """Delega el cálculo de jitter al executor interno."""
+        if hasattr(self._executor, "calculate_jittered_backoff"):
+            return self._executor.calculate_jittered_backoff(seconds)
+        return seconds
+
+    async def send_request(self, method: str, endpoint: str, params: Optional[Dict] = None, json_body: Optional[Dict] = None) -> Dict[str, Any]:
+        recorder = self.recorder
+        started = recorder.now()
+        response = await self._executor.send_request(method, endpoint, params, json_body)
+        status = response.get("status", "unknown")
+        recorder.record(
+            self._endpoint_tools.get((method.upper(), endpoint)) or f"{method.upper()} {endpoint}",
+            status,
+            started,
+            recorder.now(),
+            response.get("code") if status == "error" else None,
+            is_chaos_injected(response),
+        )
+        return response
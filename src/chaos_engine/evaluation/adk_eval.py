@@ -0,0 +1,127 @@
+"""
+In-memory ADK evaluation - AgentEvaluator sin ficheros ni monkeypatching.
+
+`AgentEvaluator.evaluate()` necesita un módulo importable (root_agent
+global) y un dataset en disco, y lanza AssertionError en vez de devolver
+puntuaciones. Aquí el agente y los casos son objetos en memoria:
+
+    agent = create_order_agent(executor=chaos_proxy, playbook_manager=playbook)
+    eval_set = build_eval_set([{"query": ..., "expected_tool_use": [...], "reference": ...}])
+    scores = await evaluate_agent(agent, eval_set, num_runs=1)
+    scores["tool_trajectory_avg_score"]  # -> 0.0 .. 1.0
+    classify_score(scores["tool_trajectory_avg_score"])  # -> ("success", 0)
+
+Cada llamada crea su propio LocalEvalService (sesiones en memoria), así
+que se pueden lanzar muchas evaluaciones concurrentes en el mismo proceso.
+"""
+
+import statistics
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.agents.base_agent import BaseAgent
+from google.adk.evaluation.constants import MISSING_EVAL_DEPENDENCIES_MESSAGE
+from google.adk.evaluation.eval_config import EvalConfig, get_eval_metrics_from_config, get_evaluation_criteria_or_default
+from google.adk.evaluation.eval_set import EvalSet
+from google.adk.evaluation.in_memory_eval_sets_manager import InMemoryEvalSetsManager
+from google.adk.evaluation.local_eval_sets_manager import convert_eval_set_to_pydantic_schema
+from google.adk.evaluation.user_simulator_provider import UserSimulatorProvider
+
+_APP_NAME = "chaos_eval"
+
+# tool_trajectory_avg_score mínimo para contar una ejecución como éxito en el A/B
+PASS_THRESHOLD = 0.4
+
+
+def build_eval_set(
+    cases: List[Dict[str, Any]],
+    name: str = "in_memory",
+    initial_session: Optional[Dict[str, Any]] = None
+) -> EvalSet:
+    """
+    EvalSet a partir de casos en el formato "antiguo" de ADK (sin tocar disco).
+
+    Args:
+        cases: [{"query", "expected_tool_use", "reference"}, ...] (una conversación)
+        name: Nombre del caso de evaluación
+        initial_session: Estado inicial de sesión (opcional)
+    """
+    return convert_eval_set_to_pydantic_schema(
+        eval_set_id=str(uuid.uuid4()),
+        eval_set_in_json_format=[{"name": name, "data": cases, "initial_session": initial_session or {}}],
+    )
+
+
+def default_eval_config() -> EvalConfig:
+    """Criterios por defecto de ADK (los mismos que usa evaluate() sin test_config.json)."""
+    return get_evaluation_criteria_or_default(None)
+
+
+def classify_score(tool_score: Optional[float], pass_threshold: float = PASS_THRESHOLD) -> Tuple[str, int]:
+    """
+    tool_trajectory_avg_score -> (outcome, inconsistencias).
+
+    Por debajo del umbral es "failure"; una trayectoria parcial (0 < score <
+    umbral) cuenta además como inconsistencia. None (no evaluable) = 0.0.
+    """
+    score = tool_score or 0.0
+    outcome = "success" if score >= pass_threshold else "failure"
+    inconsistency = 1 if 0.0 < score < pass_threshold else 0
+    return outcome, inconsistency
+
+
+async def evaluate_agent(
+    agent: BaseAgent,
+    eval_set: EvalSet,
+    eval_config: Optional[EvalConfig] = None,
+    num_runs: int = 1
+) -> Dict[str, Optional[float]]:
+    """
+    Inferencia + métricas de ADK sobre un agente ya construido.
+
+    Returns:
+        {metric_name: media de las puntuaciones (None si no se pudo evaluar)}
+    """
+    try:
+        from google.adk.evaluation.base_eval_service import (
+            EvaluateConfig,
+            EvaluateRequest,
+            InferenceConfig,
+            InferenceRequest,
+        )
+        from google.adk.evaluation.local_eval_service import LocalEvalService
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError(MISSING_EVAL_DEPENDENCIES_MESSAGE) from e
+
+    eval_config = eval_config or default_eval_config()
+
+    eval_sets_manager = InMemoryEvalSetsManager()
+    eval_sets_manager.create_eval_set(app_name=_APP_NAME, eval_set_id=eval_set.eval_set_id)
+    for eval_case in eval_set.eval_cases:
+        eval_sets_manager.add_eval_case(app_name=_APP_NAME, eval_set_id=eval_set.eval_set_id, eval_case=eval_case)
+
+    eval_service = LocalEvalService(
+        root_agent=agent,
+        eval_sets_manager=eval_sets_manager,
+        user_simulator_provider=UserSimulatorProvider(user_simulator_config=eval_config.user_simulator_config),
+    )
+
+    inference_results = []
+    for _ in range(num_runs):
+        request = InferenceRequest(app_name=_APP_NAME, eval_set_id=eval_set.eval_set_id, inference_config=InferenceConfig())
+        async for inference_result in eval_service.perform_inference(inference_request=request):
+            inference_results.append(inference_result)
+
+    scores: Dict[str, List[float]] = {}
+    evaluate_request = EvaluateRequest(
+        inference_results=inference_results,
+        evaluate_config=EvaluateConfig(eval_metrics=get_eval_metrics_from_config(eval_config)),
+    )
+    async for case_result in eval_service.evaluate(evaluate_request=evaluate_request):
+        for per_invocation in case_result.eval_metric_result_per_invocation:
+            for metric_result in per_invocation.eval_metric_results:
+                bucket = scores.setdefault(metric_result.metric_name, [])
+                if metric_result.score is not None:
+                    bucket.append(metric_result.score)
+
+    return {name: (statistics.mean(values) if values else None) for name, values in scores.items()}
@@ -0,0 +1,122 @@
+"""
+EvaluationCache - Re-evaluación incremental (caché tipo "build cache").
+
+Un caso que pasó no se vuelve a ejecutar mientras no cambie ninguna de sus
+entradas:
+
+- Clave estática (SHA-256): definición completa del caso (input, chaos
+  config, expected, repeat), modelo, constructor del LLM, mock_mode y
+  versión del código del agente (hash de los .py de chaos_engine).
+- Dependencias dinámicas: las entradas del playbook que la ejecución
+  consultó de verdad (`playbook_lookups` de process_order, + "default" si
+  hubo alguna consulta), guardadas con el hash de su contenido. Como un
+  depfile de make: si se edita place_order/503, solo se re-ejecutan los
+  casos que consultaron place_order/503; el happy path no consulta el
+  playbook y nunca se invalida por editarlo.
+
+Almacén: <cache_dir>/<key[:2]>/<key>.json (escritura atómica, seguro entre
+procesos y shards). Solo se guardan resultados que pasaron.
+"""
+
+import functools
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import chaos_engine
+
+CACHE_FORMAT = 1
+
+
+def _digest(obj: Any) -> str:
+    canonical = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def code_version(package_root: Optional[str] = None) -> str:
+    """Hash de todos los .py del paquete (ruta relativa + contenido)."""
+    root = Path(package_root or Path(chaos_engine.__file__).parent)
+    sha = hashlib.sha256()
+    for source in sorted(root.rglob("*.py")):
+        sha.update(source.relative_to(root).as_posix().encode("utf-8"))
+        sha.update(source.read_bytes())
+    return sha.hexdigest()
+
+
+def playbook_dependencies(playbook: Any, lookups: Iterable[Sequence[str]]) -> Dict[str, str]:
+    """{"tool:code": hash de la entrada (o de None si no existe), "default": ...}."""
+    deps = {f"{tool}:{code}": _digest(playbook.lookup(tool, code)) for tool, code in lookups}
+    if deps:
+        deps["default"] = _digest(playbook.default)
+    return deps
+
+
+def _collect_lookups(metrics: Dict[str, Any]) -> Optional[List[List[str]]]:
+    """Lookups de un resultado (ejecución única o repetida); None si no se registraron."""
+    if "playbook_lookups" in metrics:
+        return metrics["playbook_lookups"]
+    runs = metrics.get("runs")
+    if runs and all("playbook_lookups" in run for run in runs):
+        return sorted({tuple(lookup) for run in runs for lookup in run["playbook_lookups"]})
+    return None
+
+
+class EvaluationCache:
+    """Resultados de casos que pasaron, direccionados por contenido."""
+
+    def __init__(self, cache_dir: str, context: Dict[str, Any]):
+        """
+        Args:
+            cache_dir: Directorio del almacén
+            context: Entradas comunes a todos los casos (modelo, llm, mock_mode, ...);
+                     la versión del código se añade aquí.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.context = {**context, "code_version": code_version(), "format": CACHE_FORMAT}
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "stored": 0}
+
+    def case_key(self, case: Dict[str, Any]) -> str:
+        return _digest({"case": case, **self.context})
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def lookup(self, case: Dict[str, Any], playbook: Any) -> Optional[Dict[str, Any]]:
+        """Resultado guardado (dict de TestResult) si ninguna dependencia cambió."""
+        entry_path = self._entry_path(self.case_key(case))
+        try:
+            entry = json.loads(entry_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.stats["misses"] += 1
+            return None
+
+        lookups = [dep.split(":", 1) for dep in entry["deps"] if dep != "default"]
+        if playbook_dependencies(playbook, lookups) != entry["deps"]:
+            self.stats["stale"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        return entry["result"]
+
+    def store(self, case: Dict[str, Any], result: Dict[str, Any], playbook: Any) -> bool:
+        """Guarda un resultado que pasó. False si no es cacheable."""
+        lookups = _collect_lookups(result.get("metrics", {}))
+        if not result.get("passed") or lookups is None:
+            return False
+
+        entry_path = self._entry_path(self.case_key(case))
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(
+            json.dumps({"deps": playbook_dependencies(playbook, lookups), "result": result}, ensure_ascii=False),
+            encoding="utf-8"
+        )
+        os.replace(tmp_path, entry_path)
+        self.stats["stored"] += 1
+        return True
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
@@ -2,19 +2,27 @@
 Evaluation Runner - Validates agent against defined test cases.
 Updated with Observability (Logging) and Phase 6 Dependency Injection.
 """
+import asyncio
+import contextlib
 import json
 import time
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 
 # ✅ Nuevas importaciones para la Inyección de Dependencias
-from chaos_engine.agents.petstore import PetstoreAgent
+from chaos_engine.agents.petstore import PetstoreAgent, LLMClientConstructor
 from chaos_engine.chaos.proxy import ChaosProxy
 from chaos_engine.core.resilience import CircuitBreakerProxy
 from chaos_engine.core.config import load_config, get_model_name
+from chaos_engine.evaluation.sharding import build_report, select_shard
+from chaos_engine.evaluation.slo import evaluate_slo, measures_latency
+from chaos_engine.evaluation.cache import EvaluationCache
 from google.adk.models.google_llm import Gemini
 
+# Sin límite de concurrencia (llamadas directas a _execute_case sin semáforo)
+_NO_LIMIT = contextlib.nullcontext()
+
 @dataclass
 class TestResult:
     case_id: str
@@ -27,12 +35,21 @@ class TestResult:
         return asdict(self)
 
 class EvaluationRunner:
-    def __init__(self, agent_playbook: str):
+    def __init__(
+        self,
+        agent_playbook: str,
+        llm_client_constructor: LLMClientConstructor = Gemini,
+        concurrency: int = 1,
+        config: Optional[Dict[str, Any]] = None,
+        cache_dir: Optional[str] = None
+    ):
         self.logger = logging.getLogger("evaluator")
         self.playbook_path = agent_playbook
+        # Nº máximo de casos en vuelo (1 = secuencial, comportamiento histórico)
+        self.concurrency = max(1, concurrency)
         
         # 1. Cargar Configuración General
-        self.config = load_config()
+        self.config = config if config is not None else load_config()
         self.model_name = get_model_name(self.config)
         
         # 🔥 FIX: Leer mock_mode de la configuración global
@@ -49,59 +66,161 @@ class EvaluationRunner:
         self.circuit_breaker = CircuitBreakerProxy(wrapped_executor=self.current_proxy)
 
         # 3. Inyectar dependencias al Agente
+        # (executor por defecto; cada caso aporta el suyo vía process_order(executor=...))
         self.agent = PetstoreAgent(
             playbook_path=agent_playbook,
             tool_executor=self.circuit_breaker,
-            llm_client_constructor=Gemini,
+            llm_client_constructor=llm_client_constructor,
             model_name=self.model_name,
-            verbose=True
+            verbose=True,
+            mock_mode=self.mock_mode
         )
 
-    async def run_suite(self, suite_path: str) -> List[TestResult]:
-        """Ejecuta una suite completa de tests definida en JSON."""
+        # 4. Caché incremental (opcional): casos que pasaron y cuyas entradas no cambiaron
+        self.cache = None
+        if cache_dir:
+            self.cache = EvaluationCache(cache_dir, context={
+                "model": self.model_name,
+                "llm": getattr(llm_client_constructor, "__qualname__", type(llm_client_constructor).__qualname__),
+                "mock_mode": self.mock_mode
+            })
+
+    async def run_suite(
+        self,
+        suite_path: str,
+        concurrency: Optional[int] = None,
+        shard: Optional[Tuple[int, int]] = None
+    ) -> List[TestResult]:
+        """
+        Ejecuta una suite completa de tests definida en JSON.
+
+        Con `concurrency > 1` los casos corren en paralelo (pool acotado por un
+        semáforo); los resultados se devuelven siempre en el orden de la suite.
+        Los casos con SLO de latencia se ejecutan después, uno a uno, para que
+        su latencia no incluya la contención con otros casos.
+        Con `shard=(i, n)` solo se ejecuta el shard i de n (ver sharding.py).
+        """
         
         with open(suite_path, 'r', encoding='utf-8') as f:
             suite = json.load(f)
+
+        concurrency = max(1, concurrency or self.concurrency)
+        cases = suite['test_cases']
+        if shard is not None:
+            cases = select_shard(cases, *shard)
             
         self.logger.info(f"🧪 STARTING SUITE: {suite['name']}")
+        if shard is not None:
+            self.logger.info(f"🧩 SHARD {shard[0]}/{shard[1]}: {len(cases)} cases")
         self.logger.info(f"⚙️  MODE: {'MOCK (Offline)' if self.mock_mode else 'REAL API'}")
         
-        results = []
-        for case in suite['test_cases']:
-            self.logger.info(f"\n🔹 Running Case: {case['id']} ({case['description']})")
-            result = await self._run_single_case(case)
-            results.append(result)
-            
-            icon = "✅" if result.passed else "❌"
-            self.logger.info(f"   Result: {icon} {result.reason} ({result.duration:.2f}s)")
-            
+        # El semáforo acota EJECUCIONES (casos o repeticiones de un caso), no casos
+        semaphore = asyncio.Semaphore(concurrency)
+
+        if concurrency == 1:
+            results = []
+            for case in cases:
+                self.logger.info(f"\n🔹 Running Case: {case['id']} ({case['description']})")
+                result = await self._run_case_cached(case, semaphore)
+                results.append(result)
+                self._log_result(result)
+            return results
+
+        self.logger.info(f"⚡ CONCURRENCY: {concurrency} runs in flight ({len(cases)} cases)")
+
+        async def run_bounded(case: Dict) -> TestResult:
+            self.logger.info(f"🔹 Running Case: {case['id']} ({case['description']})")
+            result = await self._run_case_cached(case, semaphore)
+            self._log_result(result)
+            return result
+
+        # ✅ FIX: Los casos con SLO de latencia no comparten el event loop con otros
+        isolated = [i for i, case in enumerate(cases) if self._is_latency_case(case)]
+        pooled = [i for i, case in enumerate(cases) if not self._is_latency_case(case)]
+        results: List[Optional[TestResult]] = [None] * len(cases)
+        for i, result in zip(pooled, await asyncio.gather(*(run_bounded(cases[i]) for i in pooled))):
+            results[i] = result
+        for i in isolated:
+            results[i] = await run_bounded(cases[i])
+        # Orden de la suite
         return results
 
-    async def _run_single_case(self, case: Dict) -> TestResult:
-        start_time = time.time()
+    @staticmethod
+    def _is_latency_case(case: Dict) -> bool:
+        return measures_latency(case['expected'].get('slo', {}))
+
+    async def _run_case_cached(self, case: Dict, semaphore: Optional[asyncio.Semaphore] = None) -> TestResult:
+        """_run_single_case con la caché incremental delante (si está activa)."""
+        if self.cache is None:
+            return await self._run_single_case(case, semaphore)
+
+        cached = self.cache.lookup(case, self.agent.playbook)
+        if cached is not None:
+            self.logger.info(f"   ⏭️  [{case['id']}] unchanged since last pass (cached)")
+            return TestResult(**{**cached, "metrics": {**cached["metrics"], "cached": True}})
+
+        result = await self._run_single_case(case, semaphore)
+        self.cache.store(case, result.to_dict(), self.agent.playbook)
+        return result
+
+    def _log_result(self, result: TestResult):
+        icon = "✅" if result.passed else "❌"
+        self.logger.info(f"   Result: {icon} [{result.case_id}] {result.reason} ({result.duration:.2f}s)")
+
+    async def _execute_case(self, case: Dict, seed: int, semaphore: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+        """Una ejecución del caso con su propio proxy/executor (lanza si el agente revienta)."""
         chaos_config = case['chaos_config']
         
         # 🔥 ACTUALIZACIÓN DINÁMICA DE DEPENDENCIAS
         # Aseguramos que el proxy del test también respete el mock_mode
         test_proxy = ChaosProxy(
             failure_rate=chaos_config['rate'],
-            seed=chaos_config['seed'],
+            seed=seed,
             verbose=True,
             mock_mode=self.mock_mode # <--- ¡Importante!
         )
         
         test_executor = CircuitBreakerProxy(wrapped_executor=test_proxy)
         
-        # Intercambiamos el executor del agente "en caliente"
-        self.agent.executor = test_executor
-        
-        # Ejecución
-        try:
-            output = await self.agent.process_order(
+        # ✅ FIX: Executor ligado SOLO a esta ejecución (antes se intercambiaba
+        # self.agent.executor "en caliente", incompatible con casos concurrentes)
+        async with semaphore or _NO_LIMIT:
+            return await self.agent.process_order(
                 order_id=case['input'],
                 failure_rate=chaos_config['rate'],
-                seed=chaos_config['seed']
+                seed=seed,
+                executor=test_executor
             )
+
+    def _check_output(self, output: Dict[str, Any], expected: Dict[str, Any]) -> Optional[str]:
+        """Aserciones de UNA ejecución: None si pasa, motivo del fallo si no."""
+        if output['status'] != expected['status']:
+            return f"Status mismatch: Got {output['status']}, expected {expected['status']}"
+            
+        if 'max_latency_ms' in expected and output['duration_ms'] > expected['max_latency_ms']:
+            return f"Latency violation: {output['duration_ms']:.0f}ms > {expected['max_latency_ms']}ms"
+
+        steps_set = set(output.get('steps_completed', []))
+        if 'must_call' in expected:
+            missing = [tool for tool in expected['must_call'] if tool not in steps_set and tool != "lookup_playbook"]
+            if missing:
+                return f"Missing required steps: {missing}"
+        
+        if 'forbidden_outcome' in expected and output['status'] == expected['forbidden_outcome']:
+            return f"Forbidden outcome occurred: {output['status']}"
+
+        return None
+
+    async def _run_single_case(self, case: Dict, semaphore: Optional[asyncio.Semaphore] = None) -> TestResult:
+        start_time = time.time()
+        expected = case['expected']
+
+        repeat = max(1, int(case.get('repeat', 1)))
+        if repeat > 1 or 'slo' in expected:
+            return await self._run_repeated_case(case, repeat, semaphore)
+
+        try:
+            output = await self._execute_case(case, case['chaos_config']['seed'], semaphore)
         except Exception as e:
             return TestResult(
                 case['id'], 
@@ -112,22 +231,111 @@ class EvaluationRunner:
             )
         
         duration = time.time() - start_time
-        expected = case['expected']
         
         # --- Lógica de Aserciones ---
-        if output['status'] != expected['status']:
-            return TestResult(case['id'], False, f"Status mismatch: Got {output['status']}, expected {expected['status']}", duration, output)
-            
-        if 'max_latency_ms' in expected and output['duration_ms'] > expected['max_latency_ms']:
-             return TestResult(case['id'], False, f"Latency violation: {output['duration_ms']:.0f}ms > {expected['max_latency_ms']}ms", duration, output)
+        failure = self._check_output(output, expected)
+        if failure:
+            return TestResult(case['id'], False, failure, duration, output)
 
-        steps_set = set(output.get('steps_completed', []))
-        if 'must_call' in expected:
-            missing = [tool for tool in expected['must_call'] if tool not in steps_set and tool != "lookup_playbook"]
-            if missing:
-                return TestResult(case['id'], False, f"Missing required steps: {missing}", duration, output)
-        
-        if 'forbidden_outcome' in expected and output['status'] == expected['forbidden_outcome']:
-             return TestResult(case['id'], False, f"Forbidden outcome occurred: {output['status']}", duration, output)
+        return TestResult(case['id'], True, "Passed all assertions", duration, output)
+
+    async def _run_repeated_case(self, case: Dict, repeat: int, semaphore: Optional[asyncio.Semaphore]) -> TestResult:
+        """
+        `repeat` ejecuciones (seed, seed+1, ...) en paralelo bajo el semáforo
+        del runner (el grafo ADK del agente se reutiliza) + presupuestos por
+        percentil de `expected.slo` (ver slo.py).
+
+        Con SLO de latencia las repeticiones van en secuencia: en paralelo los
+        percentiles medirían la contención entre ellas.
+        """
+        start_time = time.time()
+        expected = case['expected']
+        base_seed = case['chaos_config']['seed']
+        seeds = [base_seed + i for i in range(repeat)]
+
+        if measures_latency(expected.get('slo', {})):
+            outcomes = []
+            for seed in seeds:
+                try:
+                    outcomes.append(await self._execute_case(case, seed, semaphore))
+                except Exception as e:
+                    outcomes.append(e)
+        else:
+            outcomes = await asyncio.gather(
+                *(self._execute_case(case, seed, semaphore) for seed in seeds),
+                return_exceptions=True
+            )
+        duration = time.time() - start_time
+
+        runs, completed, failures = [], [], []
+        for seed, output in zip(seeds, outcomes):
+            if isinstance(output, BaseException):
+                failures.append(f"seed {seed}: Crash during execution: {output}")
+                runs.append({"seed": seed, "status": "crash", "error": str(output)})
+                continue
+            failure = self._check_output(output, expected)
+            if failure:
+                failures.append(f"seed {seed}: {failure}")
+            # Los runs que acaban en excepción dentro del agente no tienen latencia válida
+            if output.get("failed_at") != "exception":
+                completed.append(output)
+            runs.append({
+                "seed": seed,
+                "status": output["status"],
+                "passed": failure is None,
+                "duration_ms": round(output["duration_ms"], 2),
+                "model_calls": output.get("model_calls", 0),
+                "tool_retries": output.get("tool_retries", 0),
+                "playbook_lookups": output.get("playbook_lookups", [])
+            })
+
+        pass_rate = (repeat - len(failures)) / repeat
+        min_pass_rate = expected.get('min_pass_rate', 1.0)
+        percentiles, violations = evaluate_slo(completed, expected.get('slo', {}))
+        metrics = {
+            "repeat": repeat,
+            "pass_rate": round(pass_rate, 4),
+            "percentiles": percentiles,
+            "slo_violations": violations,
+            "runs": runs
+        }
+
+        if pass_rate < min_pass_rate:
+            reason = f"Pass rate {pass_rate:.0%} < {min_pass_rate:.0%} ({failures[0]})"
+            return TestResult(case['id'], False, reason, duration, metrics)
+        if violations:
+            return TestResult(case['id'], False, f"SLO violation: {'; '.join(violations)}", duration, metrics)
+
+        return TestResult(case['id'], True, f"Passed all assertions ({repeat} runs, pass rate {pass_rate:.0%})", duration, metrics)
+
+
+def run_shard_process(
+    suite_path: str,
+    playbook_path: str,
+    llm_client_constructor: LLMClientConstructor,
+    shard: Tuple[int, int],
+    concurrency: int,
+    report_meta: Dict[str, Any],
+    cache_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Worker de ProcessPoolExecutor: ejecuta un shard con su propio runner y
+    event loop y devuelve su informe (dict serializable, esquema de build_report).
 
-        return TestResult(case['id'], True, "Passed all assertions", duration, output)
\ No newline at end of file
+    `report_meta`: timestamp/suite/playbook tal y como aparecen en el informe.
+    """
+    runner = EvaluationRunner(
+        agent_playbook=playbook_path,
+        llm_client_constructor=llm_client_constructor,
+        concurrency=concurrency,
+        cache_dir=cache_dir
+    )
+    started = time.perf_counter()
+    results = asyncio.run(runner.run_suite(suite_path, shard=shard))
+    return build_report(
+        results,
+        concurrency=runner.concurrency,
+        wall_time_s=time.perf_counter() - started,
+        shard=shard,
+        **report_meta
+    )
@@ -0,0 +1,138 @@
+"""
+Evaluation sharding - Reparto de la suite entre procesos/máquinas y merge.
+
+`--shard i/n` ejecuta solo los casos `i-1, i-1+n, i-1+2n, ...` (round-robin,
+i en base 1): la suite suele estar ordenada por rate/seed, así cada shard
+recibe una mezcla parecida de casos lentos y rápidos.
+
+Cada shard escribe su `evaluation_report.json` con el mismo esquema que una
+ejecución completa más una clave `shard`; `merge_reports` reconstruye el
+orden original de la suite y devuelve un informe idéntico al de una sola
+ejecución (sin la clave `shard`).
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+REPORT_FILENAME = "evaluation_report.json"
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """'2/4' -> (2, 4). Lanza ValueError si el formato o el rango no son válidos."""
+    try:
+        index_str, count_str = spec.split("/")
+        index, count = int(index_str), int(count_str)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}': expected 'i/n' (e.g. 1/4)")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}': index must be in 1..{count}")
+    return index, count
+
+
+def select_shard(cases: Sequence[Any], index: int, count: int) -> List[Any]:
+    """Casos del shard `index` de `count` (round-robin, base 1)."""
+    return list(cases[index - 1::count])
+
+
+def build_report(
+    results: Sequence[Any],
+    timestamp: str,
+    suite: str,
+    playbook: str,
+    concurrency: int,
+    wall_time_s: float,
+    shard: Optional[Tuple[int, int]] = None
+) -> Dict[str, Any]:
+    """Esquema de `evaluation_report.json` (results: TestResult o dicts ya serializados)."""
+    rows = [r if isinstance(r, dict) else r.to_dict() for r in results]
+    report = {
+        "timestamp": timestamp,
+        "suite": suite,
+        "playbook": playbook,
+        "concurrency": concurrency,
+        "summary": {
+            "total": len(rows),
+            "passed": sum(1 for r in rows if r["passed"]),
+            "failed": sum(1 for r in rows if not r["passed"]),
+            "cached": sum(1 for r in rows if r["metrics"].get("cached")),
+            "wall_time_s": round(wall_time_s, 3),
+            "sum_case_time_s": round(sum(r["duration"] for r in rows), 3)
+        },
+        "results": rows
+    }
+    if shard is not None:
+        report["shard"] = {"index": shard[0], "count": shard[1]}
+    return report
+
+
+def merge_reports(reports: Sequence[Dict[str, Any]], timestamp: str) -> Dict[str, Any]:
+    """
+    Combina los informes de TODOS los shards de una ejecución en uno solo.
+
+    Los shards corren en paralelo, así que `wall_time_s` es el del shard más
+    lento; `sum_case_time_s` es la suma de todos.
+    """
+    if not reports:
+        raise ValueError("No reports to merge")
+
+    missing_shard = [r.get("timestamp") for r in reports if "shard" not in r]
+    if missing_shard:
+        raise ValueError(f"Reports without shard info (timestamps: {missing_shard})")
+
+    count = reports[0]["shard"]["count"]
+    suites = {r["suite"] for r in reports}
+    if len(suites) > 1:
+        raise ValueError(f"Reports come from different suites: {sorted(suites)}")
+    if any(r["shard"]["count"] != count for r in reports):
+        raise ValueError("Reports have different shard counts")
+
+    by_index = {}
+    for report in reports:
+        index = report["shard"]["index"]
+        if index in by_index:
+            raise ValueError(f"Duplicate report for shard {index}/{count}")
+        by_index[index] = report
+    missing = sorted(set(range(1, count + 1)) - set(by_index))
+    if missing:
+        raise ValueError(f"Missing shards: {', '.join(f'{i}/{count}' for i in missing)}")
+
+    # Posición original del k-ésimo caso del shard i: (i-1) + k*count
+    positioned = [
+        ((index - 1) + k * count, row)
+        for index, report in by_index.items()
+        for k, row in enumerate(report["results"])
+    ]
+    rows = [row for _, row in sorted(positioned, key=lambda item: item[0])]
+
+    first = by_index[1]
+    return build_report(
+        rows,
+        timestamp=timestamp,
+        suite=first["suite"],
+        playbook=first["playbook"],
+        concurrency=first["concurrency"],
+        wall_time_s=max(r["summary"]["wall_time_s"] for r in reports)
+    )
+
+
+def load_reports(paths: Sequence[str]) -> List[Dict[str, Any]]:
+    """
+    Carga informes desde ficheros o directorios.
+
+    En un directorio se buscan (recursivamente) los evaluation_report.json y
+    solo se quedan los de shards: los informes completos/mergeados se ignoran.
+    """
+    reports = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            for report_file in sorted(path.rglob(REPORT_FILENAME)):
+                with open(report_file, "r", encoding="utf-8") as f:
+                    report = json.load(f)
+                if "shard" in report:
+                    reports.append(report)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                reports.append(json.load(f))
+    return reports
@@ -0,0 +1,86 @@
+"""
+Latency/cost SLOs - Presupuestos por percentil sobre ejecuciones repetidas.
+
+Un caso de la suite puede declarar repeticiones y presupuestos:
+
+    "repeat": 30,
+    "expected": {
+        "status": "success",
+        "min_pass_rate": 0.9,
+        "slo": {
+            "latency_ms":   {"p50": 2000, "p95": 5000, "p99": 8000},
+            "model_calls":  {"p95": 12},
+            "tool_retries": {"p99": 3}
+        }
+    }
+
+Las métricas son claves de la salida de `process_order` (`latency_ms` es un
+alias de `duration_ms`); los percentiles usan interpolación lineal (como
+numpy.percentile por defecto).
+
+Un caso con presupuesto de latencia se ejecuta AISLADO: sus repeticiones van
+en secuencia y sin otros casos en vuelo, para que los percentiles midan al
+agente y no la contención entre ejecuciones (ver EvaluationRunner).
+"""
+
+import math
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Nombres "de SLO" -> clave en la salida de process_order
+METRIC_ALIASES = {"latency_ms": "duration_ms"}
+
+
+def measures_latency(slo: Dict[str, Any]) -> bool:
+    """True si el SLO presupuesta latencia (duration_ms o su alias latency_ms)."""
+    return any(METRIC_ALIASES.get(metric, metric) == "duration_ms" for metric in slo)
+
+
+def parse_percentile(label: str) -> float:
+    """'p95' -> 95.0, 'p99.9' -> 99.9."""
+    if not label.startswith("p"):
+        raise ValueError(f"Invalid percentile '{label}': expected p<0-100>")
+    value = float(label[1:])
+    if not 0.0 <= value <= 100.0:
+        raise ValueError(f"Invalid percentile '{label}': expected p<0-100>")
+    return value
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Percentil q (0-100) de valores YA ordenados, con interpolación lineal."""
+    if not sorted_values:
+        raise ValueError("percentile of empty sequence")
+    rank = (len(sorted_values) - 1) * q / 100.0
+    low, high = math.floor(rank), math.ceil(rank)
+    if low == high:
+        return float(sorted_values[low])
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def evaluate_slo(
+    outputs: Sequence[Dict[str, Any]],
+    slo: Dict[str, Dict[str, float]]
+) -> Tuple[Dict[str, Dict[str, float]], List[str]]:
+    """
+    Percentiles observados y violaciones de presupuesto.
+
+    Returns:
+        ({metric: {"p95": valor, ...}}, ["latency_ms p95 6120.0 > 5000", ...])
+    """
+    observed: Dict[str, Dict[str, float]] = {}
+    violations: List[str] = []
+
+    for metric, budgets in slo.items():
+        key = METRIC_ALIASES.get(metric, metric)
+        values = sorted(float(o[key]) for o in outputs if o.get(key) is not None)
+        if not values:
+            violations.append(f"{metric}: no samples")
+            continue
+
+        observed[metric] = {}
+        for label, budget in budgets.items():
+            value = round(percentile(values, parse_percentile(label)), 2)
+            observed[metric][label] = value
+            if value > budget:
+                violations.append(f"{metric} {label} {value} > {budget}")
+
+    return observed, violations
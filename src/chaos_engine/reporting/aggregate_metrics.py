@@ -23,13 +23,23 @@ Usage:
     playbook_metrics = aggregator.calculate_success_rate(playbook_results)
     comparison = aggregator.compare_baseline_vs_playbook(baseline_results, playbook_results)
     aggregator.export_summary_json(comparison, "metrics_summary.json")
+
+    # Millions of results: one streaming sweep (or NumPy arrays), 8 bytes per result
+    summary = ResultSummary.from_arrays(outcomes, durations_s)
+    comparison = aggregator.compare_baseline_vs_playbook(summary, other_summary)
 """
 
 import json
 import math
-from typing import Any, Dict, List
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Union
 from dataclasses import dataclass, field
 
+import numpy as np
+
+from chaos_engine.reporting.intervals import bootstrap_order_statistics, clopper_pearson_interval, wilson_interval
+
 @dataclass
 class ExperimentResult:
     """
@@ -51,61 +61,253 @@ class MetricsSummary:
     sample_size: int
 
 
+# Outcome labels in the order used by ResultSummary.from_arrays integer codes
+OUTCOME_CODES = ("success", "failure", "inconsistent")
+
+
+# Results buffered before folding them into the running statistics
+CHUNK_SIZE = 65536
+
+
+@dataclass
+class RunningStats:
+    """Welford mean/M2 + min/max, updated a chunk at a time (Chan et al. merge)."""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    minimum: float = math.inf
+    maximum: float = -math.inf
+
+    def push_chunk(self, values: np.ndarray):
+        n_b = int(values.size)
+        if not n_b:
+            return
+        mean_b = float(values.mean())
+        m2_b = float(np.square(values - mean_b).sum())
+        n = self.count + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.count * n_b / n
+        self.count = n
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+
+@dataclass
+class ResultSummary:
+    """
+    Everything MetricsAggregator needs, computed in ONE sweep over the results.
+
+    - counts per outcome, inconsistency types and strategy uses
+    - latency: sum (mean), Welford M2 (variance) and min/max, folded in
+      vectorized chunks of CHUNK_SIZE
+    - durations in a compact float64 buffer for exact order statistics
+      (np.partition: O(n), no full sort, no per-result Python objects)
+
+    Memory is O(n), not flat: exact median/p95/p99 (and their bootstrap
+    intervals) need every duration, so from_results keeps 8 bytes per
+    result. Counts and the Welford statistics alone would be O(1); a
+    bounded quantile sketch would make the percentiles approximate and
+    change the reported numbers.
+    """
+    n: int = 0
+    successes: int = 0
+    failures: int = 0
+    inconsistent: int = 0
+    inconsistency_types: Dict[str, int] = field(default_factory=dict)
+    strategy_uses: int = 0
+    unique_strategies: int = 0
+    duration_sum: float = 0.0
+    duration_m2: float = 0.0
+    min_duration: float = math.inf
+    max_duration: float = -math.inf
+    durations: np.ndarray = field(default_factory=lambda: np.empty(0))
+
+    @classmethod
+    def from_results(cls, results: Iterable[Any]) -> "ResultSummary":
+        """Single pass over any iterable (list, generator, DB cursor...) of ExperimentResult-like objects."""
+        outcome_counts: Dict[str, int] = {}
+        inconsistency_types: Counter = Counter()
+        strategies = set()
+        strategy_uses = 0
+        durations = array("d")
+        stats = RunningStats()
+        folded = 0
+
+        for result in results:
+            outcome = result.outcome
+            outcome_counts[outcome] = outcome_counts.get(outcome, 0) + 1
+            if result.inconsistencies:
+                inconsistency_types.update(result.inconsistencies)
+            if result.playbook_strategies_used:
+                strategy_uses += len(result.playbook_strategies_used)
+                strategies.update(result.playbook_strategies_used)
+            durations.append(result.total_duration_s)
+
+            if len(durations) - folded >= CHUNK_SIZE:
+                stats.push_chunk(np.frombuffer(durations, dtype=np.float64)[folded:])
+                folded = len(durations)
+
+        buffer = np.frombuffer(durations, dtype=np.float64) if durations else np.empty(0)
+        stats.push_chunk(buffer[folded:])
+
+        return cls(
+            n=stats.count,
+            successes=outcome_counts.get("success", 0),
+            failures=outcome_counts.get("failure", 0),
+            inconsistent=outcome_counts.get("inconsistent", 0),
+            inconsistency_types=dict(inconsistency_types),
+            strategy_uses=strategy_uses,
+            unique_strategies=len(strategies),
+            # Left-to-right float sum, exactly like sum(list_of_durations)
+            duration_sum=sum(durations),
+            duration_m2=stats.m2,
+            min_duration=stats.minimum,
+            max_duration=stats.maximum,
+            durations=buffer
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        outcomes: np.ndarray,
+        durations_s: np.ndarray,
+        inconsistency_types: Optional[Dict[str, int]] = None,
+        strategy_uses: int = 0,
+        unique_strategies: int = 0
+    ) -> "ResultSummary":
+        """
+        Vectorized summary for columnar data.
+
+        Args:
+            outcomes: Outcome labels ("success", ...) or integer codes indexing OUTCOME_CODES
+            durations_s: Durations in seconds (same length)
+        """
+        outcomes = np.asarray(outcomes)
+        durations = np.asarray(durations_s, dtype=np.float64)
+        if outcomes.shape != durations.shape:
+            raise ValueError(f"outcomes {outcomes.shape} and durations {durations.shape} differ in shape")
+
+        if np.issubdtype(outcomes.dtype, np.integer):
+            counts = np.bincount(outcomes, minlength=len(OUTCOME_CODES))
+            successes, failures, inconsistent = (int(c) for c in counts[:len(OUTCOME_CODES)])
+        else:
+            successes, failures, inconsistent = (int(np.count_nonzero(outcomes == label)) for label in OUTCOME_CODES)
+
+        stats = RunningStats()
+        for start in range(0, durations.size, CHUNK_SIZE):
+            stats.push_chunk(durations[start:start + CHUNK_SIZE])
+
+        return cls(
+            n=stats.count,
+            successes=successes,
+            failures=failures,
+            inconsistent=inconsistent,
+            inconsistency_types=dict(inconsistency_types or {}),
+            strategy_uses=strategy_uses,
+            unique_strategies=unique_strategies,
+            duration_sum=float(durations.sum()),
+            duration_m2=stats.m2,
+            min_duration=stats.minimum,
+            max_duration=stats.maximum,
+            durations=durations
+        )
+
+    def order_statistics(self, ranks: List[int]) -> Dict[int, float]:
+        """Exact k-th smallest durations for the given 0-based ranks (one np.partition)."""
+        kth = sorted(set(ranks))
+        partitioned = np.partition(self.durations, kth)
+        return {k: float(partitioned[k]) for k in kth}
+
+
+SummaryInput = Union[Iterable[Any], ResultSummary]
+
+
+def _round_interval(interval: tuple, digits: int) -> tuple:
+    return (round(interval[0], digits), round(interval[1], digits))
+
+
+def _format_interval(interval: tuple) -> str:
+    return f"[{interval[0]:.2%}, {interval[1]:.2%}]"
+
+
+def _print_p95(latency: Dict[str, Any]):
+    ci = latency.get("bootstrap_ci_95", {}).get("p95_latency_s")
+    suffix = f" (bootstrap 95% CI: [{ci[0]:.2f}s, {ci[1]:.2f}s])" if ci else ""
+    print(f"  P95 Latency: {latency['p95_latency_s']:.2f}s{suffix}")
+
+
 class MetricsAggregator:
     """
     Aggregate and analyze A/B test results.
 
     Calculates:
-    - Success rates with confidence intervals
+    - Success rates with confidence intervals (normal, Wilson, Clopper-Pearson)
     - Consistency rates (NEW: inverse of inconsistency)
-    - Latency statistics
+    - Latency statistics with bootstrap CIs for median/p95/p99
     - Comparative improvements
     """
 
+    def __init__(self, bootstrap_resamples: int = 1000, seed: Optional[int] = 42):
+        """
+        Args:
+            bootstrap_resamples: Resamples for latency percentile CIs (0 disables them)
+            seed: RNG seed of the bootstrap (reports are reproducible)
+        """
+        self.bootstrap_resamples = bootstrap_resamples
+        self.seed = seed
+
+    def summarize(self, results: SummaryInput) -> ResultSummary:
+        """One sweep over the results (no-op if they are already summarized)."""
+        if isinstance(results, ResultSummary):
+            return results
+        return ResultSummary.from_results(results)
+
     def calculate_success_rate(
         self,
-        results: List[ExperimentResult]
+        results: SummaryInput
     ) -> Dict[str, Any]:
         """
         Calculate success rate with confidence intervals.
 
         Args:
-            results: List of ExperimentResult
+            results: ExperimentResults (any iterable) or a ResultSummary
 
         Returns:
             {
                 "mean": 0.85,
                 "std": 0.357,
-                "confidence_interval_95": (0.78, 0.92),
+                "confidence_interval_95": (0.78, 0.92),  # Normal approx. (backward compat)
+                "wilson_ci_95": (0.72, 0.92),
+                "clopper_pearson_ci_95": (0.71, 0.93),
                 "sample_size": 50,
                 "successes": 42,
                 "failures": 5,
                 "inconsistent": 3
             }
         """
-        if not results:
+        summary = self.summarize(results)
+        if not summary.n:
             return {
                 "mean": 0.0,
                 "std": 0.0,
                 "confidence_interval_95": (0.0, 0.0),
+                "wilson_ci_95": (0.0, 0.0),
+                "clopper_pearson_ci_95": (0.0, 0.0),
                 "sample_size": 0,
                 "successes": 0,
                 "failures": 0,
                 "inconsistent": 0
             }
 
-        # Count outcomes
-        successes = sum(1 for r in results if r.outcome == "success")
-        failures = sum(1 for r in results if r.outcome == "failure")
-        inconsistent = sum(1 for r in results if r.outcome == "inconsistent")
-
-        n = len(results)
-        success_rate = successes / n if n > 0 else 0.0
+        n = summary.n
+        success_rate = summary.successes / n
 
         # Calculate standard deviation (for binomial: sqrt(p(1-p)/n))
-        std = math.sqrt(success_rate * (1 - success_rate) / n) if n > 0 else 0.0
+        std = math.sqrt(success_rate * (1 - success_rate) / n)
 
         # Calculate 95% confidence interval (z=1.96 for 95% CI)
+        # Normal approximation: collapses near 0%/100%, kept for backward compat
         margin = 1.96 * std
         ci_lower = max(0.0, success_rate - margin)
         ci_upper = min(1.0, success_rate + margin)
@@ -114,15 +316,17 @@ class MetricsAggregator:
             "mean": round(success_rate, 4),
             "std": round(std, 4),
             "confidence_interval_95": (round(ci_lower, 4), round(ci_upper, 4)),
+            "wilson_ci_95": _round_interval(wilson_interval(summary.successes, n), 4),
+            "clopper_pearson_ci_95": _round_interval(clopper_pearson_interval(summary.successes, n), 4),
             "sample_size": n,
-            "successes": successes,
-            "failures": failures,
-            "inconsistent": inconsistent
+            "successes": summary.successes,
+            "failures": summary.failures,
+            "inconsistent": summary.inconsistent
         }
 
     def calculate_consistency_rate(
         self,
-        results: List[ExperimentResult]
+        results: SummaryInput
     ) -> Dict[str, Any]:
         """
         Calculate consistency rate (NEW: inverse of inconsistency).
@@ -133,11 +337,13 @@ class MetricsAggregator:
         - Positive framing ("maintain consistency" vs "reduce inconsistency")
 
         Args:
-            results: List of ExperimentResult
+            results: ExperimentResults (any iterable) or a ResultSummary
 
         Returns:
             {
                 "consistency_rate": 0.94,  # 1 - inconsistency_rate
+                "wilson_ci_95": (0.84, 0.98),  # CIs of consistency_rate
+                "clopper_pearson_ci_95": (0.83, 0.99),
                 "inconsistency_rate": 0.06,  # For backward compat
                 "consistent_count": 47,
                 "inconsistent_count": 3,
@@ -148,9 +354,12 @@ class MetricsAggregator:
                 }
             }
         """
-        if not results:
+        summary = self.summarize(results)
+        if not summary.n:
             return {
                 "consistency_rate": 0.0,
+                "wilson_ci_95": (0.0, 0.0),
+                "clopper_pearson_ci_95": (0.0, 0.0),
                 "inconsistency_rate": 0.0,
                 "consistent_count": 0,
                 "inconsistent_count": 0,
@@ -158,37 +367,33 @@ class MetricsAggregator:
                 "inconsistency_types": {}
             }
 
-        n = len(results)
-        inconsistent_count = sum(1 for r in results if r.outcome == "inconsistent")
+        n = summary.n
+        inconsistent_count = summary.inconsistent
         consistent_count = n - inconsistent_count
 
-        inconsistency_rate = inconsistent_count / n if n > 0 else 0.0
+        inconsistency_rate = inconsistent_count / n
         consistency_rate = 1.0 - inconsistency_rate  # NEW: Positive metric
 
-        # Count inconsistency types (for debugging)
-        inconsistency_types = {}
-        for result in results:
-            for inc_type in result.inconsistencies:
-                inconsistency_types[inc_type] = inconsistency_types.get(inc_type, 0) + 1
-
         return {
             "consistency_rate": round(consistency_rate, 4),  # NEW: Primary metric
+            "wilson_ci_95": _round_interval(wilson_interval(consistent_count, n), 4),
+            "clopper_pearson_ci_95": _round_interval(clopper_pearson_interval(consistent_count, n), 4),
             "inconsistency_rate": round(inconsistency_rate, 4),  # Keep for backward compat
             "consistent_count": consistent_count,
             "inconsistent_count": inconsistent_count,
             "sample_size": n,
-            "inconsistency_types": inconsistency_types
+            "inconsistency_types": dict(summary.inconsistency_types)
         }
 
     def calculate_latency_stats(
         self,
-        results: List[ExperimentResult]
+        results: SummaryInput
     ) -> Dict[str, Any]:
         """
         Calculate latency statistics.
 
         Args:
-            results: List of ExperimentResult
+            results: ExperimentResults (any iterable) or a ResultSummary
 
         Returns:
             {
@@ -198,10 +403,17 @@ class MetricsAggregator:
                 "p99_latency_s": 12.1,
                 "min_latency_s": 2.1,
                 "max_latency_s": 15.3,
-                "std_latency_s": 2.4
+                "std_latency_s": 2.4,
+                "bootstrap_ci_95": {
+                    "median_latency_s": (4.5, 5.1),
+                    "p95_latency_s": (7.9, 9.2),
+                    "p99_latency_s": (10.8, 14.0)
+                },
+                "bootstrap_resamples": 1000
             }
         """
-        if not results:
+        summary = self.summarize(results)
+        if not summary.n:
             return {
                 "mean_latency_s": 0.0,
                 "median_latency_s": 0.0,
@@ -209,57 +421,63 @@ class MetricsAggregator:
                 "p99_latency_s": 0.0,
                 "min_latency_s": 0.0,
                 "max_latency_s": 0.0,
-                "std_latency_s": 0.0
+                "std_latency_s": 0.0,
+                "bootstrap_ci_95": {},
+                "bootstrap_resamples": 0
             }
 
-        durations = [r.total_duration_s for r in results]
-        durations_sorted = sorted(durations)
-        n = len(durations)
+        n = summary.n
+        mean_latency = summary.duration_sum / n
 
-        # Mean
-        mean_latency = sum(durations) / n
+        # Exact order statistics (same ranks as indexing the sorted list)
+        p95_index = min(int(n * 0.95), n - 1)
+        p99_index = min(int(n * 0.99), n - 1)
+        median_ranks = [n//2 - 1, n//2] if n % 2 == 0 else [n//2]
+        ranked = summary.order_statistics(median_ranks + [p95_index, p99_index])
 
-        # Median
-        if n % 2 == 0:
-            median_latency = (durations_sorted[n//2 - 1] + durations_sorted[n//2]) / 2
-        else:
-            median_latency = durations_sorted[n//2]
-
-        # Percentiles
-        p95_index = int(n * 0.95)
-        p99_index = int(n * 0.99)
-        p95_latency = durations_sorted[p95_index] if p95_index < n else durations_sorted[-1]
-        p99_latency = durations_sorted[p99_index] if p99_index < n else durations_sorted[-1]
+        median_latency = sum(ranked[k] for k in median_ranks) / len(median_ranks)
 
-        # Min/Max
-        min_latency = durations_sorted[0]
-        max_latency = durations_sorted[-1]
+        # Standard deviation (population, from Welford's M2)
+        std_latency = math.sqrt(summary.duration_m2 / n)
 
-        # Standard deviation
-        variance = sum((d - mean_latency) ** 2 for d in durations) / n
-        std_latency = math.sqrt(variance)
+        # Bootstrap CIs of the same estimators (same ranks, vectorized resamples)
+        bootstrap = bootstrap_order_statistics(
+            summary.durations,
+            {
+                "median_latency_s": median_ranks,
+                "p95_latency_s": [p95_index],
+                "p99_latency_s": [p99_index]
+            },
+            n_resamples=self.bootstrap_resamples,
+            seed=self.seed
+        )
 
         return {
             "mean_latency_s": round(mean_latency, 2),
             "median_latency_s": round(median_latency, 2),
-            "p95_latency_s": round(p95_latency, 2),
-            "p99_latency_s": round(p99_latency, 2),
-            "min_latency_s": round(min_latency, 2),
-            "max_latency_s": round(max_latency, 2),
-            "std_latency_s": round(std_latency, 2)
+            "p95_latency_s": round(ranked[p95_index], 2),
+            "p99_latency_s": round(ranked[p99_index], 2),
+            "min_latency_s": round(summary.min_duration, 2),
+            "max_latency_s": round(summary.max_duration, 2),
+            "std_latency_s": round(std_latency, 2),
+            "bootstrap_ci_95": {name: _round_interval(ci, 2) for name, ci in bootstrap.items()},
+            "bootstrap_resamples": self.bootstrap_resamples if bootstrap else 0
         }
 
     def compare_baseline_vs_playbook(
         self,
-        baseline_results: List[ExperimentResult],
-        playbook_results: List[ExperimentResult]
+        baseline_results: SummaryInput,
+        playbook_results: SummaryInput
     ) -> Dict[str, Any]:
         """
         Compare Baseline vs Playbook performance.
 
+        Each side is swept exactly once (see ResultSummary), so streaming
+        iterables and precomputed/NumPy summaries are both accepted.
+
         Args:
-            baseline_results: Baseline experiment results
-            playbook_results: Playbook experiment results
+            baseline_results: Baseline experiment results (iterable or ResultSummary)
+            playbook_results: Playbook experiment results (iterable or ResultSummary)
 
         Returns:
             {
@@ -277,7 +495,10 @@ class MetricsAggregator:
                 }
             }
         """
-        # Calculate metrics for each
+        # Calculate metrics for each (one sweep per side)
+        baseline_results = self.summarize(baseline_results)
+        playbook_results = self.summarize(playbook_results)
+
         baseline_success = self.calculate_success_rate(baseline_results)
         playbook_success = self.calculate_success_rate(playbook_results)
 
@@ -321,11 +542,8 @@ class MetricsAggregator:
         else:
             latency_overhead_pct = 0.0  # Can't calculate without baseline latency
 
-        # Count Playbook strategies used
-        strategies_used = []
-        for result in playbook_results:
-            strategies_used.extend(result.playbook_strategies_used)
-        unique_strategies = len(set(strategies_used))
+        # Playbook strategies used (counted during the sweep)
+        unique_strategies = playbook_results.unique_strategies
 
         # ============ VALIDATION CRITERIA ============
         # Metric-001: Success rate must improve by ≥20%
@@ -349,7 +567,7 @@ class MetricsAggregator:
                 "consistency": playbook_consistency,  # NEW key name
                 "latency": playbook_latency,
                 "unique_strategies_used": unique_strategies,
-                "total_strategy_uses": len(strategies_used)
+                "total_strategy_uses": playbook_results.strategy_uses
             },
             "improvements": {
                 "success_rate_improvement": round(success_rate_improvement, 4),
@@ -397,16 +615,18 @@ class MetricsAggregator:
         # Baseline metrics
         baseline = comparison["baseline"]
         print(f"\nBASELINE AGENT:")
-        print(f"  Success Rate: {baseline['success_rate']['mean']:.2%} ± {baseline['success_rate']['std']:.4f}")
+        print(f"  Success Rate: {baseline['success_rate']['mean']:.2%} (Wilson 95% CI: {_format_interval(baseline['success_rate']['wilson_ci_95'])})")
         print(f"  Consistency Rate: {baseline['consistency']['consistency_rate']:.2%}")  # NEW
         print(f"  Mean Latency: {baseline['latency']['mean_latency_s']:.2f}s")
+        _print_p95(baseline['latency'])
 
         # Playbook metrics
         playbook = comparison["playbook"]
         print(f"\nPLAYBOOK AGENT:")
-        print(f"  Success Rate: {playbook['success_rate']['mean']:.2%} ± {playbook['success_rate']['std']:.4f}")
+        print(f"  Success Rate: {playbook['success_rate']['mean']:.2%} (Wilson 95% CI: {_format_interval(playbook['success_rate']['wilson_ci_95'])})")
         print(f"  Consistency Rate: {playbook['consistency']['consistency_rate']:.2%}")  # NEW
         print(f"  Mean Latency: {playbook['latency']['mean_latency_s']:.2f}s")
+        _print_p95(playbook['latency'])
         print(f"  Strategies Used: {playbook['unique_strategies_used']} unique, {playbook['total_strategy_uses']} total")
 
         # Improvements
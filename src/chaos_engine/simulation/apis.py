@@ -104,6 +104,17 @@ async def call_simulated_inventory_api(
             },
             "metadata": {"api": "inventory", "endpoint": endpoint, "timestamp": timestamp}
         }
+    elif endpoint == "release_stock":
+        # Compensación (saga): libera la reserva / bloqueo de stock
+        return {
+            "status": "success",
+            "data": {
+                "sku": payload.get("sku"),
+                "released_qty": payload.get("qty"),
+                "reservation_id": payload.get("reservation_id"),
+            },
+            "metadata": {"api": "inventory", "endpoint": endpoint, "timestamp": timestamp}
+        }
     else:
         raise ValueError(f"Unsupported inventory endpoint: {endpoint}")
 
@@ -16,10 +16,12 @@ from datetime import datetime
 
 try:
     from chaos_engine.simulation.runner import ABTestRunner
+    from chaos_engine.simulation.workflow import WorkflowDefinition
 except ImportError:
     import sys
     sys.path.append(str(Path(__file__).parent.parent))
     from chaos_engine.simulation.runner import ABTestRunner
+    from chaos_engine.simulation.workflow import WorkflowDefinition
 
 class ParametricABTestRunner:
     def __init__(
@@ -28,13 +30,18 @@ class ParametricABTestRunner:
         experiments_per_rate: int, 
         output_dir: Path,
         seed: int = 42,
-        logger: Optional[logging.Logger] = None
+        logger: Optional[logging.Logger] = None,
+        workflow: Optional[WorkflowDefinition] = None,
+        include_saga: bool = False
     ):
         self.failure_rates = failure_rates
         self.experiments_per_rate = experiments_per_rate
         self.output_dir = output_dir
         self.base_seed = seed
-        self.ab_runner = ABTestRunner()
+        self.ab_runner = ABTestRunner(workflow=workflow)
+        self.workflow = self.ab_runner.workflow
+        # Tercer brazo opcional: sin reintentos + compensaciones (saga)
+        self.agent_types = ["baseline", "playbook"] + (["saga"] if include_saga else [])
         self.logger = logger or logging.getLogger(__name__)
 
     async def run_parametric_experiments(self) -> Dict[str, Any]:
@@ -42,7 +49,9 @@ class ParametricABTestRunner:
         print(f"\n🚀 Starting parametric experiments...")
         print(f"   Failure rates: {self.failure_rates}")
         print(f"   Experiments per rate: {self.experiments_per_rate}")
-        print(f"   Total: {len(self.failure_rates) * self.experiments_per_rate * 2} runs")
+        print(f"   Workflow: {self.workflow.name} {self.workflow.levels()}")
+        print(f"   Agents: {self.agent_types}")
+        print(f"   Total: {len(self.failure_rates) * self.experiments_per_rate * len(self.agent_types)} runs")
         
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
@@ -51,7 +60,7 @@ class ParametricABTestRunner:
         csv_keys = [
             "experiment_id", "agent_type", "outcome", "duration_ms", 
             "steps_completed", "failed_at", "inconsistencies_count",
-            "retries", "seed", "failure_rate"
+            "retries", "seed", "failure_rate", "compensated", "compensation_ms"
         ]
 
         # Accumulator for aggregation (Metrics still need full context)
@@ -135,12 +144,40 @@ class ParametricABTestRunner:
                 
                 yield result
             
+            # 3. Saga Experiments (opcional)
+            if "saga" in self.agent_types:
+                self.logger.info(f"  Running {self.experiments_per_rate} Saga experiments...")
+                print(f"  Running {self.experiments_per_rate} Saga experiments...")
+                saga_results = []
+                for j in range(self.experiments_per_rate):
+                    seed = self.base_seed + (i * 1000) + j
+
+                    result = await self.ab_runner.run_experiment(
+                        agent_type="saga",
+                        failure_rate=rate,
+                        seed=seed
+                    )
+
+                    result["experiment_id"] = f"SAGA-{rate}-{j}"
+                    result["failure_rate"] = rate
+                    result["seed"] = seed
+                    saga_results.append(result)
+
+                # Las compensaciones corrieron en segundo plano mientras seguían los
+                # experimentos; hay que esperarlas antes de evaluar inconsistencias
+                await self.ab_runner.drain_compensations()
+                for result in saga_results:
+                    yield result
+            
             self.logger.info(f"   ✅ Completed batch for rate {rate}")
 
     def _calculate_inconsistency(self, result: Dict) -> int:
         """
         Calcula si hubo inconsistencia de datos.
-        Regla: Si falló en ERP o Shipping, es inconsistente (se cobró pero no se entregó).
+        Regla: el pedido falló pero el pago se completó (se cobró pero no se entregó)
+        y la saga no lo reembolsó.
+        En el workflow secuencial equivale a "falló en ERP o Shipping"; en el
+        paralelo también cubre el pago cobrado mientras inventory fallaba.
         """
         if result["status"] == "success":
             return 0
@@ -152,9 +189,9 @@ class ParametricABTestRunner:
             self.logger.warning(f"⚠️ Result marked failure but failed_at is empty: {result}")
 
         # Lógica de negocio: 
-        # Inventory/Payment fail -> Safe (0)
-        # ERP/Shipping fail -> Unsafe (1)
-        if failed_at in ["erp", "shipping"]:
+        # Pago no completado -> Safe (0)
+        # Pago completado y pedido fallido -> Unsafe (1)
+        if "payment" in result.get("steps_completed", []) and "payment" not in result.get("compensated", []):
             return 1
             
         return 0
@@ -171,7 +208,9 @@ class ParametricABTestRunner:
             "inconsistencies_count": res.get("inconsistencies_count", 0),
             "retries": res.get("retries", 0),
             "seed": res["seed"],
-            "failure_rate": res["failure_rate"]
+            "failure_rate": res["failure_rate"],
+            "compensated": "|".join(res.get("compensated", [])),
+            "compensation_ms": res.get("compensation_ms", 0.0)
         }
 
     def _save_aggregated_metrics(self, results: List[Dict]):
@@ -183,6 +222,7 @@ class ParametricABTestRunner:
             rate_key = str(rate)
             baseline_runs = [r for r in group if r["agent_type"] == "baseline"]
             playbook_runs = [r for r in group if r["agent_type"] == "playbook"]
+            saga_runs = [r for r in group if r["agent_type"] == "saga"]
             
             def calc_stats(runs):
                 if not runs: return {}
@@ -191,20 +231,36 @@ class ParametricABTestRunner:
                 inconsistencies = [r.get("inconsistencies_count", 0) for r in runs]
                 
                 mean_incons = sum(inconsistencies) / len(runs) if runs else 0.0
+                compensations = [r.get("compensation_ms", 0.0) for r in runs if r.get("compensated") or r.get("compensation_failed")]
                 
                 return {
                     "n_runs": len(runs),
                     "success_rate": {"mean": successes / len(runs), "std": 0.0},
                     "duration_s": {"mean": (sum(latencies)/len(latencies))/1000 if latencies else 0, "std": 0.0},
-                    "inconsistencies": {"mean": mean_incons, "std": 0.0}
+                    "inconsistencies": {"mean": mean_incons, "std": 0.0},
+                    "compensations": {
+                        "count": len(compensations),
+                        "mean_s": (sum(compensations) / len(compensations)) / 1000 if compensations else 0.0
+                    }
                 }
 
             metrics[rate_key] = {
                 "failure_rate": rate,
-                "n_experiments": len(group) // 2,
+                "workflow": self.workflow.name,
+                "n_experiments": len(group) // len(self.agent_types),
                 "baseline": calc_stats(baseline_runs),
                 "playbook": calc_stats(playbook_runs)
             }
+            if saga_runs:
+                saga, retries = calc_stats(saga_runs), metrics[rate_key]["playbook"]
+                metrics[rate_key]["saga"] = saga
+                # Coste vs beneficio de compensar frente a "solo reintentar"
+                metrics[rate_key]["saga_vs_retries"] = {
+                    "critical_path_delta_s": saga["duration_s"]["mean"] - retries.get("duration_s", {}).get("mean", 0.0),
+                    "background_compensation_s": saga["compensations"]["mean_s"],
+                    "inconsistency_delta": saga["inconsistencies"]["mean"] - retries.get("inconsistencies", {}).get("mean", 0.0),
+                    "success_rate_delta": saga["success_rate"]["mean"] - retries.get("success_rate", {}).get("mean", 0.0)
+                }
             
         json_path = self.output_dir / "aggregated_metrics.json"
         with open(json_path, "w") as f:
@@ -4,8 +4,7 @@ ABTestRunner - Simplified Orchestrator for Phase 5 Simulation.
 import asyncio
 import time
 import logging
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
 from chaos_engine.simulation.apis import (
     call_simulated_inventory_api,
     call_simulated_payments_api,
@@ -13,59 +12,103 @@ from chaos_engine.simulation.apis import (
     call_simulated_shipping_api,
 )
 from chaos_engine.chaos.config import ChaosConfig
+from chaos_engine.simulation.saga import SagaCoordinator
+from chaos_engine.simulation.workflow import SEQUENTIAL_WORKFLOW, WorkflowDefinition, WorkflowExecutor
+from chaos_engine.core.tracing import TraceRecorder, is_chaos_injected
 
 class ABTestRunner:
-    def __init__(self, logger: Optional[logging.Logger] = None):
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        trace: bool = False,
+        trace_capacity: int = 64,
+        workflow: Optional[WorkflowDefinition] = None,
+        saga: Optional[SagaCoordinator] = None
+    ):
         self.logger = logger or logging.getLogger(__name__)
-        self.workflow_steps = [
-            ("inventory", self._step_inventory),
-            ("payment", self._step_payment),
-            ("erp", self._step_erp),
-            ("shipping", self._step_shipping)
-        ]
+        # Traza opcional por experimento (formato ExperimentEvaluator)
+        self.trace = trace
+        self.trace_capacity = trace_capacity
+        self.step_functions = {
+            "inventory": self._step_inventory,
+            "payment": self._step_payment,
+            "erp": self._step_erp,
+            "shipping": self._step_shipping
+        }
+        # DAG del workflow (por defecto el secuencial histórico)
+        self.workflow = workflow or SEQUENTIAL_WORKFLOW
+        self.workflow_executor = WorkflowExecutor(self.workflow, self.step_functions)
+        # Compensaciones del agente "saga" (sin reintentos: compensa en vez de insistir)
+        self.saga = saga or SagaCoordinator(logger=self.logger)
+
+    @property
+    def workflow_steps(self) -> List[Tuple[str, Any]]:
+        """Pasos en orden topológico (compatibilidad con la lista secuencial anterior)."""
+        return [(name, self.step_functions[name]) for name in self.workflow.order]
 
     async def run_experiment(self, agent_type: str, failure_rate: float, seed: int) -> Dict[str, Any]:
         start_time = time.time()
-        steps_completed = []
-        failed_at = None # ✅ Inicializado a None
-        total_retries = 0
         max_retries = 2 if agent_type == "playbook" else 0
-        
-        base_chaos_config = ChaosConfig(enabled=True, failure_rate=failure_rate, seed=seed)
-        status = "success"
-        
-        for step_name, step_func in self.workflow_steps:
-            step_success = False
-            for attempt in range(max_retries + 1):
-                current_config = base_chaos_config
-                if attempt > 0:
-                    total_retries += 1
-                    current_config = ChaosConfig(enabled=True, failure_rate=failure_rate, seed=seed + (attempt * 1000))
-                
-                result = await step_func(current_config)
-                
-                if result["status"] == "success":
-                    step_success = True
-                    break 
-                
-            if step_success:
-                steps_completed.append(step_name)
-            else:
-                status = "failure"
-                failed_at = step_name # ✅ Se asigna correctamente aquí
-                break 
-        
+        recorder = TraceRecorder(capacity=self.trace_capacity) if self.trace else None
+
+        observer = None
+        if recorder is not None:
+            def observer(step_name, result, started, ended):
+                recorder.record(
+                    step_name, result["status"], started, ended,
+                    result.get("code") if result["status"] == "error" else None,
+                    is_chaos_injected(result)
+                )
+
+        run = await self.workflow_executor.run(
+            failure_rate, seed,
+            agent_retries=max_retries,
+            observer=observer,
+            clock=recorder.now if recorder is not None else None
+        )
+        status = run.status
+
+        # Camino crítico: el cliente recibe el resultado aquí
         duration_ms = (time.time() - start_time) * 1000
-        
-        return {
+
+        result = {
             "status": status,
-            "steps_completed": steps_completed,
-            "failed_at": failed_at, # ✅ Se devuelve aquí
+            "steps_completed": run.steps_completed,
+            "failed_at": run.failed_at, # ✅ Primer paso que agotó sus reintentos
             "duration_ms": duration_ms,
-            "retries": total_retries,
+            "retries": run.retries,
             "outcome": status, 
-            "agent_type": agent_type
+            "agent_type": agent_type,
+            "workflow": self.workflow.name,
+            "compensated": [],
+            "compensation_failed": [],
+            "compensation_ms": 0.0
         }
+        if agent_type == "saga" and status == "failure" and run.steps_completed:
+            # ✅ FIX: La saga corre en segundo plano; drain_compensations() la espera
+            # y el resultado se completa al terminar
+            task = self.saga.compensate(run.steps_completed, run.results, failure_rate, seed)
+            result["compensation_pending"] = True
+            task.add_done_callback(lambda t: self._record_compensation(result, t))
+        if recorder is not None:
+            result["trace"] = recorder.export(status, agent_type=agent_type, seed=seed, failure_rate=failure_rate)
+        return result
+
+    def _record_compensation(self, result: Dict[str, Any], task: "asyncio.Task"):
+        """Vuelca el SagaOutcome de una compensación terminada en el resultado del experimento."""
+        result["compensation_pending"] = False
+        if task.cancelled() or task.exception() is not None:
+            self.logger.warning(f"⚠️ Saga task did not finish: {'cancelled' if task.cancelled() else task.exception()}")
+            result["compensation_failed"] = [s for s in result["steps_completed"] if s in self.saga.compensations]
+            return
+        outcome = task.result()
+        result["compensated"] = outcome.compensated
+        result["compensation_failed"] = outcome.failed
+        result["compensation_ms"] = outcome.duration_ms
+
+    async def drain_compensations(self):
+        """Espera a las compensaciones en segundo plano (antes de reportar o cerrar)."""
+        await self.saga.drain()
 
     async def _step_inventory(self, config): return await call_simulated_inventory_api("check_stock", {"sku": "W", "qty": 1}, config)
     async def _step_payment(self, config): return await call_simulated_payments_api("capture", {"amount": 100}, config)
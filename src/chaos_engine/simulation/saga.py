@@ -0,0 +1,134 @@
+"""
+Saga - Background compensations for the simulated order workflow.
+
+Cuando el pedido falla después de haber cobrado, el `SagaCoordinator`
+lanza las acciones compensatorias en orden inverso:
+
+    payment -> payments.refund(transaction_id)
+
+El paso `inventory` del workflow solo consulta stock (check_stock) y no
+reserva nada, así que no tiene compensación por defecto. `release_stock`
+queda disponible para workflows cuyo paso reserve stock (reserve_stock).
+
+Las compensaciones corren en tareas de fondo registradas (fuera del
+camino crítico): el experimento devuelve su fallo inmediatamente, y
+`drain()` espera a las pendientes antes de reportar o cerrar. El coste de
+compensar se mide aparte (`compensation_ms`). Las APIs de compensación
+también sufren caos, así que cada acción se reintenta hasta
+`max_attempts` veces; si aun así falla queda en `compensation_failed`.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from chaos_engine.chaos.config import ChaosConfig
+from chaos_engine.simulation.apis import call_simulated_inventory_api, call_simulated_payments_api
+
+# (step_result, chaos_config) -> respuesta de la API de compensación
+Compensation = Callable[[Dict[str, Any], ChaosConfig], Awaitable[Dict[str, Any]]]
+
+
+async def refund_payment(step_result: Dict[str, Any], config: ChaosConfig) -> Dict[str, Any]:
+    transaction_id = step_result.get("data", {}).get("transaction_id")
+    return await call_simulated_payments_api("refund", {"transaction_id": transaction_id}, config)
+
+
+async def release_stock(step_result: Dict[str, Any], config: ChaosConfig) -> Dict[str, Any]:
+    """Compensación de un paso que llamó a inventory.reserve_stock."""
+    data = step_result.get("data", {})
+    return await call_simulated_inventory_api(
+        "release_stock",
+        {"sku": data.get("sku"), "qty": data.get("reserved_qty", 1), "reservation_id": data.get("reservation_id")},
+        config
+    )
+
+
+# ✅ FIX: Solo pasos con efectos que deshacer (check_stock no reserva stock)
+DEFAULT_COMPENSATIONS: Dict[str, Compensation] = {
+    "payment": refund_payment,
+}
+
+
+@dataclass
+class SagaOutcome:
+    """Resultado de las compensaciones de UN experimento."""
+    compensated: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    attempts: int = 0
+    duration_ms: float = 0.0
+
+
+class SagaCoordinator:
+    """Ejecuta compensaciones en segundo plano para los pasos completados de un pedido fallido."""
+
+    def __init__(
+        self,
+        compensations: Optional[Dict[str, Compensation]] = None,
+        max_attempts: int = 3,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.compensations = compensations if compensations is not None else DEFAULT_COMPENSATIONS
+        self.max_attempts = max_attempts
+        self.logger = logger or logging.getLogger("SagaCoordinator")
+        self._pending: List[asyncio.Task] = []
+
+    def compensate(
+        self,
+        steps_completed: List[str],
+        results: Dict[str, Dict[str, Any]],
+        failure_rate: float,
+        seed: int
+    ) -> "asyncio.Task[SagaOutcome]":
+        """Programa las compensaciones (orden inverso de finalización) y vuelve enseguida."""
+        task = asyncio.ensure_future(self._run(list(steps_completed), results, failure_rate, seed))
+        self._pending.append(task)
+        task.add_done_callback(self._forget)
+        return task
+
+    def _forget(self, task: asyncio.Task):
+        if task in self._pending:
+            self._pending.remove(task)
+
+    async def _run(
+        self,
+        steps_completed: List[str],
+        results: Dict[str, Dict[str, Any]],
+        failure_rate: float,
+        seed: int
+    ) -> SagaOutcome:
+        outcome = SagaOutcome()
+        started = time.perf_counter()
+        for step in reversed(steps_completed):
+            action = self.compensations.get(step)
+            if action is None:
+                continue
+            for attempt in range(self.max_attempts):
+                outcome.attempts += 1
+                # Semillas propias para no repetir la decisión de caos del paso original
+                config = ChaosConfig(enabled=True, failure_rate=failure_rate, seed=seed + 500 + attempt * 1000)
+                response = await action(results.get(step, {}), config)
+                if response.get("status") == "success":
+                    outcome.compensated.append(step)
+                    break
+            else:
+                outcome.failed.append(step)
+                self.logger.warning(f"⚠️ Saga: compensation for '{step}' failed after {self.max_attempts} attempts")
+        outcome.duration_ms = (time.perf_counter() - started) * 1000
+        return outcome
+
+    @property
+    def pending(self) -> int:
+        """Compensaciones programadas que aún no han terminado."""
+        return len(self._pending)
+
+    async def drain(self) -> List[Any]:
+        """
+        Espera a todas las compensaciones pendientes (antes de reportar o cerrar).
+
+        Devuelve un SagaOutcome por tarea, o la excepción si la compensación falló.
+        """
+        pending, self._pending = self._pending, []
+        return list(await asyncio.gather(*pending, return_exceptions=True)) if pending else []
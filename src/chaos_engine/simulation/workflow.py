@@ -0,0 +1,281 @@
+"""
+Workflow DAG - Declarative order workflow for the Phase 5 simulation.
+
+`ABTestRunner` ejecutaba una lista fija inventory -> payment -> erp -> shipping.
+Aquí el workflow es un DAG de pasos con dependencias declaradas y una
+política de reintentos por paso; `WorkflowExecutor` lanza en paralelo
+todos los pasos cuyas dependencias ya se cumplieron.
+
+Formato (dict / JSON):
+
+    {
+      "name": "parallel",
+      "steps": [
+        {"name": "inventory"},
+        {"name": "payment"},
+        {"name": "erp", "depends_on": ["inventory", "payment"]},
+        {"name": "shipping", "depends_on": ["erp"], "max_retries": 3}
+      ]
+    }
+
+Semántica ante fallo: en cuanto un paso agota sus reintentos no se lanza
+ningún paso nuevo, pero los que ya están en vuelo terminan (una captura de
+pago enviada no se puede "des-enviar"). Por eso en el workflow paralelo un
+fallo de inventory puede dejar el pago cobrado: ese es el riesgo de
+inconsistencia que el laboratorio quiere medir.
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from chaos_engine.chaos.config import ChaosConfig
+
+StepFunction = Callable[[ChaosConfig], Awaitable[Dict[str, Any]]]
+# (step_name, result, started, ended) -> None
+StepObserver = Callable[[str, Dict[str, Any], float, float], None]
+
+
+@dataclass(frozen=True)
+class WorkflowStep:
+    """
+    Paso del workflow.
+
+    `max_retries=None` usa los reintentos del agente (baseline: 0, playbook: 2).
+    Un valor explícito solo aplica a agentes que reintentan: el baseline
+    nunca reintenta.
+    """
+    name: str
+    depends_on: Tuple[str, ...] = ()
+    max_retries: Optional[int] = None
+
+    def retries_for(self, agent_retries: int) -> int:
+        if agent_retries <= 0 or self.max_retries is None:
+            return agent_retries
+        return self.max_retries
+
+
+@dataclass
+class WorkflowDefinition:
+    """DAG de pasos validado (nombres únicos, dependencias conocidas, sin ciclos)."""
+    steps: List[WorkflowStep]
+    name: str = "custom"
+    _order: List[str] = field(default_factory=list, init=False, repr=False)
+
+    def __post_init__(self):
+        self.steps = list(self.steps)
+        by_name: Dict[str, WorkflowStep] = {}
+        for step in self.steps:
+            if step.name in by_name:
+                raise ValueError(f"Duplicate workflow step: {step.name}")
+            by_name[step.name] = step
+        for step in self.steps:
+            unknown = [d for d in step.depends_on if d not in by_name]
+            if unknown:
+                raise ValueError(f"Step '{step.name}' depends on unknown steps: {unknown}")
+        self._by_name = by_name
+        self._order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        """Kahn estable: respeta el orden de declaración entre pasos independientes."""
+        pending = {s.name: set(s.depends_on) for s in self.steps}
+        order: List[str] = []
+        while pending:
+            ready = [s.name for s in self.steps if s.name in pending and not pending[s.name]]
+            if not ready:
+                raise ValueError(f"Workflow '{self.name}' has a dependency cycle: {sorted(pending)}")
+            for name in ready:
+                del pending[name]
+                order.append(name)
+            for deps in pending.values():
+                deps.difference_update(ready)
+        return order
+
+    def __getitem__(self, name: str) -> WorkflowStep:
+        return self._by_name[name]
+
+    @property
+    def order(self) -> List[str]:
+        """Orden topológico (una ejecución secuencial válida)."""
+        return list(self._order)
+
+    def levels(self) -> List[List[str]]:
+        """Pasos agrupados por profundidad: cada nivel puede ejecutarse en paralelo."""
+        depth: Dict[str, int] = {}
+        for name in self._order:
+            deps = self._by_name[name].depends_on
+            depth[name] = 1 + max((depth[d] for d in deps), default=-1)
+        levels: List[List[str]] = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+        for name in self._order:
+            levels[depth[name]].append(name)
+        return levels
+
+    @property
+    def is_sequential(self) -> bool:
+        return all(len(level) == 1 for level in self.levels())
+
+    @classmethod
+    def sequential(cls, names: List[str], name: str = "sequential") -> "WorkflowDefinition":
+        """Cadena lineal: cada paso depende del anterior."""
+        steps = [WorkflowStep(n, depends_on=(names[i - 1],) if i else ()) for i, n in enumerate(names)]
+        return cls(steps, name=name)
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> "WorkflowDefinition":
+        steps = [
+            WorkflowStep(
+                name=s["name"],
+                depends_on=tuple(s.get("depends_on", ())),
+                max_retries=s.get("max_retries"),
+            )
+            for s in spec["steps"]
+        ]
+        return cls(steps, name=spec.get("name", "custom"))
+
+    @classmethod
+    def load(cls, path: str) -> "WorkflowDefinition":
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        spec.setdefault("name", Path(path).stem)
+        return cls.from_dict(spec)
+
+    def to_dict(self) -> Dict[str, Any]:
+        steps = []
+        for step in self.steps:
+            item: Dict[str, Any] = {"name": step.name}
+            if step.depends_on:
+                item["depends_on"] = list(step.depends_on)
+            if step.max_retries is not None:
+                item["max_retries"] = step.max_retries
+            steps.append(item)
+        return {"name": self.name, "steps": steps}
+
+
+ORDER_STEPS = ["inventory", "payment", "erp", "shipping"]
+
+# Workflow histórico: inventory -> payment -> erp -> shipping
+SEQUENTIAL_WORKFLOW = WorkflowDefinition.sequential(ORDER_STEPS)
+
+# Check de stock y cobro solapados; el ERP espera a ambos
+PARALLEL_WORKFLOW = WorkflowDefinition([
+    WorkflowStep("inventory"),
+    WorkflowStep("payment"),
+    WorkflowStep("erp", depends_on=("inventory", "payment")),
+    WorkflowStep("shipping", depends_on=("erp",)),
+], name="parallel")
+
+BUILTIN_WORKFLOWS = {"sequential": SEQUENTIAL_WORKFLOW, "parallel": PARALLEL_WORKFLOW}
+
+
+def resolve_workflow(spec: Optional[str]) -> WorkflowDefinition:
+    """Nombre builtin ('sequential' / 'parallel') o ruta a un JSON."""
+    if not spec:
+        return SEQUENTIAL_WORKFLOW
+    if spec in BUILTIN_WORKFLOWS:
+        return BUILTIN_WORKFLOWS[spec]
+    return WorkflowDefinition.load(spec)
+
+
+@dataclass
+class WorkflowRun:
+    """Resultado de ejecutar un workflow."""
+    status: str
+    steps_completed: List[str]
+    failed_at: Optional[str]
+    retries: int
+    # Última respuesta exitosa de cada paso completado (ids para compensar)
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+
+class WorkflowExecutor:
+    """
+    Ejecuta un WorkflowDefinition lanzando cada paso en cuanto sus dependencias terminan.
+
+    La semilla de caos de cada intento es la misma que usaba el runner
+    secuencial (`seed`, luego `seed + attempt * 1000`), así que el workflow
+    secuencial reproduce exactamente los resultados históricos.
+    """
+
+    def __init__(self, definition: WorkflowDefinition, step_functions: Dict[str, StepFunction]):
+        missing = [s.name for s in definition.steps if s.name not in step_functions]
+        if missing:
+            raise ValueError(f"No step function for workflow steps: {missing}")
+        self.definition = definition
+        self.step_functions = step_functions
+
+    async def _run_step(
+        self,
+        step: WorkflowStep,
+        failure_rate: float,
+        seed: int,
+        agent_retries: int,
+        observer: Optional[StepObserver],
+        clock: Callable[[], float],
+    ) -> Tuple[bool, int, Dict[str, Any]]:
+        retries = 0
+        result: Dict[str, Any] = {}
+        for attempt in range(step.retries_for(agent_retries) + 1):
+            config = ChaosConfig(enabled=True, failure_rate=failure_rate, seed=seed + (attempt * 1000))
+            if attempt > 0:
+                retries += 1
+            started = clock()
+            result = await self.step_functions[step.name](config)
+            if observer is not None:
+                observer(step.name, result, started, clock())
+            if result["status"] == "success":
+                return True, retries, result
+        return False, retries, result
+
+    async def run(
+        self,
+        failure_rate: float,
+        seed: int,
+        agent_retries: int = 0,
+        observer: Optional[StepObserver] = None,
+        clock: Optional[Callable[[], float]] = None,
+    ) -> WorkflowRun:
+        clock = clock or (lambda: 0.0)
+        definition = self.definition
+        done: List[str] = []
+        failed_at: Optional[str] = None
+        total_retries = 0
+        results: Dict[str, Dict[str, Any]] = {}
+        started = set()
+        running: Dict[asyncio.Task, str] = {}
+
+        def launch_ready():
+            for name in definition.order:
+                if name in started:
+                    continue
+                if all(d in done for d in definition[name].depends_on):
+                    started.add(name)
+                    task = asyncio.ensure_future(self._run_step(
+                        definition[name], failure_rate, seed, agent_retries, observer, clock
+                    ))
+                    running[task] = name
+
+        launch_ready()
+        while running:
+            finished, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+            # Orden determinista cuando varios pasos terminan a la vez
+            for task in sorted(finished, key=lambda t: definition.order.index(running[t])):
+                name = running.pop(task)
+                ok, retries, result = task.result()
+                total_retries += retries
+                if ok:
+                    done.append(name)
+                    results[name] = result
+                elif failed_at is None:
+                    failed_at = name
+            if failed_at is None:
+                launch_ready()
+
+        return WorkflowRun(
+            status="success" if failed_at is None else "failure",
+            steps_completed=done,
+            failed_at=failed_at,
+            retries=total_retries,
+            results=results,
+        )
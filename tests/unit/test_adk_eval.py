@@ -0,0 +1,100 @@
+import pytest
+from google.adk.evaluation.eval_config import EvalConfig
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from chaos_engine.agents.order_agent import create_order_agent
+from chaos_engine.evaluation.adk_eval import build_eval_set, classify_score, evaluate_agent
+
+
+class RecordingExecutor:
+    def __init__(self, name):
+        self.name = name
+        self.calls = []
+
+    async def send_request(self, method, endpoint, params=None, json_body=None):
+        self.calls.append((method, endpoint))
+        return {"status": 200, "data": {"executor": self.name}}
+
+
+class StaticPlaybook:
+    def __init__(self, entries):
+        self.entries = entries
+
+    def get_all(self):
+        return self.entries
+
+
+def _tool(agent, name):
+    return next(t for t in agent.tools if getattr(t, "__name__", None) == name)
+
+
+@pytest.mark.asyncio
+async def test_order_agents_use_their_own_injected_dependencies():
+    exec_a, exec_b = RecordingExecutor("a"), RecordingExecutor("b")
+    agent_a = create_order_agent(exec_a, StaticPlaybook({"pb": "a"}), model="gemini-2.5-flash-lite")
+    agent_b = create_order_agent(exec_b, StaticPlaybook({"pb": "b"}), model="gemini-2.5-flash-lite")
+
+    result = await _tool(agent_a, "get_inventory")()
+    await _tool(agent_b, "place_order")(pet_id=1, quantity=1)
+
+    assert result["data"]["executor"] == "a"
+    assert exec_a.calls == [("GET", "/store/inventory")]
+    assert exec_b.calls == [("POST", "/store/order")]
+    assert _tool(agent_b, "get_playbook")() == {"pb": "b"}
+
+
+def test_build_eval_set_keeps_expected_trajectory_in_memory():
+    eval_set = build_eval_set(
+        [{"query": "Buy pet 12345", "expected_tool_use": [{"tool_name": "get_inventory", "tool_input": {}}], "reference": "{}"}],
+        name="A-0.00-001",
+    )
+
+    assert [case.eval_id for case in eval_set.eval_cases] == ["A-0.00-001"]
+    invocation = eval_set.eval_cases[0].conversation[0]
+    assert [call.name for call in invocation.intermediate_data.tool_uses] == ["get_inventory"]
+
+
+EXPECTED_TRAJECTORY = [
+    {"tool_name": "get_inventory", "tool_input": {}},
+    {"tool_name": "find_pets_by_status", "tool_input": {"status": "available"}},
+]
+
+
+class TrajectoryLlm(BaseLlm):
+    """Modelo stub: llama a las tools de `plan` en orden y después responde texto."""
+    plan: list = []
+
+    async def generate_content_async(self, llm_request, stream=False):
+        tool_turns = sum(
+            1 for content in llm_request.contents for part in content.parts or [] if part.function_response
+        )
+        if tool_turns < len(self.plan):
+            step = self.plan[tool_turns]
+            part = types.Part(function_call=types.FunctionCall(name=step["tool_name"], args=step["tool_input"]))
+        else:
+            part = types.Part(text="done")
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+@pytest.mark.asyncio
+async def test_evaluate_agent_scores_tool_trajectory_and_maps_pass_fail():
+    pytest.importorskip("google.adk.evaluation.local_eval_service")  # Extras google-adk[eval] (rouge_score, pandas...)
+    eval_set = build_eval_set([{"query": "Buy a pet", "expected_tool_use": EXPECTED_TRAJECTORY, "reference": "done"}])
+    config = EvalConfig(criteria={"tool_trajectory_avg_score": 1.0})
+
+    async def score(plan):
+        agent = create_order_agent(RecordingExecutor("eval"), StaticPlaybook({}),
+                                   model=TrajectoryLlm(model="stub", plan=plan))
+        return await evaluate_agent(agent, eval_set, eval_config=config)
+
+    full = await score(EXPECTED_TRAJECTORY)
+    partial = await score(EXPECTED_TRAJECTORY[:1])
+
+    assert full == {"tool_trajectory_avg_score": 1.0}
+    assert partial == {"tool_trajectory_avg_score": 0.0}
+    assert classify_score(full["tool_trajectory_avg_score"]) == ("success", 0)
+    assert classify_score(partial["tool_trajectory_avg_score"]) == ("failure", 0)
+    assert classify_score(0.25) == ("failure", 1)   # Trayectoria parcial -> inconsistencia
+    assert classify_score(None) == ("failure", 0)
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import pytest
+
+from chaos_engine.agents.pool import AgentPool
+from chaos_engine.agents.scripted_llm import ScriptedPolicyLlm
+
+
+class RecordingExecutor:
+    """Executor que registra sus llamadas; opcionalmente falla siempre en un endpoint."""
+    def __init__(self, failing_endpoint=None):
+        self.failing_endpoint = failing_endpoint
+        self.calls = []
+
+    async def send_request(self, method, endpoint, params=None, json_body=None):
+        self.calls.append(endpoint)
+        await asyncio.sleep(0)  # Cede el control: fuerza el entrelazado de experimentos
+        if endpoint == self.failing_endpoint:
+            return {"status": "error", "code": 500, "message": "Boom"}
+        if "findByStatus" in endpoint:
+            return {"status": "success", "code": 200, "data": [{"id": 7, "name": "Rex"}]}
+        return {"status": "success", "code": 200, "data": {}}
+
+    def calculate_jittered_backoff(self, seconds):
+        return seconds
+
+
+@pytest.fixture
+def playbook_file(tmp_path):
+    f = tmp_path / "playbook.json"
+    f.write_text(json.dumps({"default": {"strategy": "fail_fast", "config": {}}}), encoding="utf-8")
+    return str(f)
+
+
+@pytest.mark.asyncio
+async def test_pool_shares_agent_and_isolates_concurrent_experiments(playbook_file):
+    pool = AgentPool()
+    agent = pool.get(playbook_file, ScriptedPolicyLlm, "scripted-policy")
+    assert pool.get(playbook_file, ScriptedPolicyLlm, "scripted-policy") is agent
+
+    ok_executor = RecordingExecutor()
+    failing_executor = RecordingExecutor(failing_endpoint="/store/order")
+
+    ok, failed = await asyncio.gather(
+        agent.process_order("ORD-OK", 0.0, 1, executor=ok_executor),
+        agent.process_order("ORD-KO", 0.5, 2, executor=failing_executor),
+    )
+
+    assert ok["status"] == "success"
+    assert failed["status"] == "failure"
+    assert sorted(failed["steps_completed"]) == ["find_pets_by_status", "get_inventory"]
+    assert ok_executor.calls == ["/store/inventory", "/pet/findByStatus", "/store/order", "/pet"]
+    assert failing_executor.calls == ["/store/inventory", "/pet/findByStatus", "/store/order"]
+
+    # El runner se reutiliza y las sesiones terminadas se liberan
+    runner = agent._get_runner()
+    again = await agent.process_order("ORD-2", 0.0, 3, executor=RecordingExecutor())
+    assert again["status"] == "success"
+    assert agent._get_runner() is runner
+    assert pool.get_stats() == {"agents": 1, "hits": 1, "misses": 1}
+    sessions = await runner.session_service.list_sessions(app_name=runner.app_name, user_id="chaos_lab")
+    assert sessions.sessions == []
+
+
+def test_native_recovery_variant_gets_its_own_instruction(playbook_file):
+    pool = AgentPool()
+    baseline = pool.get(playbook_file, ScriptedPolicyLlm, "scripted-policy")
+    native = pool.get(playbook_file, ScriptedPolicyLlm, "scripted-policy", native_recovery=True)
+
+    assert native is not baseline
+    assert "playbook_applied" not in baseline._get_runner().agent.instruction
+    assert "playbook_applied" in native._get_runner().agent.instruction
@@ -2,7 +2,8 @@ import pytest
 import time
 from unittest.mock import patch, MagicMock, AsyncMock
 from chaos_engine.core.config import ConfigLoader
-from chaos_engine.core.resilience import CircuitBreakerProxy
+from chaos_engine.core.playbook_manager import CompiledPlaybook, load_compiled_playbook
+from chaos_engine.core.resilience import CircuitBreakerProxy, ResponseCacheProxy, PlaybookStrategyProxy
 
 # --- TEST CONFIGURATION ---
 
@@ -85,4 +86,149 @@ async def test_circuit_breaker_half_open_recovery(mock_executor):
     
     assert result["status"] == "success"
     assert cb._is_open is False # Se cerró de nuevo
-    assert cb._failures == 0
\ No newline at end of file
+    assert cb._failures == 0
+
+# --- TEST RESPONSE CACHE ---
+
+@pytest.mark.asyncio
+async def test_response_cache_hits_idempotent_reads(mock_executor):
+    """Las lecturas GET repetidas se sirven desde la caché."""
+    cache = ResponseCacheProxy(wrapped_executor=mock_executor, ttl_seconds=60)
+
+    await cache.send_request("GET", "/pet/findByStatus", params={"status": "available"})
+    await cache.send_request("GET", "/pet/findByStatus", params={"status": "available"})
+    await cache.send_request("GET", "/pet/findByStatus", params={"status": "sold"})
+
+    assert mock_executor.send_request.call_count == 2
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+@pytest.mark.asyncio
+async def test_response_cache_lru_eviction_and_write_invalidation(mock_executor):
+    cache = ResponseCacheProxy(wrapped_executor=mock_executor, ttl_seconds=60, max_entries=1)
+
+    await cache.send_request("GET", "/store/inventory")
+    await cache.send_request("GET", "/pet/findByStatus")  # Evicts /store/inventory
+    assert cache.get_stats()["evictions"] == 1
+
+    await cache.send_request("POST", "/store/order", json_body={"petId": 1})
+    assert cache.get_stats()["entries"] == 0
+
+@pytest.mark.asyncio
+async def test_response_cache_serves_stale_on_error():
+    """Si la API falla tras caducar el TTL, se sirve la última respuesta buena."""
+    executor = MagicMock()
+    executor.send_request = AsyncMock(side_effect=[
+        {"status": "success", "code": 200, "data": {"available": 10}},
+        {"status": "error", "code": 503, "message": "Service Unavailable"},
+    ])
+    cache = ResponseCacheProxy(wrapped_executor=executor, ttl_seconds=0)
+
+    await cache.send_request("GET", "/store/inventory")
+    result = await cache.send_request("GET", "/store/inventory")
+
+    assert result["status"] == "success"
+    assert result["stale"] is True
+    assert cache.get_stats()["stale_hits"] == 1
+
+# --- TEST COMPILED PLAYBOOK ---
+
+def test_compiled_playbook_lookup_and_shared_cache(tmp_path):
+    import json, os
+    path = tmp_path / "playbook.json"
+    path.write_text(json.dumps({
+        "_metadata": {"description": "test"},
+        "default": {"strategy": "fail_fast"},
+        "get_inventory": {"503": {"strategy": "retry"}, "timeout": {"strategy": "wait"}}
+    }), encoding="utf-8")
+
+    compiled = load_compiled_playbook(str(path))
+
+    # Claves enteras y strings no numéricas
+    assert compiled.lookup("get_inventory", 503)["strategy"] == "retry"
+    assert compiled.lookup("get_inventory", "503")["strategy"] == "retry"
+    assert compiled.lookup("get_inventory", "timeout")["strategy"] == "wait"
+    assert compiled.lookup("place_order", 503) is None
+    assert compiled.default["strategy"] == "fail_fast"
+
+    # Misma instancia mientras el fichero no cambie
+    assert load_compiled_playbook(path) is compiled
+
+    # Cambio de contenido (mtime) -> recompilación
+    path.write_text(json.dumps({"get_inventory": {"503": {"strategy": "wait"}}}), encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    reloaded = load_compiled_playbook(path)
+    assert reloaded is not compiled
+    assert reloaded.lookup("get_inventory", 503)["strategy"] == "wait"
+
+
+# --- TEST NATIVE PLAYBOOK RECOVERY ---
+
+NATIVE_PLAYBOOK = CompiledPlaybook({
+    "default": {"strategy": "fail_fast", "config": {}},
+    "get_inventory": {"503": {"strategy": "retry_exponential_backoff", "config": {"base_delay": 1.0, "max_retries": 3}}},
+    "place_order": {"429": {"strategy": "wait_and_retry", "config": {"wait_seconds": 5, "max_retries": 1}}}
+})
+
+@pytest.mark.asyncio
+async def test_playbook_strategy_proxy_retries_with_backoff():
+    error_503 = {"status": "error", "code": 503, "message": "Service Unavailable"}
+    executor = MagicMock(spec=["send_request"])  # Sin jitter
+    executor.send_request = AsyncMock(side_effect=[error_503, error_503, {"status": "success", "code": 200, "data": {}}])
+    sleep = AsyncMock()
+    proxy = PlaybookStrategyProxy(wrapped_executor=executor, playbook=NATIVE_PLAYBOOK, sleep=sleep)
+
+    result = await proxy.send_request("GET", "/store/inventory")
+
+    assert result["status"] == "success"
+    assert [c.args[0] for c in sleep.await_args_list] == [1.0, 2.0]
+    assert proxy.get_stats()["recoveries"] == 1
+    assert proxy.get_stats()["retries"] == 2
+
+@pytest.mark.asyncio
+async def test_playbook_strategy_proxy_marks_exhausted_and_fail_fast():
+    executor = MagicMock()
+    executor.send_request = AsyncMock(return_value={"status": "error", "code": 429, "message": "Too Many Requests"})
+    proxy = PlaybookStrategyProxy(wrapped_executor=executor, playbook=NATIVE_PLAYBOOK, sleep=AsyncMock())
+
+    exhausted = await proxy.send_request("POST", "/store/order", json_body={})
+    assert exhausted["playbook_applied"] is True
+    assert exhausted["recovery"] == {"strategy": "wait_and_retry", "retries": 1}
+    assert executor.send_request.await_count == 2
+
+    # Código sin entrada -> default (fail_fast): sin reintentos
+    executor.send_request.reset_mock()
+    failed = await proxy.send_request("GET", "/store/inventory")
+    assert failed["playbook_applied"] is True
+    assert executor.send_request.await_count == 1
+    assert proxy.get_stats()["fail_fast"] == 1
+
+@pytest.mark.asyncio
+async def test_playbook_serve_cached_falls_back_to_response_cache():
+    playbook = CompiledPlaybook({
+        "default": {"strategy": "fail_fast", "config": {}},
+        "get_inventory": {"503": {"strategy": "serve_cached", "config": {}}},
+        "find_pets_by_status": {"503": {"strategy": "serve_cached", "config": {}}},
+    })
+    error_503 = {"status": "error", "code": 503, "message": "Service Unavailable"}
+    executor = MagicMock(spec=["send_request"])
+    executor.send_request = AsyncMock(side_effect=[{"status": "success", "code": 200, "data": {"sold": 3}}, error_503, error_503])
+    clock = MagicMock(side_effect=[0.0, 100.0, 100.0, 100.0])
+    # La caché no sirve datos caducados por su cuenta: lo decide el playbook
+    cache = ResponseCacheProxy(wrapped_executor=executor, ttl_seconds=30, serve_stale_on_error=False, clock=clock)
+    proxy = PlaybookStrategyProxy(wrapped_executor=cache, playbook=playbook, sleep=AsyncMock(), response_cache=cache)
+
+    assert (await proxy.send_request("GET", "/store/inventory"))["status"] == "success"
+    fallback = await proxy.send_request("GET", "/store/inventory")
+    assert fallback["data"] == {"sold": 3}
+    assert fallback["served_from_cache"] is True and fallback["stale"] is True
+    assert fallback["recovery"] == {"strategy": "serve_cached", "retries": 0}
+
+    # Sin entrada en caché -> como fail_fast
+    missing = await proxy.send_request("GET", "/pet/findByStatus", params={"status": "available"})
+    assert missing["status"] == "error" and missing["playbook_applied"] is True
+    assert proxy.get_stats()["cache_fallbacks"] == 1
+    assert proxy.get_stats()["fail_fast"] == 1
+    assert cache.get_stats()["fallback_hits"] == 1
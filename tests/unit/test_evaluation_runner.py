@@ -0,0 +1,188 @@
+import json
+import pytest
+
+from chaos_engine.agents.scripted_llm import ScriptedPolicyLlm
+from chaos_engine.evaluation.runner import EvaluationRunner
+
+
+@pytest.fixture
+def suite_file(tmp_path):
+    cases = []
+    for i, rate in enumerate([0.0, 1.0, 0.0, 1.0, 0.0, 1.0]):
+        status = "success" if rate == 0.0 else "failure"
+        cases.append({
+            "id": f"TC-{i}", "description": f"rate {rate}", "input": f"Order-{i}",
+            "chaos_config": {"rate": rate, "seed": 42},
+            "expected": {"status": status}
+        })
+    f = tmp_path / "suite.json"
+    f.write_text(json.dumps({"name": "Concurrent Suite", "test_cases": cases}), encoding="utf-8")
+    return str(f)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_suite_isolates_cases_and_keeps_order(suite_file):
+    config = {"agent": {"model": "scripted-policy"}, "mock_mode": True}
+    runner = EvaluationRunner(
+        "assets/playbooks/baseline.json",
+        llm_client_constructor=ScriptedPolicyLlm,
+        concurrency=4,
+        config=config
+    )
+    default_executor = runner.agent.executor
+
+    results = await runner.run_suite(suite_file)
+
+    assert [r.case_id for r in results] == [f"TC-{i}" for i in range(6)]
+    assert all(r.passed for r in results), [r.reason for r in results if not r.passed]
+    assert runner.agent.executor is default_executor  # Ya no se intercambia "en caliente"
+
+
+@pytest.mark.asyncio
+async def test_sharded_runs_merge_into_full_report(suite_file):
+    from chaos_engine.evaluation.sharding import build_report, merge_reports, parse_shard
+
+    config = {"agent": {"model": "scripted-policy"}, "mock_mode": True}
+    runner = EvaluationRunner("assets/playbooks/baseline.json", llm_client_constructor=ScriptedPolicyLlm, config=config)
+    meta = {"timestamp": "t", "suite": suite_file, "playbook": "baseline"}
+
+    full = build_report(await runner.run_suite(suite_file), concurrency=1, wall_time_s=1.0, **meta)
+    shards = []
+    for spec in ("2/4", "4/4", "1/4", "3/4"):
+        shard = parse_shard(spec)
+        results = await runner.run_suite(suite_file, shard=shard)
+        shards.append(build_report(results, concurrency=1, wall_time_s=0.5, shard=shard, **meta))
+
+    merged = merge_reports(shards, timestamp="t")
+
+    assert set(merged) == set(full)
+    assert [r["case_id"] for r in merged["results"]] == [r["case_id"] for r in full["results"]]
+    assert {k: merged["summary"][k] for k in ("total", "passed", "failed")} == {"total": 6, "passed": 6, "failed": 0}
+    with pytest.raises(ValueError, match="Missing shards: 3/4"):
+        merge_reports([s for s in shards if s["shard"]["index"] != 3], timestamp="t")
+
+
+def test_percentile_interpolates_like_numpy():
+    from chaos_engine.evaluation.slo import evaluate_slo, percentile
+
+    values = list(range(1, 11))
+    assert percentile(values, 50) == 5.5
+    assert percentile(values, 95) == pytest.approx(9.55)
+    assert percentile(values, 100) == 10
+
+    observed, violations = evaluate_slo(
+        [{"duration_ms": v, "model_calls": 3} for v in values],
+        {"latency_ms": {"p50": 6, "p99": 9}, "model_calls": {"p95": 3}}
+    )
+    assert observed["latency_ms"] == {"p50": 5.5, "p99": 9.91}
+    assert violations == ["latency_ms p99 9.91 > 9"]
+
+
+@pytest.mark.asyncio
+async def test_repeated_case_enforces_percentile_budgets(tmp_path):
+    cases = [
+        {"id": "SLO-OK", "description": "budgets met", "input": "Order-1", "repeat": 5,
+         "chaos_config": {"rate": 0.0, "seed": 42},
+         "expected": {"status": "success", "slo": {"model_calls": {"p50": 20, "p99": 20}, "tool_retries": {"p95": 0}}}},
+        {"id": "SLO-TIGHT", "description": "model call budget too low", "input": "Order-2", "repeat": 5,
+         "chaos_config": {"rate": 0.0, "seed": 42},
+         "expected": {"status": "success", "slo": {"model_calls": {"p95": 1}}}},
+    ]
+    suite = tmp_path / "slo_suite.json"
+    suite.write_text(json.dumps({"name": "SLO Suite", "test_cases": cases}), encoding="utf-8")
+    runner = EvaluationRunner(
+        "assets/playbooks/baseline.json",
+        llm_client_constructor=ScriptedPolicyLlm,
+        concurrency=3,
+        config={"agent": {"model": "scripted-policy"}, "mock_mode": True}
+    )
+
+    ok, tight = await runner.run_suite(str(suite))
+
+    assert ok.passed, ok.reason
+    assert ok.metrics["repeat"] == 5 and ok.metrics["pass_rate"] == 1.0
+    assert [run["seed"] for run in ok.metrics["runs"]] == [42, 43, 44, 45, 46]
+    assert set(ok.metrics["percentiles"]) == {"model_calls", "tool_retries"}
+    assert not tight.passed
+    assert tight.reason.startswith("SLO violation: model_calls p95")
+
+
+@pytest.mark.asyncio
+async def test_latency_slo_case_runs_isolated_and_sequential(tmp_path):
+    cases = [
+        {"id": "LAT", "description": "latency budget", "input": "Order-1", "repeat": 4,
+         "chaos_config": {"rate": 0.0, "seed": 42},
+         "expected": {"status": "success", "slo": {"latency_ms": {"p95": 60000}}}},
+        {"id": "A", "description": "plain", "input": "Order-2",
+         "chaos_config": {"rate": 0.0, "seed": 42}, "expected": {"status": "success"}},
+        {"id": "B", "description": "plain", "input": "Order-3",
+         "chaos_config": {"rate": 0.0, "seed": 42}, "expected": {"status": "success"}},
+    ]
+    suite = tmp_path / "latency_suite.json"
+    suite.write_text(json.dumps({"name": "Latency Suite", "test_cases": cases}), encoding="utf-8")
+    runner = EvaluationRunner(
+        "assets/playbooks/baseline.json",
+        llm_client_constructor=ScriptedPolicyLlm,
+        concurrency=4,
+        config={"agent": {"model": "scripted-policy"}, "mock_mode": True}
+    )
+
+    in_flight, overlapped = [], []
+    execute_case = runner._execute_case
+
+    async def tracked(case, seed, semaphore=None):
+        # Una ejecución de LAT nunca comparte el loop con otra ejecución
+        if in_flight and (case["id"] == "LAT" or any(c == "LAT" for c, _ in in_flight)):
+            overlapped.append((case["id"], seed))
+        in_flight.append((case["id"], seed))
+        try:
+            return await execute_case(case, seed, semaphore)
+        finally:
+            in_flight.remove((case["id"], seed))
+    runner._execute_case = tracked
+
+    results = await runner.run_suite(str(suite))
+
+    assert [r.case_id for r in results] == ["LAT", "A", "B"]
+    assert all(r.passed for r in results), [r.reason for r in results]
+    assert results[0].metrics["repeat"] == 4
+    assert overlapped == []
+
+
+@pytest.mark.asyncio
+async def test_incremental_cache_reruns_only_cases_touching_changed_entries(tmp_path):
+    playbook = tmp_path / "playbook.json"
+    playbook.write_text(open("assets/playbooks/training.json", encoding="utf-8").read(), encoding="utf-8")
+    cases = [
+        {"id": "HAPPY", "description": "no chaos", "input": "Order-1",
+         "chaos_config": {"rate": 0.0, "seed": 42}, "expected": {"status": "success"}},
+        {"id": "CHAOS", "description": "recovers", "input": "Order-2",
+         "chaos_config": {"rate": 0.2, "seed": 42}, "expected": {"status": "success"}},
+    ]
+    suite = tmp_path / "suite.json"
+    suite.write_text(json.dumps({"name": "Incremental", "test_cases": cases}), encoding="utf-8")
+
+    async def run():
+        runner = EvaluationRunner(
+            str(playbook), llm_client_constructor=ScriptedPolicyLlm, cache_dir=str(tmp_path / "cache"),
+            config={"agent": {"model": "scripted-policy"}, "mock_mode": True}
+        )
+        results = await runner.run_suite(str(suite))
+        return {r.case_id: r for r in results}
+
+    first = await run()
+    assert all(r.passed for r in first.values())
+    touched = first["CHAOS"].metrics["playbook_lookups"]
+    assert first["HAPPY"].metrics["playbook_lookups"] == [] and touched
+
+    second = await run()
+    assert all(r.metrics.get("cached") for r in second.values())
+
+    data = json.loads(playbook.read_text(encoding="utf-8"))
+    tool, code = touched[0]
+    data[tool][code]["reasoning"] = "edited"
+    playbook.write_text(json.dumps(data), encoding="utf-8")
+
+    third = await run()
+    assert third["HAPPY"].metrics.get("cached") is True
+    assert "cached" not in third["CHAOS"].metrics
@@ -0,0 +1,162 @@
+import asyncio
+import pytest
+
+from chaos_engine.core.playbook_storage import PlaybookStorage
+from chaos_engine.core.services.experiment_evaluator import ExperimentEvaluator
+from chaos_engine.core.services.verdict_cache import VerdictCache
+
+
+class FakeJudgeRunner:
+    """run_debug simulado: promociona las trazas con outcome success."""
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.sessions = []
+
+    async def run_debug(self, prompt, user_id="debug_user_id", session_id="debug_session_id", quiet=False):
+        self.sessions.append(session_id)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        if "Outcome: success" in prompt:
+            return [{"text": "Outcome: success. Confidence: 0.9. Promote to playbook."}]
+        return [{"text": "Outcome: failure. Confidence: 0.8."}]
+
+
+class CountingStorage(PlaybookStorage):
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        self.writes = 0
+
+    async def _write_playbook(self, data):
+        self.writes += 1
+        await super()._write_playbook(data)
+
+
+def make_trace(outcome, scenario="timeout"):
+    return {
+        "events": [{"tool": "inventory", "status": "error", "error_code": 504, "duration": 0.1}],
+        "outcome": outcome, "total_duration": 0.2,
+        "chaos_scenario": scenario, "failed_api": "inventory",
+    }
+
+
+@pytest.mark.asyncio
+async def test_batch_judges_concurrently_and_commits_promotions_once(tmp_path):
+    runner = FakeJudgeRunner()
+    storage = CountingStorage(str(tmp_path / "playbook.json"))
+    evaluator = ExperimentEvaluator(runner=runner, storage=storage, concurrency=4, use_verdict_cache=False)
+
+    traces = [make_trace("success"), make_trace("failure"), make_trace("success", scenario="503"),
+              make_trace("success"), {"outcome": "broken"}, make_trace("success")]
+    results = await evaluator.evaluate_experiments_batch(traces)
+
+    assert [r["experiment_id"] for r in results] == [f"EXP-{i:03d}" for i in range(1, 7)]
+    assert runner.peak == 4
+    assert len(set(runner.sessions)) == len(runner.sessions)   # Una sesión por evaluación
+    assert [r.get("procedure_id") for r in results] == ["PROC-001", None, None, "PROC-002", None, "PROC-003"]
+    assert "save_error" in results[2]          # '503' no es un failure_type válido
+    assert results[4]["outcome"] == "error"    # Traza inválida no aborta el lote
+    assert storage.writes == 1
+
+
+@pytest.mark.asyncio
+async def test_prejudge_decides_clear_traces_and_escalates_recoveries(tmp_path):
+    runner = FakeJudgeRunner(delay=0)
+    evaluator = ExperimentEvaluator(runner=runner, storage=PlaybookStorage(str(tmp_path / "p.json")))
+
+    clean = {"events": [{"tool": "inventory", "status": "success", "duration": 0.1}], "outcome": "success"}
+    recovered = {
+        "events": [
+            {"tool": "inventory", "status": "error", "error_code": 503, "duration": 0.1, "attempt": 1},
+            {"tool": "inventory", "status": "success", "duration": 0.1, "attempt": 2},
+        ],
+        "outcome": "success", "chaos_scenario": "service_unavailable", "failed_api": "inventory",
+    }
+    results = await evaluator.evaluate_experiments_batch([clean, make_trace("failure"), recovered, clean])
+
+    assert [r.get("decided_by") for r in results] == ["rules:clean_success", "rules:unrecovered_failure", None, "rules:clean_success"]
+    assert results[1]["outcome"] == "failure" and not results[1]["promoted"]
+    assert results[2]["promoted"] is True
+    stats = evaluator.get_stats()
+    assert stats["judge_calls"] == 1 == len(runner.sessions)
+    assert stats["prejudge"]["escalation_rate"] == 0.25
+
+
+@pytest.mark.asyncio
+async def test_verdict_cache_judges_each_pattern_once(tmp_path):
+    runner = FakeJudgeRunner(delay=0.01)
+    evaluator = ExperimentEvaluator(runner=runner, storage=PlaybookStorage(str(tmp_path / "p.json")), concurrency=8)
+
+    def recovered(duration, code=503):
+        return {
+            "events": [
+                {"tool": "inventory", "status": "error", "error_code": code, "duration": duration, "attempt": 1},
+                {"tool": "inventory", "status": "success", "duration": duration, "attempt": 2},
+            ],
+            "outcome": "success", "total_duration": 2 * duration,
+            "chaos_scenario": "service_unavailable", "failed_api": "inventory",
+        }
+
+    # 0.11s y 0.12s caen en el mismo bucket; 504 y 3s son patrones distintos
+    traces = [recovered(0.11), recovered(0.12), recovered(0.11, code=504), recovered(3.0), recovered(0.12)]
+    results = await evaluator.evaluate_experiments_batch(traces)
+
+    assert len(runner.sessions) == 3
+    assert [r["experiment_id"] for r in results] == [f"EXP-{i:03d}" for i in range(1, 6)]
+    assert [r.get("verdict_cache") for r in results].count("coalesced") == 2
+    assert all(r["promoted"] for r in results)
+
+    again = await evaluator.evaluate_experiment(recovered(0.115), "EXP-100")
+    assert again["verdict_cache"] == "hit" and again["experiment_id"] == "EXP-100"
+    assert len(runner.sessions) == 3
+    assert evaluator.get_stats()["verdict_cache"]["misses"] == 3
+
+
+@pytest.mark.asyncio
+async def test_verdict_cache_waiter_survives_cancelled_leader():
+    cache = VerdictCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"promoted": True}
+
+    leader = asyncio.create_task(cache.get_or_compute("sig", compute))
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(cache.get_or_compute("sig", compute))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    # El waiter no hereda la cancelación: repite el cálculo y lo guarda
+    assert await waiter == ({"promoted": True}, "miss")
+    assert leader.cancelled()
+    assert len(calls) == 2
+    assert cache.get("sig") == {"promoted": True}
+
+
+@pytest.mark.asyncio
+async def test_verdict_cache_rebuilds_trace_fields_per_experiment(tmp_path):
+    storage = PlaybookStorage(str(tmp_path / "p.json"))
+    evaluator = ExperimentEvaluator(runner=FakeJudgeRunner(), storage=storage, use_prejudge=False)
+
+    def promoted_trace(success_rate):
+        trace = make_trace("success")
+        trace.update({"success_rate": success_rate, "recovery_strategy": "retry with backoff"})
+        return trace
+
+    # Misma firma, success_rate distinto: B reutiliza la decisión de A, no su tasa
+    first = await evaluator.evaluate_experiment(promoted_trace(0.2), "EXP-A")
+    second = await evaluator.evaluate_experiment(promoted_trace(0.95), "EXP-B")
+
+    assert "verdict_cache" not in first and second["verdict_cache"] == "hit"
+    assert first["success_rate"] == 0.2 and second["success_rate"] == 0.95
+    assert "procedure_id" in first and "procedure_id" in second
+    assert first["procedure_id"] != second["procedure_id"]
+
+    procedures = {p["id"]: p for p in await storage.load_procedures()}
+    assert procedures[first["procedure_id"]]["success_rate"] == 0.2
+    assert procedures[second["procedure_id"]]["success_rate"] == 0.95
@@ -0,0 +1,90 @@
+import json
+from typing import ClassVar
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from chaos_engine.agents.llm_cache import RecordReplayConstructor
+from chaos_engine.agents.petstore import PetstoreAgent
+from chaos_engine.agents.scripted_llm import ScriptedPolicyLlm
+
+
+class CountingPolicyLlm(ScriptedPolicyLlm):
+    """ScriptedPolicyLlm que cuenta las llamadas reales al modelo."""
+    calls: ClassVar[int] = 0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        CountingPolicyLlm.calls += 1
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+
+
+class SuccessExecutor:
+    async def send_request(self, method, endpoint, params=None, json_body=None):
+        if "findByStatus" in endpoint:
+            return {"status": "success", "code": 200, "data": [{"id": 7, "name": "Rex"}]}
+        return {"status": "success", "code": 200, "data": {}}
+
+    def calculate_jittered_backoff(self, seconds):
+        return seconds
+
+
+@pytest.fixture
+def playbook_file(tmp_path):
+    f = tmp_path / "playbook.json"
+    f.write_text(json.dumps({"default": {"strategy": "fail_fast", "config": {}}}), encoding="utf-8")
+    return str(f)
+
+
+async def _run(playbook_file, constructor):
+    agent = PetstoreAgent(playbook_file, SuccessExecutor(), constructor, "scripted-policy")
+    return await agent.process_order("ORD-1", 0.0, 42)
+
+
+@pytest.mark.asyncio
+async def test_second_identical_run_replays_without_model_calls(playbook_file, tmp_path):
+    CountingPolicyLlm.calls = 0
+    constructor = RecordReplayConstructor(CountingPolicyLlm, str(tmp_path / "llm_cache"))
+
+    first = await _run(playbook_file, constructor)
+    recorded_calls = CountingPolicyLlm.calls
+    second = await _run(playbook_file, constructor)
+
+    assert recorded_calls == 5  # 4 tools + respuesta final
+    assert CountingPolicyLlm.calls == recorded_calls
+    # Los replays no cuentan como llamadas al modelo
+    assert (first["model_calls"], first["model_cache_hits"]) == (5, 0)
+    assert (second["model_calls"], second["model_cache_hits"]) == (0, 5)
+    assert first["status"] == second["status"] == "success"
+    assert second["steps_completed"] == first["steps_completed"]
+
+
+@pytest.mark.asyncio
+async def test_replay_mode_raises_on_miss(playbook_file, tmp_path):
+    constructor = RecordReplayConstructor(CountingPolicyLlm, str(tmp_path / "empty"), mode="replay")
+
+    assert constructor.requires_api_key is False
+    result = await _run(playbook_file, constructor)
+
+    assert result["status"] == "failure"
+    assert result["failed_at"] == "exception"
+    assert "No recorded response" in result["error"]
+
+
+@pytest.mark.asyncio
+async def test_request_without_temperature_is_passed_through(tmp_path):
+    CountingPolicyLlm.calls = 0
+    cache_dir = tmp_path / "llm_cache"
+    llm = RecordReplayConstructor(CountingPolicyLlm, str(cache_dir))(model="scripted-policy")
+    request = LlmRequest(
+        contents=[types.Content(role="user", parts=[types.Part(text="Process order ORD-1")])],
+        config=types.GenerateContentConfig(),
+    )
+
+    for _ in range(2):
+        async for _response in llm.generate_content_async(request):
+            pass
+
+    assert CountingPolicyLlm.calls == 2
+    assert not cache_dir.exists()
+    assert llm.get_stats() == {"hits": 0, "misses": 0}
@@ -52,4 +52,54 @@ def test_latency_statistics():
     assert stats["min_latency_s"] == 1.0
     assert stats["max_latency_s"] == 100.0
     assert stats["median_latency_s"] == 3.0
-    assert stats["mean_latency_s"] == 22.0
\ No newline at end of file
+    assert stats["mean_latency_s"] == 22.0
+
+
+def test_single_pass_summary_matches_lists_generators_and_arrays():
+    import numpy as np
+    from chaos_engine.reporting.aggregate_metrics import OUTCOME_CODES, ResultSummary
+
+    agg = MetricsAggregator()
+    durations = [0.5, 2.0, 1.25, 9.0, 3.5, 0.75, 4.0]
+    outcomes = ["success", "failure", "success", "inconsistent", "success", "failure", "success"]
+    baseline = [MockResult(o, d) for o, d in zip(outcomes, durations)]
+    playbook = [MockResult("success", d, playbook_strategies_used=["retry", "wait"][: i % 3]) for i, d in enumerate(durations)]
+
+    from_lists = agg.compare_baseline_vs_playbook(baseline, playbook)
+    from_generators = agg.compare_baseline_vs_playbook((r for r in baseline), iter(playbook))
+    assert from_generators == from_lists
+    assert from_lists["playbook"]["total_strategy_uses"] == 6
+    assert from_lists["playbook"]["unique_strategies_used"] == 2
+
+    codes = np.array([OUTCOME_CODES.index(o) for o in outcomes])
+    summary = ResultSummary.from_arrays(codes, np.array(durations))
+    assert agg.calculate_latency_stats(summary) == agg.calculate_latency_stats(baseline)
+    assert agg.calculate_success_rate(summary) == agg.calculate_success_rate(baseline)
+    assert agg.calculate_latency_stats(summary)["p95_latency_s"] == 9.0
+
+
+def test_exact_proportion_intervals_near_boundaries():
+    from chaos_engine.reporting.intervals import clopper_pearson_interval, wilson_interval
+
+    # Valores de referencia (scipy.stats.beta.ppf / statsmodels proportion_confint)
+    assert clopper_pearson_interval(98, 100) == pytest.approx((0.929616, 0.997569), abs=1e-6)
+    assert clopper_pearson_interval(0, 10) == pytest.approx((0.0, 0.308497), abs=1e-6)
+    assert wilson_interval(98, 100) == pytest.approx((0.929988, 0.994498), abs=1e-5)
+
+    agg = MetricsAggregator()
+    rate = agg.calculate_success_rate([MockResult("success", 1.0)] * 98 + [MockResult("failure", 1.0)] * 2)
+    assert rate["confidence_interval_95"][1] == 1.0  # La aproximación normal se pega al 100%
+    assert rate["wilson_ci_95"][1] < 1.0 and rate["clopper_pearson_ci_95"][1] < 1.0
+
+
+def test_bootstrap_latency_intervals_are_reproducible_and_cover_estimate():
+    results = [MockResult("success", float(d)) for d in range(1, 201)]
+
+    stats = MetricsAggregator(bootstrap_resamples=500, seed=7).calculate_latency_stats(results)
+    again = MetricsAggregator(bootstrap_resamples=500, seed=7).calculate_latency_stats(iter(results))
+
+    assert stats == again
+    for name in ("median_latency_s", "p95_latency_s", "p99_latency_s"):
+        lower, upper = stats["bootstrap_ci_95"][name]
+        assert lower <= stats[name] <= upper
+    assert "bootstrap_ci_95" in MetricsAggregator(bootstrap_resamples=0).calculate_latency_stats(results)
@@ -2,7 +2,9 @@ import pytest
 import json
 import asyncio
 from pathlib import Path
-from chaos_engine.core.playbook_storage import PlaybookStorage
+from chaos_engine.core.playbook_storage import PlaybookStorage, IndexedPlaybookStorage
+from chaos_engine.core.playbook_sqlite import SQLitePlaybookStorage
+from chaos_engine.core.playbook_journal import JournaledPlaybookStorage
 
 # --- FIXTURES ---
 
@@ -128,4 +130,260 @@ async def test_validation_errors(temp_storage_file):
             api="inventory",
             recovery_strategy="x"
         )
-    assert "Invalid failure_type" in str(excinfo.value)
\ No newline at end of file
+    assert "Invalid failure_type" in str(excinfo.value)
+
+    # validate_entry: misma validación para entradas de save_procedures, sin escribir
+    storage.validate_entry({"failure_type": "timeout", "api": "inventory", "recovery_strategy": "x"})
+    with pytest.raises(ValueError, match="Invalid api"):
+        storage.validate_entry({"failure_type": "timeout", "api": "nope", "recovery_strategy": "x"})
+    assert await storage.load_procedures() == []
+
+# --- INDEXED STORAGE (WRITE-BEHIND) ---
+
+@pytest.mark.asyncio
+async def test_indexed_storage_best_procedure_and_filters(temp_storage_file):
+    storage = IndexedPlaybookStorage(file_path=temp_storage_file, flush_interval=60)
+
+    await storage.save_procedure("timeout", "inventory", "Retry", success_rate=0.5)
+    await storage.save_procedure("timeout", "inventory", "Wait 2s", success_rate=0.9)
+    await storage.save_procedure("timeout", "payments", "Retry", success_rate=1.0)
+
+    best = await storage.get_best_procedure("timeout", "inventory")
+    assert best["recovery_strategy"] == "Wait 2s"
+    assert len(await storage.load_procedures(failure_type="timeout")) == 3
+    assert len(await storage.load_procedures(api="payments")) == 1
+
+    # Write-behind: nada en disco hasta el flush
+    with open(temp_storage_file, 'r') as f:
+        assert json.load(f)["procedures"] == []
+
+    await storage.close()
+
+@pytest.mark.asyncio
+async def test_indexed_storage_flush_persists_and_reloads(temp_storage_file):
+    storage = IndexedPlaybookStorage(file_path=temp_storage_file, flush_interval=60)
+    first = await storage.save_procedure("timeout", "inventory", "Retry", success_rate=0.5)
+    await storage.close()
+
+    reloaded = IndexedPlaybookStorage(file_path=temp_storage_file)
+    second = await reloaded.save_procedure("timeout", "inventory", "Wait", success_rate=0.7)
+
+    assert first == "PROC-001"
+    assert second == "PROC-002"
+    assert (await reloaded.get_best_procedure("timeout", "inventory"))["id"] == "PROC-002"
+    await reloaded.close()
+
+@pytest.mark.asyncio
+async def test_indexed_storage_flushes_when_batch_is_full(temp_storage_file):
+    storage = IndexedPlaybookStorage(file_path=temp_storage_file, flush_interval=60, max_batch=2)
+    await storage.save_procedure("timeout", "inventory", "Retry")
+    await storage.save_procedure("timeout", "erp", "Retry")
+
+    with open(temp_storage_file, 'r') as f:
+        assert len(json.load(f)["procedures"]) == 2
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_indexed_storage_keeps_pending_on_failed_flush_and_returns_copies(temp_storage_file):
+    storage = IndexedPlaybookStorage(file_path=temp_storage_file, flush_interval=60)
+    await storage.save_procedure("timeout", "inventory", "Retry", success_rate=0.5)
+
+    # Los resultados son copias: mutarlos no cambia el índice
+    (await storage.load_procedures())[0]["success_rate"] = 0.0
+    (await storage.get_best_procedure("timeout", "inventory"))["metadata"]["x"] = 1
+    best = await storage.get_best_procedure("timeout", "inventory")
+    assert best["success_rate"] == 0.5 and best["metadata"] == {}
+
+    def broken_write(data):
+        raise OSError("disk full")
+
+    original_write = storage._write_snapshot
+    storage._write_snapshot = broken_write
+    with pytest.raises(OSError):
+        await storage.flush()
+    assert storage._pending == 1      # Sigue pendiente tras el fallo
+
+    storage._write_snapshot = original_write
+    await storage.close()
+    with open(temp_storage_file, 'r') as f:
+        assert [p["success_rate"] for p in json.load(f)["procedures"]] == [0.5]
+
+
+# --- SQLITE STORAGE (WAL) ---
+
+def _sqlite_writer(db_path: str, n: int) -> list:
+    """Worker de proceso: guarda n procedimientos en la misma base de datos."""
+    storage = SQLitePlaybookStorage(file_path=db_path)
+    return [asyncio.run(storage.save_procedure("timeout", "erp", f"Retry {i}")) for i in range(n)]
+
+@pytest.mark.asyncio
+async def test_sqlite_storage_best_procedure_and_filters(tmp_path):
+    storage = SQLitePlaybookStorage(file_path=str(tmp_path / "playbook.db"))
+
+    await storage.save_procedure("service_unavailable", "inventory", "Retry", success_rate=0.5)
+    await storage.save_procedure("service_unavailable", "inventory", "Wait 2s", success_rate=1.0,
+                                 metadata={"agent": "TestAgent"})
+    await storage.save_procedure("timeout", "inventory", "Retry", success_rate=0.8)
+
+    best = await storage.get_best_procedure("service_unavailable", "inventory")
+    assert best["recovery_strategy"] == "Wait 2s"
+    assert best["metadata"]["agent"] == "TestAgent"
+    assert len(await storage.load_procedures(api="inventory")) == 3
+    assert await storage.get_best_procedure("timeout", "erp") is None
+
+    with pytest.raises(ValueError):
+        await storage.save_procedure("503", "inventory", "x")
+
+def test_sqlite_storage_concurrent_processes_allocate_unique_ids(tmp_path):
+    """Varios procesos escribiendo a la vez no pierden ni duplican IDs."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    db_path = str(tmp_path / "playbook.db")
+    asyncio.run(SQLitePlaybookStorage(file_path=db_path).close())  # Crear el esquema (sin conexión abierta al hacer fork)
+
+    with ProcessPoolExecutor(max_workers=3, mp_context=multiprocessing.get_context("fork")) as pool:
+        results = list(pool.map(_sqlite_writer, [db_path] * 3, [10] * 3))
+
+    all_ids = [proc_id for ids in results for proc_id in ids]
+    assert len(all_ids) == 30
+    assert len(set(all_ids)) == 30
+
+@pytest.mark.asyncio
+async def test_sqlite_storage_close_closes_every_thread_connection(tmp_path):
+    import sqlite3
+    import threading
+
+    storage = SQLitePlaybookStorage(file_path=str(tmp_path / "playbook.db"))
+    await storage.save_procedure("timeout", "inventory", "Retry")   # Worker de asyncio.to_thread
+    workers = [threading.Thread(target=storage._select, args=(None, None)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    connections = list(storage._connections)
+    assert len(connections) == 5          # __init__ + to_thread + 3 hilos
+    await storage.close()
+
+    assert storage._connections == []
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    # Sigue siendo usable: abre conexiones nuevas
+    assert len(await storage.load_procedures()) == 1
+    await storage.close()
+
+@pytest.mark.asyncio
+async def test_sqlite_storage_imports_json_playbook(temp_storage_file, tmp_path):
+    json_storage = PlaybookStorage(file_path=temp_storage_file)
+    await json_storage.save_procedure("timeout", "inventory", "Retry", success_rate=0.9)
+
+    storage = SQLitePlaybookStorage(file_path=str(tmp_path / "playbook.db"))
+    assert await storage.import_json(temp_storage_file) == 1
+    assert await storage.import_json(temp_storage_file) == 0  # Idempotente
+
+    # El siguiente ID continúa la secuencia importada
+    assert await storage.save_procedure("timeout", "inventory", "Wait") == "PROC-002"
+
+    # Otro playbook con PROC-001 distinto: se importa con ID nuevo, no se descarta
+    other_file = tmp_path / "other.json"
+    other = PlaybookStorage(file_path=str(other_file))
+    await other.save_procedure("service_unavailable", "payments", "Wait 5s", success_rate=0.7)
+    assert await storage.import_json(str(other_file)) == 1
+    [imported] = await storage.load_procedures(api="payments")
+    assert imported["id"] == "PROC-003"
+    assert (await storage._read_playbook())["procedures"][0]["recovery_strategy"] == "Retry"
+    await storage.close()
+
+
+# --- JOURNALED STORAGE (APPEND-ONLY) ---
+
+@pytest.mark.asyncio
+async def test_journal_appends_one_line_per_save(temp_storage_file):
+    storage = JournaledPlaybookStorage(file_path=temp_storage_file, compact_every=100)
+    await storage.save_procedure("timeout", "inventory", "Retry", success_rate=0.5)
+    await storage.save_procedure("timeout", "inventory", "Wait", success_rate=0.9)
+
+    # El snapshot no se reescribe; el journal crece una línea por save
+    with open(temp_storage_file, 'r') as f:
+        assert json.load(f)["procedures"] == []
+    assert len(storage.journal_path.read_text().splitlines()) == 2
+
+    # Simular crash: nueva instancia sin close() -> replay de snapshot + journal
+    replayed = JournaledPlaybookStorage(file_path=temp_storage_file)
+    assert (await replayed.get_best_procedure("timeout", "inventory"))["recovery_strategy"] == "Wait"
+    assert await replayed.save_procedure("timeout", "erp", "Retry") == "PROC-003"
+
+@pytest.mark.asyncio
+async def test_journal_compaction_and_torn_tail(temp_storage_file):
+    storage = JournaledPlaybookStorage(file_path=temp_storage_file, compact_every=2)
+    await storage.save_procedure("timeout", "inventory", "Retry")
+    await storage.save_procedure("timeout", "payments", "Retry")  # Compacta
+    await storage.save_procedure("timeout", "erp", "Retry")
+
+    with open(temp_storage_file, 'r') as f:
+        assert len(json.load(f)["procedures"]) == 2
+
+    # Escritura interrumpida a mitad de línea
+    with open(storage.journal_path, 'a') as f:
+        f.write('{"id": "PROC-004", "failure_ty')
+
+    replayed = JournaledPlaybookStorage(file_path=temp_storage_file)
+    assert len(await replayed.load_procedures()) == 3
+    assert await replayed.save_procedure("timeout", "shipping", "Retry") == "PROC-004"
+    await replayed.close()
+
+    with open(temp_storage_file, 'r') as f:
+        assert len(json.load(f)["procedures"]) == 4
+    assert replayed.journal_path.read_text() == ""
+
+@pytest.mark.asyncio
+async def test_journal_discards_last_line_without_newline(temp_storage_file):
+    storage = JournaledPlaybookStorage(file_path=temp_storage_file)
+    await storage.save_procedure("timeout", "inventory", "Retry")
+
+    # JSON completo pero sin '\n': el crash ocurrió antes de terminar la línea
+    with open(storage.journal_path, 'a') as f:
+        f.write(json.dumps({"id": "PROC-002", "failure_type": "timeout", "api": "erp",
+                            "recovery_strategy": "Retry", "success_rate": 1.0}))
+
+    replayed = JournaledPlaybookStorage(file_path=temp_storage_file)
+    assert [p["id"] for p in await replayed.load_procedures()] == ["PROC-001"]
+    assert await replayed.save_procedure("timeout", "payments", "Retry") == "PROC-002"
+    assert len(replayed.journal_path.read_text().splitlines()) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["json", "indexed", "journal", "sqlite"])
+async def test_save_procedures_batch_is_single_commit(backend, temp_storage_file, tmp_path):
+    storage = {
+        "json": lambda: PlaybookStorage(file_path=temp_storage_file),
+        "indexed": lambda: IndexedPlaybookStorage(file_path=temp_storage_file, flush_interval=60),
+        "journal": lambda: JournaledPlaybookStorage(file_path=temp_storage_file),
+        "sqlite": lambda: SQLitePlaybookStorage(file_path=str(tmp_path / "playbook.db")),
+    }[backend]()
+    await storage.save_procedure("timeout", "inventory", "Retry 2x", 0.5)
+
+    ids = await storage.save_procedures([
+        {"failure_type": "timeout", "api": "inventory", "recovery_strategy": "Retry 3x", "success_rate": 0.9},
+        {"failure_type": "service_unavailable", "api": "payments", "recovery_strategy": "Wait 5s"},
+    ])
+    assert ids == ["PROC-002", "PROC-003"]
+    assert (await storage.get_best_procedure("timeout", "inventory"))["id"] == "PROC-002"
+
+    # Todo o nada: una entrada inválida no escribe ninguna
+    with pytest.raises(ValueError):
+        await storage.save_procedures([
+            {"failure_type": "timeout", "api": "erp", "recovery_strategy": "ok"},
+            {"failure_type": "bogus", "api": "erp", "recovery_strategy": "ko"},
+        ])
+    assert len(await storage.load_procedures()) == 3
+
+    if backend in ("json", "indexed"):
+        # El lote ya está en disco sin esperar al flush diferido
+        with open(temp_storage_file) as f:
+            assert len(json.load(f)["procedures"]) == 3
+    if hasattr(storage, "close"):
+        await storage.close()
@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+
+from chaos_engine.core.rate_limiter import (
+    RateLimitExceeded,
+    RateLimitedScheduler,
+    TokenBucket,
+    is_rate_limit_error,
+    parse_retry_after,
+)
+
+
+class FakeClock:
+    """Reloj virtual: sleep() avanza el tiempo sin esperar."""
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_reservations_wait_exactly_for_quota():
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_minute=60, capacity=2, clock=clock)
+
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(1.0)  # 1 token/s
+    assert bucket.reserve() == pytest.approx(2.0)  # FIFO: detrás de la reserva anterior
+
+    clock.now += 2.0
+    assert bucket.available == pytest.approx(0.0)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_backs_off_on_429_and_retries_run():
+    clock = FakeClock()
+    scheduler = RateLimitedScheduler(requests_per_minute=600, base_backoff=2.0, clock=clock, sleep=clock.sleep)
+    attempts = []
+
+    async def job():
+        await scheduler.acquire()
+        attempts.append(clock.now)
+        if len(attempts) == 1:
+            raise RateLimitExceeded("429 RESOURCE_EXHAUSTED")
+        scheduler.report_success()
+        return "ok"
+
+    assert await scheduler.run(job) == "ok"
+    assert attempts[1] - attempts[0] >= 2.0  # Pausa global antes del reintento
+    stats = scheduler.get_stats()
+    assert stats["retried_runs"] == 1
+    assert stats["rate_limited"] == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_map_preserves_order_and_caps_concurrency():
+    scheduler = RateLimitedScheduler(requests_per_minute=1000, max_concurrency=2)
+    running, peak = 0, 0
+
+    def make(i):
+        async def job():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01 * (5 - i))
+            running -= 1
+            return i
+        return job
+
+    assert await scheduler.map([make(i) for i in range(5)]) == [0, 1, 2, 3, 4]
+    assert peak == 2
+
+
+def test_rate_limit_error_detection():
+    message = "429 RESOURCE_EXHAUSTED. {'retryDelay': '17s'}"
+    assert is_rate_limit_error(message)
+    assert parse_retry_after(message) == 17.0
+    assert not is_rate_limit_error("500 Internal error")
@@ -0,0 +1,162 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from chaos_engine.agents.petstore import PetstoreAgent
+from chaos_engine.agents.scripted_llm import ScriptedPolicyLlm
+from google.genai import types
+
+
+class SequenceExecutor:
+    """Executor determinista: devuelve las respuestas programadas y luego éxito."""
+    def __init__(self, responses=None):
+        self.responses = list(responses or [])
+        self.calls = []
+
+    async def send_request(self, method, endpoint, params=None, json_body=None):
+        self.calls.append((method, endpoint))
+        if self.responses:
+            return self.responses.pop(0)
+        if "findByStatus" in endpoint:
+            return {"status": "success", "code": 200, "data": [{"id": 7, "name": "Rex"}]}
+        return {"status": "success", "code": 200, "data": {}}
+
+    def calculate_jittered_backoff(self, seconds):
+        return seconds
+
+
+@pytest.fixture
+def playbook_file(tmp_path):
+    f = tmp_path / "playbook.json"
+    f.write_text(json.dumps({
+        "default": {"strategy": "fail_fast", "config": {}},
+        "get_inventory": {
+            "503": {"strategy": "retry_exponential_backoff", "config": {"base_delay": 1.0, "max_retries": 2}}
+        }
+    }), encoding="utf-8")
+    return str(f)
+
+
+@pytest.mark.asyncio
+async def test_scripted_llm_runs_full_protocol_offline(playbook_file, monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    executor = SequenceExecutor()
+    agent = PetstoreAgent(playbook_file, executor, ScriptedPolicyLlm, "scripted-policy")
+
+    result = await agent.process_order("ORD-1", 0.0, 42)
+
+    assert result["status"] == "success"
+    assert [endpoint for _, endpoint in executor.calls] == [
+        "/store/inventory", "/pet/findByStatus", "/store/order", "/pet"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_scripted_llm_follows_playbook_backoff(playbook_file):
+    error_503 = {"status": "error", "code": 503, "message": "Service Unavailable"}
+    executor = SequenceExecutor([error_503])
+    agent = PetstoreAgent(playbook_file, executor, ScriptedPolicyLlm, "scripted-policy")
+
+    with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        result = await agent.process_order("ORD-2", 0.5, 42)
+
+    assert result["status"] == "success"
+    mock_sleep.assert_called_once_with(1.0)  # base_delay * 2**0
+    assert executor.calls.count(("GET", "/store/inventory")) == 2
+
+
+@pytest.mark.asyncio
+async def test_scripted_llm_fails_fast_on_default_strategy(playbook_file):
+    error_500 = {"status": "error", "code": 500, "message": "Boom"}
+    executor = SequenceExecutor([{"status": "success", "code": 200, "data": {}}, error_500])
+    agent = PetstoreAgent(playbook_file, executor, ScriptedPolicyLlm, "scripted-policy")
+
+    result = await agent.process_order("ORD-3", 0.5, 42)
+
+    assert result["status"] == "failure"
+    assert result["steps_completed"] == ["get_inventory"]
+    assert len(executor.calls) == 2
+
+
+class MeteredPolicyLlm(ScriptedPolicyLlm):
+    """Política scripted que además reporta usage_metadata como Gemini."""
+    async def generate_content_async(self, llm_request, stream=False):
+        async for response in super().generate_content_async(llm_request, stream):
+            response.usage_metadata = types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=100, candidates_token_count=10, total_token_count=110
+            )
+            yield response
+
+
+@pytest.mark.asyncio
+async def test_process_order_reports_model_and_tool_accounting(playbook_file):
+    error_503 = {"status": "error", "code": 503, "message": "Service Unavailable"}
+    agent = PetstoreAgent(playbook_file, SequenceExecutor([error_503]), MeteredPolicyLlm, "scripted-policy")
+
+    result = await agent.process_order("ORD-4", 0.5, 42)
+
+    # inventory(503) -> lookup -> wait -> inventory -> find -> order -> update -> JSON final
+    assert result["model_calls"] == 8
+    assert result["prompt_tokens"] == 800
+    assert result["completion_tokens"] == 80
+    assert result["wait_ms"] >= 900  # wait_seconds(1.0) real
+    assert result["model_ms"] >= 0 and result["tool_ms"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_mock_mode_waits_advance_virtual_clock(playbook_file):
+    import time
+    error_503 = {"status": "error", "code": 503, "message": "Service Unavailable"}
+    executor = SequenceExecutor([error_503, error_503])
+    agent = PetstoreAgent(playbook_file, executor, ScriptedPolicyLlm, "scripted-policy", mock_mode=True)
+
+    started = time.perf_counter()
+    result = await agent.process_order("ORD-5", 0.5, 42)
+    elapsed = time.perf_counter() - started
+
+    assert result["status"] == "success"
+    assert elapsed < 1.0                       # No se ha dormido de verdad...
+    assert result["virtual_ms"] == 3000.0      # ...pero 1s + 2s de backoff cuentan
+    assert result["wait_ms"] == pytest.approx(3000.0, abs=5)
+    assert result["duration_ms"] >= 3000.0
+
+
+@pytest.mark.asyncio
+async def test_quota_wait_is_reported_apart_from_model_and_duration(playbook_file):
+    import asyncio
+    from chaos_engine.agents.rate_limited_llm import RateLimitedConstructor
+    from chaos_engine.core.rate_limiter import RateLimitedScheduler
+
+    async def slow_sleep(seconds):
+        await asyncio.sleep(0.05)  # Cada espera de cuota bloquea 50 ms reales
+
+    scheduler = RateLimitedScheduler(requests_per_minute=1, sleep=slow_sleep)
+    constructor = RateLimitedConstructor(MeteredPolicyLlm, scheduler)
+    agent = PetstoreAgent(playbook_file, SequenceExecutor(), constructor, "scripted-policy")
+
+    result = await agent.process_order("ORD-6", 0.0, 42)
+
+    # 5 llamadas al modelo: la primera tiene cuota, las 4 siguientes esperan
+    assert result["model_calls"] == 5
+    assert result["quota_wait_ms"] >= 200
+    assert result["model_ms"] < 100
+    assert result["duration_ms"] < result["quota_wait_ms"]
+
+
+@pytest.mark.asyncio
+async def test_native_recovery_backoff_counts_as_wait_and_retry(playbook_file):
+    from chaos_engine.core.playbook_manager import load_compiled_playbook
+    from chaos_engine.core.resilience import PlaybookStrategyProxy
+
+    error_503 = {"status": "error", "code": 503, "message": "Service Unavailable"}
+    agent = PetstoreAgent(playbook_file, None, ScriptedPolicyLlm, "scripted-policy", mock_mode=True,
+                          native_recovery=True)
+    proxy = PlaybookStrategyProxy(SequenceExecutor([error_503]), load_compiled_playbook(playbook_file),
+                                  sleep=agent.sleep, on_retry=agent.record_tool_retry)
+
+    result = await agent.process_order("ORD-7", 0.5, 42, executor=proxy)
+
+    assert result["status"] == "success"
+    assert result["tool_retries"] == 1
+    assert result["wait_ms"] == pytest.approx(1000.0, abs=5)   # base_delay del 503
+    assert result["tool_ms"] < 500                             # El backoff no es tiempo en tools
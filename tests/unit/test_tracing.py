@@ -0,0 +1,71 @@
+import pytest
+
+from chaos_engine.chaos.proxy import ChaosProxy
+from chaos_engine.core.playbook_storage import PlaybookStorage
+from chaos_engine.core.tracing import (
+    FAILURE_TYPES_BY_CODE, TOOL_APIS, TraceRecorder, TracingProxy, failure_type_for
+)
+from chaos_engine.simulation.runner import ABTestRunner
+
+
+@pytest.mark.asyncio
+async def test_tracing_proxy_records_attempts_and_chaos_decisions():
+    recorder = TraceRecorder(capacity=8)
+    chaos = ChaosProxy(failure_rate=1.0, seed=42, mock_mode=True)
+    proxy = TracingProxy(wrapped_executor=chaos, recorder=recorder)
+
+    await proxy.send_request("GET", "/store/inventory")
+    await proxy.send_request("GET", "/store/inventory")
+
+    trace = recorder.export("failure")
+    assert [e["attempt"] for e in trace["events"]] == [1, 2]
+    assert all(e["tool"] == "get_inventory" and e["chaos_injected"] for e in trace["events"])
+    assert trace["failed_api"] == "inventory"
+    assert trace["chaos_scenario"] == failure_type_for(trace["events"][0]["error_code"])
+    assert set(trace) >= {"events", "outcome", "total_duration", "chaos_scenario"}
+
+
+@pytest.mark.asyncio
+async def test_exported_trace_round_trips_into_playbook_storage(tmp_path):
+    assert set(FAILURE_TYPES_BY_CODE.values()) <= PlaybookStorage.VALID_FAILURE_TYPES
+    assert set(TOOL_APIS.values()) <= PlaybookStorage.VALID_APIS
+
+    recorder = TraceRecorder(capacity=8)
+    proxy = TracingProxy(wrapped_executor=ChaosProxy(failure_rate=1.0, seed=3, mock_mode=True), recorder=recorder)
+    await proxy.send_request("POST", "/store/order", json_body={"petId": 1})
+    trace = recorder.export("failure")
+
+    storage = PlaybookStorage(file_path=str(tmp_path / "playbook.json"))
+    [procedure_id] = await storage.save_procedures([{
+        "failure_type": trace["chaos_scenario"],
+        "api": trace["failed_api"],
+        "recovery_strategy": "retry_with_backoff",
+    }])
+
+    [procedure] = await storage.load_procedures(api="payments")
+    assert procedure["id"] == procedure_id
+    assert procedure["failure_type"] == failure_type_for(trace["events"][0]["error_code"])
+
+
+def test_trace_recorder_ring_buffer_keeps_latest_events():
+    recorder = TraceRecorder(capacity=3)
+    for i in range(5):
+        recorder.record(f"tool_{i}", "success", float(i), float(i) + 0.5)
+
+    events = recorder.events()
+    assert [e["tool"] for e in events] == ["tool_2", "tool_3", "tool_4"]
+    assert recorder.dropped == 2
+    assert all(e["duration"] == 0.5 for e in events)
+
+
+@pytest.mark.asyncio
+async def test_ab_runner_exports_trace_when_enabled():
+    runner = ABTestRunner(trace=True)
+
+    result = await runner.run_experiment("playbook", failure_rate=0.5, seed=7)
+
+    trace = result["trace"]
+    assert trace["outcome"] == result["status"]
+    assert [e["tool"] for e in trace["events"] if e["status"] == "success"] == result["steps_completed"]
+    assert sum(1 for e in trace["events"] if e["attempt"] > 1) == result["retries"]
+    assert "trace" not in await ABTestRunner().run_experiment("baseline", 0.5, 7)
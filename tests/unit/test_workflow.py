@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+
+from chaos_engine.simulation.parametric import ParametricABTestRunner
+from chaos_engine.simulation.runner import ABTestRunner
+from chaos_engine.simulation.workflow import (
+    PARALLEL_WORKFLOW,
+    WorkflowDefinition,
+    WorkflowExecutor,
+    WorkflowStep,
+)
+
+
+def test_workflow_definition_levels_and_validation():
+    assert PARALLEL_WORKFLOW.levels() == [["inventory", "payment"], ["erp"], ["shipping"]]
+    assert WorkflowDefinition.sequential(["a", "b", "c"]).is_sequential
+
+    spec = {"steps": [{"name": "a", "depends_on": ["b"]}, {"name": "b", "depends_on": ["a"]}]}
+    with pytest.raises(ValueError, match="cycle"):
+        WorkflowDefinition.from_dict(spec)
+    with pytest.raises(ValueError, match="unknown"):
+        WorkflowDefinition([WorkflowStep("a", depends_on=("ghost",))])
+
+
+@pytest.mark.asyncio
+async def test_workflow_executor_overlaps_independent_steps_and_drains_on_failure():
+    active, peak, calls = 0, 0, []
+
+    def step(name, outcomes):
+        async def run(config):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            calls.append(name)
+            await asyncio.sleep(0.01 if name == "inventory" else 0.02)
+            active -= 1
+            return {"status": outcomes.pop(0) if outcomes else "success"}
+        return run
+
+    functions = {
+        "inventory": step("inventory", ["error", "error"]),
+        "payment": step("payment", []),
+        "erp": step("erp", []),
+        "shipping": step("shipping", []),
+    }
+    run = await WorkflowExecutor(PARALLEL_WORKFLOW, functions).run(0.5, 7, agent_retries=1)
+
+    assert peak == 2                             # inventory || payment
+    assert run.failed_at == "inventory"
+    assert run.steps_completed == ["payment"]    # El pago en vuelo termina igualmente
+    assert run.retries == 1
+    assert "erp" not in calls
+
+
+@pytest.mark.asyncio
+async def test_parallel_workflow_flags_charged_but_failed_orders():
+    sequential = ABTestRunner()
+    parallel = ABTestRunner(workflow=PARALLEL_WORKFLOW)
+
+    seq = await sequential.run_experiment("playbook", 0.0, 3)
+    par = await parallel.run_experiment("playbook", 0.0, 3)
+    assert seq["steps_completed"] == ["inventory", "payment", "erp", "shipping"]
+    assert sorted(par["steps_completed"]) == sorted(seq["steps_completed"])
+    assert par["workflow"] == "parallel"
+
+    checker = ParametricABTestRunner([0.5], 1, output_dir=None)
+    charged = {"status": "failure", "failed_at": "inventory", "steps_completed": ["payment"]}
+    assert checker._calculate_inconsistency(charged) == 1
+    assert checker._calculate_inconsistency({"status": "failure", "failed_at": "payment", "steps_completed": ["inventory"]}) == 0
+    assert checker._calculate_inconsistency({"status": "failure", "failed_at": "erp", "steps_completed": ["inventory", "payment"]}) == 1
+
+
+@pytest.mark.asyncio
+async def test_saga_refunds_charged_orders_off_the_critical_path():
+    from chaos_engine.simulation.saga import SagaCoordinator
+
+    refunds = []
+
+    async def refund(step_result, config):
+        refunds.append(step_result["data"]["transaction_id"])
+        await asyncio.sleep(0.05)
+        return {"status": "success"}
+
+    runner = ABTestRunner(saga=SagaCoordinator(compensations={"payment": refund}))
+
+    async def failing_erp(config):
+        return {"status": "error", "code": 503}
+    runner.workflow_executor.step_functions["erp"] = failing_erp
+
+    result = await runner.run_experiment("saga", failure_rate=0.0, seed=1)
+
+    # El fallo vuelve sin esperar al reembolso (sigue en segundo plano)
+    assert result["failed_at"] == "erp"
+    assert result["compensation_pending"] and result["compensated"] == []
+    assert runner.saga.pending == 1
+
+    await runner.drain_compensations()
+    assert not result["compensation_pending"]
+    assert result["compensated"] == ["payment"]
+    assert refunds and refunds[0].startswith("PAY-")
+    assert result["compensation_ms"] >= 50
+    assert result["duration_ms"] < 1000 and result["retries"] == 0
+    assert ParametricABTestRunner([0.5], 1, output_dir=None)._calculate_inconsistency(result) == 0